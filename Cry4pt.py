@@ -2,30 +2,53 @@ import sys
 import os
 import ctypes
 import platform
-import shutil
-import psutil
 import locale
-import json
 from datetime import datetime
 import time
-import winshell
+import threading
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QTabWidget, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QPushButton, QCheckBox, QProgressBar, QFileDialog, QGroupBox,
-    QListWidget, QListWidgetItem, QMessageBox, QTextEdit, QSystemTrayIcon,
-    QMenu, QTableWidget, QTableWidgetItem, QHeaderView, QComboBox
+    QListView, QListWidget, QListWidgetItem, QAbstractItemView, QMessageBox, QPlainTextEdit, QSystemTrayIcon,
+    QMenu, QTableWidget, QTableWidgetItem, QHeaderView, QComboBox, QTreeWidget, QTreeWidgetItem, QInputDialog
 )
 from PySide6.QtGui import QPalette, QColor, QIcon, QAction
-from PySide6.QtCore import Qt, QTimer, QThread, Signal, QObject
-from win10toast import ToastNotifier
+from PySide6.QtCore import Qt, QTimer, QThread, Signal, QObject, QAbstractListModel, QModelIndex
+import background_scan
+import cleanup_engine
+import cleanup_log
+import cleanup_planner
+import cleanup_preview
+import cleanup_rules
+import duplicate_finder
+import extension_index
+import file_tracker
+import preview_cache
+import snapshot_format
+import startup_probes
+import tracker_engine
+import tracker_watch
 
 # Constants for File Tracker
-SNAPSHOT_FILE = "snapshot_files.json"
-SNAPSHOT_BACKUP_DIR = "snapshot_backups"
+SNAPSHOT_FILE = "snapshot_files.snap"
+# Indented-JSON snapshot written by older versions, converted on first load
+LEGACY_SNAPSHOT_FILE = "snapshot_files.json"
+# Base snapshot plus one delta per scan, pruned by snapshot_history's retention policy
+SNAPSHOT_HISTORY_DIR = file_tracker.DEFAULT_HISTORY_DIR
 EXCLUDED_FOLDERS = [
     r"C:\Windows", r"C:\Program Files", r"C:\Program Files (x86)",
     r"C:\$Recycle.Bin", r"C:\System Volume Information"
 ]
+# Threads used to list directories during a Tracker scan (1 = serial scan)
+SCAN_WORKERS = tracker_engine.DEFAULT_SCAN_WORKERS
+# Slowest folders to list in the scan details tooltip (0 = no directory profiling)
+PROFILE_SLOWEST_DIRS = 10
+# Number of rows in the largest-files view
+TOP_FILES_COUNT = tracker_engine.DEFAULT_TOP_FILES
+# Number of subfolders listed per level of the folder growth view
+TOP_FOLDERS_COUNT = 15
+# Minimum seconds between table refreshes while watching for changes
+WATCH_UPDATE_INTERVAL = 2.0
 FILTER_EXTENSIONS = [
     ".exe", ".dll", ".sys", ".ini", ".bat", ".cmd", ".com", ".msi", ".cab",
     ".txt", ".log", ".csv", ".json", ".xml", ".yml", ".yaml",
@@ -38,7 +61,41 @@ FILTER_EXTENSIONS = [
     ".py", ".java", ".cpp", ".c", ".cs", ".rb", ".go", ".rs",
     ".db", ".sqlite", ".bak", ".iso"
 ]
-toaster = ToastNotifier()
+# Constants for background scans from the tray
+BACKGROUND_SCANS_ENABLED = True
+BACKGROUND_SCAN_INTERVAL_HOURS = background_scan.DEFAULT_SCAN_INTERVAL_HOURS
+BACKGROUND_IDLE_MINUTES = background_scan.DEFAULT_IDLE_MINUTES
+BACKGROUND_FILES_PER_SECOND = background_scan.DEFAULT_FILES_PER_SECOND
+BACKGROUND_SYSCALLS_PER_SECOND = background_scan.DEFAULT_SYSCALLS_PER_SECOND
+BACKGROUND_CHECKPOINT_INTERVAL = background_scan.DEFAULT_CHECKPOINT_INTERVAL
+# One thread per device, so the thread building the snapshot is the one running at background priority
+BACKGROUND_SCAN_WORKERS = 1
+# How often the tray checks whether a background scan is due
+BACKGROUND_CHECK_MS = 60 * 1000
+# Constants for the Duplicate Finder
+# Files smaller than this are not worth hashing for duplicates
+DUPLICATE_MIN_SIZE = 1024 * 1024
+# Processes hashing whole files (threads for the partial hashes)
+HASH_WORKERS = duplicate_finder.DEFAULT_HASH_WORKERS
+# Hashes of earlier runs, keyed by (path, size, mtime)
+HASH_CACHE_FILE = duplicate_finder.DEFAULT_HASH_CACHE_FILE
+# Constants for Storage Cleaner
+# Preview paths handed to the GUI thread per batch
+PREVIEW_BATCH_SIZE = 2000
+# Threads deleting files during a cleanup
+CLEANUP_WORKERS = cleanup_engine.DEFAULT_DELETE_WORKERS
+# Lines kept in the status log view; the full log is in the cleanup journal
+LOG_TAIL_LINES = 1000
+# Declarative rules for every cleanup category except the Recycle Bin
+CLEANUP_RULES_FILE = cleanup_rules.CLEANUP_RULES_FILE
+# Planner weights of the categories that are not in the rules file
+BROWSER_CACHE_PRIORITY = 2.0
+RECYCLE_BIN_PRIORITY = 2.0
+# Planned paths listed in the details of the Free Space dialog
+PLAN_DETAIL_LINES = 1000
+PREVIEW_SORT_OPTIONS = ["Category Order", "Largest First", "Most Space per Second of Scanning"]
+# Created on the first notification so importing this module does not need win10toast
+toaster = None
 
 # Utility Functions
 def is_admin():
@@ -74,13 +131,324 @@ def get_human_size(size):
         size /= 1024
     return f"{size:.2f} PB"
 
+def init_com():
+    """COM must be initialized in every thread that touches the shell (e.g. winshell's Recycle Bin)"""
+    try:
+        import pythoncom
+    except ImportError:
+        return False
+    pythoncom.CoInitialize()
+    return True
+
+class PreviewListModel(QAbstractListModel):
+    """Preview rows kept as one PreviewRecord list per category; the view only asks for the rows it paints"""
+
+    def __init__(self, order):
+        super().__init__()
+        self.order = list(order)
+        self.default_order = list(order)
+        self.rows = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return sum(len(rows) for rows in self.rows.values())
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        row = index.row()
+        for name in self.order:
+            rows = self.rows.get(name, ())
+            if row < len(rows):
+                record = rows[row]
+                if record.size is None:
+                    return record.path
+                return f"{record.path}  ({get_human_size(record.size)})"
+            row -= len(rows)
+        return None
+
+    def offset(self, name):
+        total = 0
+        for other in self.order:
+            if other == name:
+                return total
+            total += len(self.rows.get(other, ()))
+        return total
+
+    def add_category(self, name):
+        # A category found after startup goes last; it has no rows yet
+        if name not in self.default_order:
+            self.default_order.append(name)
+            self.order.append(name)
+
+    def append(self, name, records):
+        if not records:
+            return
+        rows = self.rows.setdefault(name, [])
+        first = self.offset(name) + len(rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(records) - 1)
+        rows.extend(records)
+        self.endInsertRows()
+
+    def remove_category(self, name):
+        rows = self.rows.get(name)
+        if not rows:
+            self.rows.pop(name, None)
+            return
+        first = self.offset(name)
+        self.beginRemoveRows(QModelIndex(), first, first + len(rows) - 1)
+        del self.rows[name]
+        self.endRemoveRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self.rows.clear()
+        self.endResetModel()
+
+    def arrange(self, category_key=None):
+        """Order categories by category_key (highest first) and their files by size, or restore the default order"""
+        self.beginResetModel()
+        if category_key is None:
+            self.order = list(self.default_order)
+            for rows in self.rows.values():
+                rows.sort(key=lambda record: record.path)
+        else:
+            self.order = sorted(self.default_order, key=category_key, reverse=True)
+            for rows in self.rows.values():
+                rows.sort(key=lambda record: record.size or 0, reverse=True)
+        self.endResetModel()
+
+class PreviewWorker(QObject):
+    batch = Signal(str, int, object)
+    finished = Signal(str, int, object)
+    done = Signal()
+
+    def __init__(self, source, generations, cached=None, ttl=preview_cache.PREVIEW_CACHE_TTL):
+        """source(names) yields (category, PreviewRecord) for the categories in names;
+        generations maps each category of this job to its preview generation"""
+        super().__init__()
+        self.source = source
+        self.generations = generations
+        self.cached = cached or {}
+        self.ttl = ttl
+        self.cancelled = set()
+
+    def cancel(self, name=None):
+        # Called from the GUI thread; checked for every enumerated file
+        if name is None:
+            self.cancelled.update(self.generations)
+        else:
+            self.cancelled.add(name)
+
+    def run(self):
+        stale = []
+        for name, generation in self.generations.items():
+            # The freshness check stats folders, so it runs here and not on the GUI thread
+            entry = self.cached.get(name)
+            if entry is None or not entry.is_fresh(self.ttl):
+                stale.append(name)
+                continue
+            records = entry.records
+            for start in range(0, len(records), PREVIEW_BATCH_SIZE):
+                if name in self.cancelled:
+                    break
+                self.batch.emit(name, generation, records[start:start + PREVIEW_BATCH_SIZE])
+            self.finished.emit(name, generation, None if name in self.cancelled else entry)
+        if stale:
+            self.enumerate(stale)
+        self.done.emit()
+
+    def enumerate(self, names):
+        com = init_com()
+        started = time.perf_counter()
+        created = time.time()
+        found = {name: [] for name in names}
+        pending = {name: [] for name in names}
+        error = None
+        try:
+            # The sources are generators, so cancelling stops the walk itself
+            for name, record in self.source(names):
+                if name in self.cancelled:
+                    if self.cancelled.issuperset(names):
+                        break
+                    continue
+                found[name].append(record)
+                pending[name].append(record)
+                if len(pending[name]) >= PREVIEW_BATCH_SIZE:
+                    self.batch.emit(name, self.generations[name], pending[name])
+                    pending[name] = []
+        except Exception as e:
+            error = e
+        if com:
+            import pythoncom
+            pythoncom.CoUninitialize()
+        elapsed = time.perf_counter() - started
+        for name in names:
+            if error is not None:
+                pending[name].append(cleanup_preview.PreviewRecord(f"[Error] {name}: {error}", None, None))
+            if name in self.cancelled:
+                self.finished.emit(name, self.generations[name], None)
+                continue
+            if pending[name]:
+                self.batch.emit(name, self.generations[name], pending[name])
+            entry = None
+            if error is None:
+                entry = preview_cache.PreviewEntry.build(found[name], created, elapsed)
+            self.finished.emit(name, self.generations[name], entry)
+
+class CleanupWorker(QObject):
+    progress = Signal(int, int)
+    records = Signal(object)
+    # {category: [paths]} to delete, {category: PreviewEntry} enumerated again, {category: error} skipped
+    resolved = Signal(object, object, object)
+    finished = Signal(object, bool)
+
+    def __init__(self, categories, journal, workers=CLEANUP_WORKERS, source=None, cached=None,
+                 ttl=preview_cache.PREVIEW_CACHE_TTL):
+        """categories maps each category to its paths, or to None to take them from its cached
+        preview, or from source(names) if that went stale"""
+        super().__init__()
+        self.categories = categories
+        self.journal = journal
+        self.workers = workers
+        self.source = source
+        self.cached = cached or {}
+        self.ttl = ttl
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def resolve(self):
+        selected = {}
+        entries = {}
+        skipped = {}
+        com = False
+        for name, paths in self.categories.items():
+            if paths is not None:
+                selected[name] = paths
+                continue
+            # The freshness check stats folders, so it runs here and not on the GUI thread
+            entry = self.cached.get(name)
+            if entry is None or not entry.is_fresh(self.ttl):
+                if self.cancel_event.is_set():
+                    continue
+                com = com or init_com()
+                started = time.perf_counter()
+                created = time.time()
+                try:
+                    records = [record for _, record in self.source([name])]
+                except OSError as e:
+                    skipped[name] = e
+                    continue
+                entry = preview_cache.PreviewEntry.build(records, created, time.perf_counter() - started)
+                entries[name] = entry
+            selected[name] = entry.paths
+        if com:
+            import pythoncom
+            pythoncom.CoUninitialize()
+        return selected, entries, skipped
+
+    def run(self):
+        selected, entries, skipped = self.resolve()
+        self.resolved.emit(selected, entries, skipped)
+        results = cleanup_engine.delete_files(selected, self.workers, self.cancel_event,
+                                              on_progress=self.progress.emit, on_records=self.on_records)
+        self.journal.close()
+        self.finished.emit(results, self.cancel_event.is_set())
+
+    def on_records(self, records):
+        # The journal is written here so the GUI thread only renders the tail
+        self.journal.write(records)
+        self.records.emit(records)
+
+class PlannerWorker(QObject):
+    finished = Signal(object, bool)
+
+    def __init__(self, tiers, source, target, priorities, cached=None, ttl=preview_cache.PREVIEW_CACHE_TTL):
+        """tiers are lists of categories, highest priority first; source(names) yields
+        (category, PreviewRecord) for the categories in names"""
+        super().__init__()
+        self.tiers = tiers
+        self.source = source
+        self.target = target
+        self.priorities = priorities
+        self.cached = cached or {}
+        self.ttl = ttl
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def candidates(self):
+        for tier in self.tiers:
+            stale = []
+            # Fresh previews are read first, so a tier may not need walking at all
+            for name in tier:
+                entry = self.cached.get(name)
+                if entry is None or not entry.is_fresh(self.ttl):
+                    stale.append(name)
+                    continue
+                for record in entry.records:
+                    yield name, record
+            if stale:
+                yield from self.source(stale)
+
+    def run(self):
+        com = init_com()
+        try:
+            plan = cleanup_planner.plan_cleanup(self.candidates(), self.target, self.priorities,
+                                                cancel=self.cancel_event)
+        except Exception as e:
+            plan = e
+        if com:
+            import pythoncom
+            pythoncom.CoUninitialize()
+        self.finished.emit(plan, self.cancel_event.is_set())
+
+class ProbeWorker(QObject):
+    result = Signal(object, object, object)
+    done = Signal()
+
+    def __init__(self, make_probes, timeout=startup_probes.PROBE_TIMEOUT):
+        """make_probes() returns {key: callable}; it runs on the worker thread as well"""
+        super().__init__()
+        self.make_probes = make_probes
+        self.timeout = timeout
+
+    def run(self):
+        try:
+            probes = self.make_probes()
+        except Exception as e:
+            print(f"Error preparing startup probes: {e}")
+            probes = {}
+        startup_probes.run_probes(probes, self.result.emit, self.timeout)
+        self.done.emit()
+
 # Storage Cleaner Widget
 class StorageCleaner(QWidget):
+    # Mount points found by the drive probe, for the Tracker's drive list
+    mounts_found = Signal(object)
+
     def __init__(self):
         super().__init__()
         self.layout = QVBoxLayout()
         self.setLayout(self.layout)
-        self.log_messages = []
+        self.journal = None
+        self.preview_jobs = {}
+        self.preview_generation = {}
+        self.preview_cache = preview_cache.PreviewCache()
+        self.cleanup_thread = None
+        self.cleanup_worker = None
+        self.cleanup_selection = {}
+        self.cleanup_skipped = {}
+        self.cleanup_removed = set()
+        self.plan_thread = None
+        self.plan_worker = None
+        self.probe_jobs = {}
+        self.detected_caches = {}
+        self.drive_groups = {}
         self.init_ui()
 
     def init_ui(self):
@@ -91,408 +459,737 @@ class StorageCleaner(QWidget):
         self.init_progress_area()
 
     def init_drive_info(self):
-        drives = [(part.mountpoint, shutil.disk_usage(part.mountpoint))
-                  for part in psutil.disk_partitions() if os.name != 'nt' or 'cdrom' not in part.opts]
-        for mount, usage in drives:
-            group = QGroupBox(f"Drive {mount} - {get_human_size(usage.used)} used of {get_human_size(usage.total)}")
-            layout = QVBoxLayout()
-            bar = QProgressBar()
-            bar.setValue(int((usage.used / usage.total) * 100))
-            layout.addWidget(bar)
-            group.setLayout(layout)
-            self.layout.addWidget(group)
+        # Filled in by start_probes once the window is up; slow drives must not hold it back
+        self.drive_layout = QVBoxLayout()
+        self.layout.addLayout(self.drive_layout)
 
     def init_cleanup_options(self):
         self.checkboxes = {}
-        self.cleanup_options = {
-            "Recycle Bin": self.preview_recycle_bin,
-            "Microsoft Defender Antivirus": self.preview_defender_files,
-            "Downloads Folder": self.preview_downloads_folder,
-            "Temp Files": self.preview_temp_files,
-            "Internet Cache": self.preview_inet_cache,
-            "Thumbnails": self.preview_thumbnails,
-            "DirectX Shader Cache": self.preview_dx_shader_cache,
-            "Delivery Optimization Files": self.preview_delivery_opt,
-            "Windows Upgrade Logs": self.preview_upgrade_logs,
-            "Old Installers": self.preview_old_installers
-        }
-        
-        # Detect and add browser caches dynamically
-        browser_caches = self.detect_browser_caches()
-        for name, paths in browser_caches.items():
-            self.cleanup_options[name] = self.create_browser_cache_method(paths)
-        
+        try:
+            self.file_rules = cleanup_rules.load_rules(CLEANUP_RULES_FILE)
+        except (OSError, ValueError) as e:
+            print(f"Error loading cleanup rules: {e}")
+            self.file_rules = []
+        # Browser caches are added by start_probes when they are found
+        self.rule_set = cleanup_rules.RuleSet(self.file_rules, self.rule_variables())
+
+        self.cleanup_options = {"Recycle Bin": self.preview_recycle_bin}
+        for name in self.rule_set.categories:
+            self.cleanup_options[name] = self.create_rule_method(name)
+
         box = QGroupBox("Cleanup Options")
-        layout = QVBoxLayout()
+        self.options_layout = QVBoxLayout()
         for name in self.cleanup_options:
-            cb = QCheckBox(name)
-            cb.stateChanged.connect(self.preview_selection)
-            layout.addWidget(cb)
-            self.checkboxes[name] = cb
-        box.setLayout(layout)
+            self.add_option(name)
+        box.setLayout(self.options_layout)
         self.layout.addWidget(box)
 
-    def detect_browser_caches(self):
-        detected = {}
-        # Chrome
-        chrome_path = os.path.join(os.environ.get('LOCALAPPDATA', ''), "Google", "Chrome", "User Data", "Default", "Cache")
-        if os.path.exists(chrome_path):
-            detected["Chrome Cache"] = [chrome_path]
-        
-        # Edge
-        edge_path = os.path.join(os.environ.get('LOCALAPPDATA', ''), "Microsoft", "Edge", "User Data", "Default", "Cache")
-        if os.path.exists(edge_path):
-            detected["Edge Cache"] = [edge_path]
-        
-        # Firefox
-        firefox_paths = self.get_firefox_cache_paths()
-        if firefox_paths:
-            detected["Firefox Cache"] = firefox_paths
-        
-        # Opera
-        opera_path = os.path.join(os.environ.get('APPDATA', ''), "Opera Software", "Opera Stable", "Cache")
-        if os.path.exists(opera_path):
-            detected["Opera Cache"] = [opera_path]
-        
-        # Brave
-        brave_path = os.path.join(os.environ.get('LOCALAPPDATA', ''), "BraveSoftware", "Brave-Browser", "User Data", "Default", "Cache")
-        if os.path.exists(brave_path):
-            detected["Brave Cache"] = [brave_path]
-        
-        # Vivaldi
-        vivaldi_path = os.path.join(os.environ.get('LOCALAPPDATA', ''), "Vivaldi", "User Data", "Default", "Cache")
-        if os.path.exists(vivaldi_path):
-            detected["Vivaldi Cache"] = [vivaldi_path]
-        
-        return detected
-
-    def get_firefox_cache_paths(self):
-        firefox_profiles_dir = os.path.join(os.environ.get('APPDATA', ''), "Mozilla", "Firefox", "Profiles")
-        cache_paths = []
-        if os.path.exists(firefox_profiles_dir):
-            for profile in os.listdir(firefox_profiles_dir):
-                profile_dir = os.path.join(firefox_profiles_dir, profile)
-                cache_dir = os.path.join(profile_dir, "cache2")
-                if os.path.isdir(cache_dir):
-                    cache_paths.append(cache_dir)
-        return cache_paths
-
-    def create_browser_cache_method(self, paths):
+    def add_option(self, name):
+        cb = QCheckBox(name)
+        cb.stateChanged.connect(lambda _state, name=name: self.on_option_toggled(name))
+        self.options_layout.addWidget(cb)
+        self.checkboxes[name] = cb
+
+    def start_probes(self):
+        """Read drive usage and detect browser caches on worker threads, each probe with a timeout"""
+        self.start_probe_job(lambda: {"mounts": file_tracker.list_mount_points}, self.on_mounts_probed)
+        self.start_probe_job(startup_probes.browser_cache_probes, self.on_browser_cache_probed,
+                             self.add_browser_caches)
+
+    def start_probe_job(self, make_probes, on_result, on_done=None):
+        thread = QThread(self)
+        worker = ProbeWorker(make_probes)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.result.connect(on_result)
+        if on_done is not None:
+            worker.done.connect(on_done)
+        worker.done.connect(thread.quit)
+        worker.done.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+        # Keep the worker referenced until its thread has stopped
+        key = id(worker)
+        thread.finished.connect(lambda key=key: self.probe_jobs.pop(key, None))
+        self.probe_jobs[key] = (thread, worker)
+        thread.start()
+
+    def on_mounts_probed(self, _key, mounts, error):
+        if error is not None:
+            print(f"Error listing drives: {error}")
+            return
+        self.mounts_found.emit(mounts)
+        for mount in mounts:
+            group = QGroupBox(f"Drive {mount} - reading usage...")
+            layout = QVBoxLayout()
+            bar = QProgressBar()
+            bar.setRange(0, 0)
+            layout.addWidget(bar)
+            group.setLayout(layout)
+            self.drive_layout.addWidget(group)
+            self.drive_groups[mount] = (group, bar)
+        self.start_probe_job(lambda: startup_probes.drive_usage_probes(mounts), self.on_drive_usage)
+
+    def on_drive_usage(self, mount, usage, error):
+        group, bar = self.drive_groups[mount]
+        bar.setRange(0, 100)
+        if error is not None:
+            group.setTitle(f"Drive {mount} - not responding" if isinstance(error, TimeoutError)
+                           else f"Drive {mount} - unavailable ({error})")
+            return
+        group.setTitle(f"Drive {mount} - {get_human_size(usage.used)} used of {get_human_size(usage.total)}")
+        bar.setValue(int((usage.used / usage.total) * 100) if usage.total else 0)
+
+    def on_browser_cache_probed(self, name, paths, error):
+        # A browser whose folders time out is left out, as one that is not installed
+        self.detected_caches[name] = paths or []
+
+    def add_browser_caches(self):
+        rules = list(self.file_rules)
+        # In the order the browsers are listed, not the order their probes ended
+        for name in startup_probes.browser_cache_probes():
+            paths = self.detected_caches.get(name)
+            if not paths:
+                continue
+            # Detected folders are used as they are, so braces must not be read as placeholders
+            roots = [path.replace("{", "{{").replace("}", "}}") for path in paths]
+            rules.append(cleanup_rules.CleanupRule(name, roots, priority=BROWSER_CACHE_PRIORITY))
+        self.rule_set = cleanup_rules.RuleSet(rules, self.rule_set.variables)
+        for name in self.rule_set.categories:
+            if name not in self.cleanup_options:
+                self.cleanup_options[name] = self.create_rule_method(name)
+                self.preview_model.add_category(name)
+                self.add_option(name)
+
+    def rule_variables(self):
+        variables = cleanup_rules.default_variables()
+        # The Downloads folder may have been moved; the shell folders key knows where to
+        try:
+            import winreg
+            with winreg.OpenKey(winreg.HKEY_CURRENT_USER,
+                            r'Software\Microsoft\Windows\CurrentVersion\Explorer\Shell Folders') as key:
+                reg_downloads = winreg.QueryValueEx(key, '{374DE290-123F-4565-9164-39C4925E467B}')[0]
+                if os.path.exists(reg_downloads):
+                    variables["Downloads"] = reg_downloads
+        except:
+            pass  # Fall back to standard path if registry access fails
+        return variables
+
+    def create_rule_method(self, name):
         def preview_method():
-            files = []
-            for path in paths:
-                if os.path.exists(path):
-                    for dp, _, filenames in os.walk(path):
-                        files.extend([os.path.join(dp, f) for f in filenames])
-            return files
+            return self.rule_set.iter_category(name)
         return preview_method
 
+    def preview_source(self, names):
+        """Return a source for PreviewWorker; rule categories share a single traversal"""
+        if names[0] in self.rule_set.categories:
+            def source(selected):
+                rules = [rule for rule in self.rule_set.rules if rule.name in selected]
+                return cleanup_rules.RuleSet(rules, self.rule_set.variables).walk()
+        else:
+            def source(selected):
+                for name in selected:
+                    for record in self.cleanup_options[name]():
+                        yield name, record
+        return source
+
+    def walk_categories(self, names):
+        """Yield (category, PreviewRecord) for names, walking all rule categories at once"""
+        rule_names = [name for name in names if name in self.rule_set.categories]
+        jobs = [[name] for name in names if name not in rule_names]
+        if rule_names:
+            jobs.insert(0, rule_names)
+        for job in jobs:
+            yield from self.preview_source(job)(job)
+
     def init_preview_area(self):
-        self.preview_list = QListWidget()
-        self.layout.addWidget(QLabel("Preview of Files to Delete:"))
+        self.preview_model = PreviewListModel(list(self.cleanup_options))
+        self.preview_list = QListView()
+        self.preview_list.setUniformItemSizes(True)
+        self.preview_list.setModel(self.preview_model)
+        self.preview_summary = QLabel("Preview of Files to Delete:")
+        self.sort_combo = QComboBox()
+        self.sort_combo.addItems(PREVIEW_SORT_OPTIONS)
+        self.sort_combo.currentIndexChanged.connect(self.arrange_preview)
+        header = QHBoxLayout()
+        header.addWidget(self.preview_summary)
+        header.addStretch()
+        header.addWidget(QLabel("Sort:"))
+        header.addWidget(self.sort_combo)
+        self.layout.addLayout(header)
         self.layout.addWidget(self.preview_list)
 
     def init_buttons(self):
         btn_layout = QHBoxLayout()
         self.clean_btn = QPushButton("🧹 Clean Selected")
         self.clean_btn.clicked.connect(self.clean_selected)
+        self.plan_btn = QPushButton("🎯 Free Space…")
+        self.plan_btn.setToolTip("Delete only as many of the selected files as it takes to free an amount of space")
+        self.plan_btn.clicked.connect(self.plan_free_space)
         self.export_btn = QPushButton("📝 Export Log")
         self.export_btn.clicked.connect(self.export_log)
+        self.refresh_btn = QPushButton("🔄 Refresh Preview")
+        self.refresh_btn.clicked.connect(self.refresh_preview)
+        self.cancel_btn = QPushButton("⛔ Cancel")
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel_cleanup)
         btn_layout.addStretch()
+        btn_layout.addWidget(self.refresh_btn)
         btn_layout.addWidget(self.clean_btn)
+        btn_layout.addWidget(self.plan_btn)
+        btn_layout.addWidget(self.cancel_btn)
         btn_layout.addWidget(self.export_btn)
         self.layout.addLayout(btn_layout)
 
     def init_progress_area(self):
         self.progress_bar = QProgressBar()
-        self.status_log = QTextEdit()
+        self.status_log = QPlainTextEdit()
         self.status_log.setReadOnly(True)
+        self.status_log.setMaximumBlockCount(LOG_TAIL_LINES)
+        self.log_summary = QLabel("")
         self.layout.addWidget(QLabel("Status Log:"))
         self.layout.addWidget(self.progress_bar)
         self.layout.addWidget(self.status_log)
+        self.layout.addWidget(self.log_summary)
 
     def preview_selection(self):
-        self.preview_list.clear()
+        """Show every checked category again, re-enumerating the ones whose cached preview went stale"""
+        for name in self.cleanup_options:
+            self.cancel_preview(name)
+        self.preview_model.clear()
+        self.start_previews([name for name, cb in self.checkboxes.items() if cb.isChecked()])
+
+    def on_option_toggled(self, name):
+        # Only the toggled category is enumerated again (or dropped)
+        self.cancel_preview(name)
+        self.preview_model.remove_category(name)
+        if self.checkboxes[name].isChecked():
+            self.start_previews([name])
+        self.update_preview_summary()
+
+    def arrange_preview(self):
+        mode = self.sort_combo.currentIndex()
+        if mode == 0:
+            self.preview_model.arrange()
+            return
+        def category_key(name):
+            entry = self.preview_cache.peek(name)
+            if entry is None:
+                return -1
+            return entry.total_bytes if mode == 1 else entry.bytes_per_second
+        self.preview_model.arrange(category_key)
+
+    def refresh_preview(self):
+        self.preview_cache.invalidate()
+        self.preview_selection()
+
+    def start_previews(self, names):
+        """Enumerate names with one job for all rule categories and one per other category"""
+        rule_names = [name for name in names if name in self.rule_set.categories]
+        jobs = [[name] for name in names if name not in rule_names]
+        if rule_names:
+            jobs.append(rule_names)
+        for job in jobs:
+            self.start_preview_job(job)
+
+    def start_preview_job(self, names):
+        generations = {}
+        for name in names:
+            generations[name] = self.preview_generation.get(name, 0) + 1
+            self.preview_generation[name] = generations[name]
+        cached = {name: self.preview_cache.peek(name) for name in names}
+        thread = QThread(self)
+        worker = PreviewWorker(self.preview_source(names), generations, cached, self.preview_cache.ttl)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.batch.connect(self.on_preview_batch)
+        worker.finished.connect(self.on_preview_finished)
+        worker.done.connect(thread.quit)
+        worker.done.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+        # Keep the worker referenced until its thread has stopped
+        key = id(worker)
+        thread.finished.connect(lambda key=key: self.preview_jobs.pop(key, None))
+        self.preview_jobs[key] = (thread, worker)
+        thread.start()
+
+    def cancel_preview(self, name):
+        # Bumping the generation also drops batches that are already queued
+        self.preview_generation[name] = self.preview_generation.get(name, 0) + 1
+        for _, worker in list(self.preview_jobs.values()):
+            if name in worker.generations:
+                worker.cancel(name)
+
+    def on_preview_batch(self, name, generation, paths):
+        if generation == self.preview_generation.get(name):
+            self.preview_model.append(name, paths)
+
+    def on_preview_finished(self, name, generation, entry):
+        if generation != self.preview_generation.get(name):
+            return
+        if entry is None:
+            self.preview_cache.invalidate(name)
+        else:
+            self.preview_cache.put(name, entry)
+        self.update_preview_summary()
+        if self.sort_combo.currentIndex() != 0:
+            self.arrange_preview()
+
+    def update_preview_summary(self):
+        files = 0
+        total = 0
         for name, cb in self.checkboxes.items():
+            entry = self.preview_cache.peek(name)
+            if entry is None:
+                cb.setText(name)
+                continue
+            cb.setText(f"{name} ({get_human_size(entry.total_bytes)} in {len(entry)} files)")
             if cb.isChecked():
-                try:
-                    files = self.cleanup_options[name]()
-                    for f in files:
-                        self.preview_list.addItem(QListWidgetItem(f))
-                except Exception as e:
-                    self.preview_list.addItem(QListWidgetItem(f"[Error] {name}: {e}"))
+                files += len(entry)
+                total += entry.total_bytes
+        self.preview_summary.setText(f"Preview of Files to Delete: {files} files, {get_human_size(total)}")
 
     def clean_selected(self):
-        to_delete = []
-        for name, cb in self.checkboxes.items():
-            if cb.isChecked():
-                try:
-                    to_delete.extend(self.cleanup_options[name]())
-                except:
-                    continue
-        total = len(to_delete)
-        deleted = 0
-        self.progress_bar.setMaximum(total)
+        # The worker reuses each preview unless it went stale; only then is the category walked again
+        self.start_cleanup({name: None for name, cb in self.checkboxes.items() if cb.isChecked()})
+
+    def start_cleanup(self, selected):
+        """Delete {category: [paths]} on a worker thread, journaling every file; a category
+        mapped to None takes its paths from the preview, enumerated again on the worker if stale"""
+        self.cleanup_selection = {}
+        self.cleanup_skipped = {}
+        self.cleanup_removed = set()
+        self.progress_bar.setMaximum(sum(len(files) for files in selected.values() if files is not None))
         self.progress_bar.setValue(0)
         self.status_log.clear()
-        self.log_messages.clear()
-        for idx, f in enumerate(to_delete, 1):
-            try:
-                if os.path.isfile(f):
-                    os.remove(f)
-                    msg = f"Deleted: {f}"
-                    deleted += 1
-                else:
-                    msg = f"Skipped (not file): {f}"
-            except Exception as e:
-                msg = f"Failed to delete: {f} — {e}"
-            self.log_messages.append(msg)
-            self.status_log.append(msg)
-            self.progress_bar.setValue(idx)
-        QMessageBox.information(self, "Cleanup Complete", f"Deleted {deleted} out of {total} files.")
+        self.journal = cleanup_log.CleanupJournal()
+        self.log_summary.setText(f"Journal: {self.journal.file_path}")
+        self.set_busy(True)
+
+        self.cleanup_thread = QThread()
+        cached = {name: self.preview_cache.peek(name) for name, files in selected.items() if files is None}
+        self.cleanup_worker = CleanupWorker(selected, self.journal, source=self.walk_categories, cached=cached,
+                                            ttl=self.preview_cache.ttl)
+        self.cleanup_worker.moveToThread(self.cleanup_thread)
+        self.cleanup_thread.started.connect(self.cleanup_worker.run)
+        self.cleanup_worker.resolved.connect(self.on_cleanup_resolved)
+        self.cleanup_worker.progress.connect(self.on_cleanup_progress)
+        self.cleanup_worker.records.connect(self.on_cleanup_records)
+        self.cleanup_worker.finished.connect(self.on_cleanup_finished)
+        self.cleanup_worker.finished.connect(self.cleanup_thread.quit)
+        self.cleanup_worker.finished.connect(self.cleanup_worker.deleteLater)
+        self.cleanup_thread.finished.connect(self.cleanup_thread.deleteLater)
+        self.cleanup_thread.start()
+
+    def set_busy(self, busy):
+        self.clean_btn.setEnabled(not busy)
+        self.plan_btn.setEnabled(not busy)
+        self.refresh_btn.setEnabled(not busy)
+        self.cancel_btn.setEnabled(busy)
+
+    def cancel_cleanup(self):
+        for worker in (self.cleanup_worker, self.plan_worker):
+            if worker is not None:
+                worker.cancel()
+                self.cancel_btn.setEnabled(False)
+
+    def plan_free_space(self):
+        names = [name for name, cb in self.checkboxes.items() if cb.isChecked()]
+        if not names:
+            QMessageBox.information(self, "Free Space", "Select the categories files may be taken from first.")
+            return
+        text, ok = QInputDialog.getText(self, "Free Space",
+                                        "Space to free (e.g. 20G), or usage to get the system drive down to (e.g. 85%):")
+        if not ok or not text.strip():
+            return
+        try:
+            text = text.strip()
+            if text.endswith("%"):
+                target = cleanup_planner.bytes_to_free(cleanup_planner.system_volume(), float(text[:-1]))
+            else:
+                target = cleanup_planner.parse_size(text)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Free Space", f"Cannot use '{text}': {e}")
+            return
+        if target <= 0:
+            QMessageBox.information(self, "Free Space", "The drive is already below that usage.")
+            return
+        priorities = self.rule_set.priorities()
+        priorities["Recycle Bin"] = RECYCLE_BIN_PRIORITY
+        tiers = cleanup_planner.priority_tiers(names, priorities)
+        cached = {name: self.preview_cache.peek(name) for name in names}
+        self.set_busy(True)
+        self.log_summary.setText(f"Planning how to free {get_human_size(target)}...")
+        self.plan_thread = QThread()
+        self.plan_worker = PlannerWorker(tiers, self.walk_categories, target, priorities, cached,
+                                         self.preview_cache.ttl)
+        self.plan_worker.moveToThread(self.plan_thread)
+        self.plan_thread.started.connect(self.plan_worker.run)
+        self.plan_worker.finished.connect(self.on_plan_finished)
+        self.plan_worker.finished.connect(self.plan_thread.quit)
+        self.plan_worker.finished.connect(self.plan_worker.deleteLater)
+        self.plan_thread.finished.connect(self.plan_thread.deleteLater)
+        self.plan_thread.start()
+
+    def on_plan_finished(self, plan, cancelled):
+        self.plan_thread = None
+        self.plan_worker = None
+        self.set_busy(False)
+        self.log_summary.setText("")
+        if cancelled:
+            return
+        if isinstance(plan, Exception):
+            QMessageBox.warning(self, "Free Space", f"Planning failed: {plan}")
+            return
+        if not len(plan):
+            QMessageBox.information(self, "Free Space", "The selected categories have nothing to delete.")
+            return
+        lines = [f"{name}: {files} files, {get_human_size(size)}"
+                 for name, (files, size) in plan.category_totals().items()]
+        if plan.reached:
+            heading = f"Deleting {len(plan)} files frees {get_human_size(plan.total_bytes)}:"
+        else:
+            heading = (f"The selected categories only hold {get_human_size(plan.total_bytes)} "
+                       f"of the {get_human_size(plan.target)} asked for:")
+        details = [f"{get_human_size(item.record.size)}\t{item.record.path}" for item in plan.items[:PLAN_DETAIL_LINES]]
+        if len(plan) > PLAN_DETAIL_LINES:
+            details.append(f"... and {len(plan) - PLAN_DETAIL_LINES} more")
+        box = QMessageBox(QMessageBox.Question, "Free Space", heading + "\n\n" + "\n".join(lines) + "\n\nDelete them?",
+                          QMessageBox.Yes | QMessageBox.No, self)
+        box.setDetailedText("\n".join(details))
+        if box.exec() == QMessageBox.Yes:
+            self.start_cleanup(plan.categories())
+
+    def on_cleanup_resolved(self, selected, entries, skipped):
+        self.cleanup_selection = selected
+        self.cleanup_skipped = skipped
+        for name, entry in entries.items():
+            self.preview_cache.put(name, entry)
+        self.progress_bar.setMaximum(sum(len(files) for files in selected.values()))
+        if skipped:
+            self.status_log.appendPlainText("\n".join(f"[Skipped] {name}: {error}" for name, error in skipped.items()))
+
+    def on_cleanup_progress(self, done, total):
+        self.progress_bar.setMaximum(total)
+        self.progress_bar.setValue(done)
+
+    def on_cleanup_records(self, records):
+        self.cleanup_removed.update(record.path for record in records if record.action == cleanup_engine.DELETED)
+        # Older lines would be dropped by the view anyway, so only the tail of a batch is formatted
+        messages = [cleanup_log.record_message(record) for record in records[-LOG_TAIL_LINES:]]
+        self.status_log.appendPlainText("\n".join(messages))
+        self.log_summary.setText(self.journal.summary())
+
+    def on_cleanup_finished(self, results, cancelled):
+        self.cleanup_thread = None
+        self.cleanup_worker = None
+        self.set_busy(False)
+        self.log_summary.setText(f"{self.journal.summary()} — journal: {self.journal.file_path}")
+        deleted = sum(result.deleted for result in results.values())
+        freed = sum(result.freed for result in results.values())
+        total = sum(len(files) for files in self.cleanup_selection.values())
+        lines = [f"{name}: {result} ({get_human_size(result.freed)})" for name, result in results.items()]
+        lines += [f"{name}: skipped, could not be enumerated ({error})" for name, error in self.cleanup_skipped.items()]
+        title = "Cleanup Cancelled" if cancelled else "Cleanup Complete"
+        QMessageBox.information(self, title, f"Deleted {deleted} out of {total} files, "
+                                             f"freed {get_human_size(freed)}.\n\n" + "\n".join(lines))
+        # Drop the deleted paths from the cache instead of enumerating everything again
+        for name in self.cleanup_selection:
+            self.preview_cache.discard_deleted(name, self.cleanup_removed)
         self.preview_selection()
 
     def export_log(self):
-        if not self.log_messages:
+        if self.journal is None or not len(self.journal):
             QMessageBox.information(self, "No Log", "Nothing to export.")
             return
         now = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        file_path, _ = QFileDialog.getSaveFileName(self, "Save Log", f"cleanup_log_{now}.txt", "Text Files (*.txt)")
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save Log", f"cleanup_log_{now}.csv",
+                                                   "CSV Files (*.csv);;JSON Lines (*.jsonl)")
         if file_path:
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write("\n".join(self.log_messages))
-            QMessageBox.information(self, "Log Exported", f"Log saved to: {file_path}")
+            try:
+                count = self.journal.export(file_path)
+            except (OSError, ValueError) as e:
+                QMessageBox.warning(self, "Export Failed", f"Could not export the log to {file_path}:\n{e}")
+                return
+            QMessageBox.information(self, "Log Exported", f"{count} entries saved to: {file_path}")
 
     def preview_recycle_bin(self):
         try:
-            return [item.filename() for item in winshell.recycle_bin()]  # Changed .path to .filename()
+            import winshell
+            items = list(winshell.recycle_bin())
         except Exception as e:
             print(f"Error accessing Recycle Bin: {e}")
-            return []
-
-    def preview_defender_files(self):
-        """Preview non-critical temporary files used by Microsoft Defender Antivirus"""
-        defender_paths = [
-            os.path.join(os.environ.get('ProgramData', ''), "Microsoft", "Windows Defender", "Scans", "History"),
-            os.path.join(os.environ.get('ProgramData', ''), "Microsoft", "Windows Defender", "Support"),
-            os.path.join(os.environ.get('ProgramData', ''), "Microsoft", "Windows Defender", "Quarantine"),
-            os.path.join(os.environ.get('ProgramData', ''), "Microsoft", "Windows Defender", "Reporting")
-        ]
-        
-        defender_files = []
-        for path in defender_paths:
-            if os.path.exists(path):
-                for dp, _, filenames in os.walk(path):
-                    # Skip the actual quarantine files as they might be needed
-                    if "Quarantine\\Entries" in dp:
-                        continue
-                    # Add temporary/history/log files
-                    for f in filenames:
-                        if f.endswith(('.log', '.tmp', '.temp', '.old', '.bak')):
-                            defender_files.append(os.path.join(dp, f))
-        
-        # Add detection history database files (non-critical)
-        history_path = os.path.join(os.environ.get('ProgramData', ''), "Microsoft", "Windows Defender", "Scans", "History", "Service")
-        if os.path.exists(history_path):
-            for dp, _, filenames in os.walk(history_path):
-                for f in filenames:
-                    if f.endswith(('.dat', '.db', '.sqlite')):
-                        file_path = os.path.join(dp, f)
-                        # Only include older files (3+ days old) to avoid deleting active ones
-                        try:
-                            if time.time() - os.path.getmtime(file_path) > 3 * 24 * 60 * 60:  # 3 days
-                                defender_files.append(file_path)
-                        except:
-                            pass
-        
-        return defender_files
-
-    def preview_downloads_folder(self):
-        """Preview files in the user's Downloads folder"""
-        # Get the standard Downloads folder path
-        downloads_path = os.path.join(os.path.expanduser('~'), 'Downloads')
-        
-        # Alternative location via shell folders
-        try:
-            import winreg
-            with winreg.OpenKey(winreg.HKEY_CURRENT_USER, 
-                            r'Software\Microsoft\Windows\CurrentVersion\Explorer\Shell Folders') as key:
-                reg_downloads = winreg.QueryValueEx(key, '{374DE290-123F-4565-9164-39C4925E467B}')[0]
-                if os.path.exists(reg_downloads):
-                    downloads_path = reg_downloads
-        except:
-            pass  # Fall back to standard path if registry access fails
-        
-        download_files = []
-        if os.path.exists(downloads_path):
-            for item in os.listdir(downloads_path):
-                item_path = os.path.join(downloads_path, item)
-                if os.path.isfile(item_path):
-                    download_files.append(item_path)
-        
-        return download_files
-
-    def preview_temp_files(self):
-        temp = os.environ.get("TEMP", r"C:\Windows\Temp")
-        return [os.path.join(temp, f) for f in os.listdir(temp) if os.path.isfile(os.path.join(temp, f))] if os.path.exists(temp) else []
-
-    def preview_thumbnails(self):
-        thumb_db = os.path.join(os.environ.get('LOCALAPPDATA', ''), r"Microsoft\Windows\Explorer")
-        return [os.path.join(thumb_db, f) for f in os.listdir(thumb_db) if f.startswith("thumbcache")] if os.path.exists(thumb_db) else []
-
-    def preview_inet_cache(self):
-        cache = os.path.join(os.environ.get('LOCALAPPDATA', ''), r"Microsoft\Windows\INetCache")
-        return [os.path.join(dp, f) for dp, _, filenames in os.walk(cache) for f in filenames] if os.path.exists(cache) else []
-
-    def preview_dx_shader_cache(self):
-        shader_cache = os.path.join(os.environ.get('LOCALAPPDATA', ''), "D3DSCache")
-        return [os.path.join(shader_cache, f) for f in os.listdir(shader_cache)] if os.path.exists(shader_cache) else []
-
-    def preview_delivery_opt(self):
-        """Preview Windows Delivery Optimization files across possible locations"""
-        delivery_opt_folders = [
-            # Traditional location
-            r"C:\Windows\SoftwareDistribution\DeliveryOptimization",
-            # Windows 10/11 additional location
-            r"C:\Windows\SoftwareDistribution\Delivery Optimization",
-            # Alternative location with Download folder
-            r"C:\Windows\SoftwareDistribution\Download",
-            # Additional location in ProgramData
-            os.path.join(os.environ.get('ProgramData', ''), "Microsoft", "Windows", "DeliveryOptimization")
-        ]
-        
-        delivery_files = []
-        for folder in delivery_opt_folders:
-            if os.path.exists(folder):
-                try:
-                    for dp, _, filenames in os.walk(folder):
-                        for f in filenames:
-                            # Focus primarily on cache and temporary files
-                            if f.endswith(('.temp', '.tmp', '.etl', '.log', '.dat', '.old')):
-                                delivery_files.append(os.path.join(dp, f))
-                            # Include content delivery files which can be large
-                            elif any(x in f.lower() for x in ['cache', 'download', 'content']):
-                                delivery_files.append(os.path.join(dp, f))
-                except (PermissionError, OSError):
-                    # Some subdirectories might be restricted
-                    pass
-
-        return delivery_files
-
-    def preview_upgrade_logs(self):
-        logdir = r"C:\Windows\Panther"
-        log_files = []
-        if os.path.exists(logdir):
-            for dp, _, filenames in os.walk(logdir):
-                for f in filenames:
-                    if f.endswith(".log"):
-                        log_files.append(os.path.join(dp, f))
-        return log_files
-
-    def preview_old_installers(self):
-        installer_dir = os.path.join(os.environ.get('ProgramData', ''), "Package Cache")
-        return [os.path.join(dp, f) for dp, _, filenames in os.walk(installer_dir) for f in filenames] if os.path.exists(installer_dir) else []
+            return
+        for item in items:
+            yield cleanup_preview.path_record(item.filename())  # Changed .path to .filename()
 
 # File Tracker Widget
 class StorageApp(QWidget):
+    # Emitted when a scan is started from the tab; a running background scan calls defer_scan to go first
+    scan_requested = Signal()
+
     def __init__(self):
         super().__init__()
         self.layout = QVBoxLayout()
         self.setLayout(self.layout)
+        self.last_scan_stats = None
+        self.scan_errors = {}
+        self.scan_deferred = False
+        self.watch_worker = None
+        self.dir_index = None
+        self.older_dir_index = None
+        self.folder_path = None
+        self.ext_index = None
+        self.top_files = []
+        self.changes = ([], [], [])
         self.init_ui()
 
     def init_ui(self):
-        self.label = QLabel(r"Click 'Scan Now' to analyze C:\ drive")
-        self.filter_selector = QComboBox()
-        self.filter_selector.addItem("All Files", None)
+        self.label = QLabel("Click 'Scan Now' to analyze the selected drives")
+        # Drives on different physical disks are scanned side by side, each into its own snapshot
+        self.drive_selector = QListWidget()
+        self.drive_selector.setSelectionMode(QAbstractItemView.MultiSelection)
+        self.drive_selector.setFlow(QListView.LeftToRight)
+        self.drive_selector.setMaximumHeight(40)
+        # The other drives are added by set_mount_points once the startup probe lists them
+        self.set_mount_points([tracker_engine.DEFAULT_SCAN_ROOT])
+        # Any number of extensions can be selected; none selected means all files
+        self.filter_selector = QListWidget()
+        self.filter_selector.setSelectionMode(QAbstractItemView.MultiSelection)
+        self.filter_selector.setFlow(QListView.LeftToRight)
+        self.filter_selector.setWrapping(True)
+        self.filter_selector.setMaximumHeight(80)
         for ext in FILTER_EXTENSIONS:
-            self.filter_selector.addItem(f"*{ext}", ext)
+            item = QListWidgetItem(f"*{ext}")
+            item.setData(Qt.UserRole, ext)
+            self.filter_selector.addItem(item)
+        self.filter_selector.itemSelectionChanged.connect(self.apply_filter)
         self.table = QTableWidget()
         self.table.setColumnCount(3)
         self.table.setHorizontalHeaderLabels(["File Path", "Size", "Change"])
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.scan_button = QPushButton("Scan Now")
         self.scan_button.clicked.connect(self.start_scan)
+        self.watch_button = QPushButton("Watch Changes")
+        self.watch_button.setCheckable(True)
+        self.watch_button.toggled.connect(self.toggle_watch)
+        btn_layout = QHBoxLayout()
+        btn_layout.addWidget(self.scan_button)
+        btn_layout.addWidget(self.watch_button)
+        self.folder_table = QTableWidget()
+        self.folder_table.setColumnCount(3)
+        self.folder_table.setHorizontalHeaderLabels(["Folder", "Size", "Growth"])
+        self.folder_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.folder_table.cellDoubleClicked.connect(self.on_folder_double_clicked)
         self.layout.addWidget(self.label)
+        self.layout.addWidget(QLabel("Drives to scan:"))
+        self.layout.addWidget(self.drive_selector)
+        self.layout.addWidget(QLabel("Filter by extension (none selected = all files):"))
         self.layout.addWidget(self.filter_selector)
         self.layout.addWidget(self.table)
-        self.layout.addWidget(self.scan_button)
-
-    def scan_folder_files(self, root_path, extensions=None):
-        file_info = {}
-        for current_root, dirs, files in os.walk(root_path, topdown=True):
-            if any(current_root.startswith(excluded) for excluded in EXCLUDED_FOLDERS):
-                dirs[:] = []
-                continue
-            for f in files:
-                try:
-                    if extensions and not any(f.lower().endswith(ext) for ext in extensions):
-                        continue
-                    path = os.path.join(current_root, f)
-                    size = os.path.getsize(path)
-                    file_info[path] = size
-                except (PermissionError, FileNotFoundError, OSError):
-                    continue
-        return file_info
-
-    def save_snapshot(self, snapshot):
-        os.makedirs(SNAPSHOT_BACKUP_DIR, exist_ok=True)
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        backup_path = os.path.join(SNAPSHOT_BACKUP_DIR, f"snapshot_{timestamp}.json")
-        with open(backup_path, 'w') as f:
-            json.dump(snapshot, f, indent=2)
-        with open(SNAPSHOT_FILE, 'w') as f:
-            json.dump(snapshot, f, indent=2)
-
-    def load_snapshot(self):
-        try:
-            with open(SNAPSHOT_FILE, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return None
+        self.layout.addWidget(QLabel("Folder growth since the previous scan (double-click to drill down):"))
+        self.layout.addWidget(self.folder_table)
+        self.layout.addLayout(btn_layout)
 
-    def compare_file_snapshots(self, old, new):
-        new_files = []
-        grown_files = []
-        deleted_files = []
-        for path, size in new.items():
-            if path not in old:
-                new_files.append((path, size))
-            else:
-                diff = size - old[path]
-                if diff > 10 * 1024 * 1024:  # 10MB threshold
-                    grown_files.append((path, diff))
-        for path in old:
-            if path not in new:
-                deleted_files.append(path)
-        return new_files, grown_files, deleted_files
+    def set_mount_points(self, mounts):
+        selected = {item.text() for item in self.drive_selector.selectedItems()}
+        self.drive_selector.clear()
+        for mount in mounts:
+            item = QListWidgetItem(mount)
+            self.drive_selector.addItem(item)
+            item.setSelected(mount in selected
+                             or os.path.normcase(mount) == os.path.normcase(tracker_engine.DEFAULT_SCAN_ROOT))
 
     def show_notification(self, title, message):
+        global toaster
+        if toaster is None:
+            from win10toast import ToastNotifier
+            toaster = ToastNotifier()
         toaster.show_toast(title, message, duration=5, threaded=True)
 
     def start_scan(self):
         if platform.system() != 'Windows':
             self.label.setText("❌ Only works on Windows")
             return
+        drives = self.selected_drives()
+        if not drives:
+            self.label.setText("Select at least one drive to scan.")
+            return
+        self.scan_requested.emit()
+        if self.scan_deferred:
+            self.label.setText("Waiting for the background scan to stop...")
+            self.scan_button.setEnabled(False)
+            self.watch_button.setEnabled(False)
+            return
         self.label.setText("Scanning...")
         self.table.setRowCount(0)
         self.scan_button.setEnabled(False)
-        selected_ext = self.filter_selector.currentData()
-        extensions = None if selected_ext is None else [selected_ext]
+        self.watch_button.setEnabled(False)
         self.thread = QThread()
-        self.worker = FolderScanWorker(extensions)
+        # Scans are never filtered; the extension index answers filters afterwards
+        self.worker = FolderScanWorker(drives)
         self.worker.moveToThread(self.thread)
         self.thread.started.connect(self.worker.run)
         self.worker.progress.connect(self.label.setText)
+        self.worker.scanned.connect(self.on_scan_stats)
+        self.worker.partial.connect(self.show_top_files)
+        self.worker.folders.connect(self.on_folder_index)
         self.worker.finished.connect(self.on_scan_finished)
         self.worker.finished.connect(self.thread.quit)
         self.worker.finished.connect(self.worker.deleteLater)
         self.thread.finished.connect(self.thread.deleteLater)
         self.thread.start()
 
-    def on_scan_finished(self, file_data, new_files, grown_files, deleted_files):
+    def defer_scan(self):
+        """Hold the scan being started until resume_scan is called"""
+        self.scan_deferred = True
+
+    def resume_scan(self):
+        self.scan_deferred = False
+        self.start_scan()
+
+    def selected_drives(self):
+        return [item.text() for item in self.drive_selector.selectedItems()]
+
+    def is_busy(self):
+        return not self.scan_button.isEnabled()
+
+    def show_background_result(self, result, errors):
+        """Show a background scan like one started here, without the notification"""
+        self.on_scan_stats(result.stats, errors)
+        self.on_folder_index(result.dir_index, result.older_dir_index)
+        self.ext_index = result.ext_index
+        self.changes = result.changes
+        if self.ext_index is not None:
+            self.update_filter_totals()
+        self.apply_filter()
+        self.label.setText(f"Background scan complete ({datetime.now():%H:%M}): {result.stats}")
+
+    def on_scan_stats(self, stats, errors):
+        self.last_scan_stats = stats
+        self.scan_errors = errors
+        lines = [f"{stats.dirs:,} folders, {stats.files:,} files, {get_human_size(stats.bytes)}",
+                 f"Unreadable folders: {stats.errors:,} ({stats.permission_errors:,} access denied)",
+                 f"CPU: {stats.user_time:.1f}s Python, {stats.system_time:.1f}s system calls"]
+        lines += [f"{name}: {seconds:.2f}s" for name, seconds in stats.stage_times.items()]
+        slowest = stats.slowest_dirs()
+        if slowest:
+            lines.append("Slowest folders:")
+            lines += [f"  {seconds * 1000:,.0f} ms  {path}" for seconds, path in slowest]
+        self.label.setToolTip("\n".join(lines))
+
+    def toggle_watch(self, checked):
+        if checked:
+            self.start_watch()
+        elif self.watch_worker is not None:
+            self.watch_worker.stop()
+
+    def start_watch(self):
+        self.scan_button.setEnabled(False)
+        self.watch_thread = QThread()
+        self.watch_worker = FolderWatchWorker(self.selected_extensions())
+        self.watch_worker.moveToThread(self.watch_thread)
+        self.watch_thread.started.connect(self.watch_worker.run)
+        self.watch_worker.progress.connect(self.label.setText)
+        self.watch_worker.changed.connect(self.on_watch_changed)
+        self.watch_worker.finished.connect(self.on_watch_finished)
+        self.watch_worker.finished.connect(self.watch_thread.quit)
+        self.watch_worker.finished.connect(self.watch_worker.deleteLater)
+        self.watch_thread.finished.connect(self.watch_thread.deleteLater)
+        self.watch_thread.start()
+
+    def on_watch_finished(self):
+        self.watch_worker = None
+        self.watch_button.setChecked(False)
+        self.scan_button.setEnabled(True)
+
+    def selected_extensions(self):
+        return [item.data(Qt.UserRole) for item in self.filter_selector.selectedItems()] or None
+
+    def apply_filter(self):
+        extensions = self.selected_extensions()
+        if self.watch_worker is not None:
+            self.watch_worker.extensions = extensions
+        if self.ext_index is not None:
+            self.top_files = self.ext_index.largest(extensions)
+        self.refresh_changes()
+
+    def refresh_changes(self):
+        extensions = self.selected_extensions()
+        self.show_changes(self.top_files, *extension_index.filter_changes(*self.changes, extensions))
+
+    def update_filter_totals(self):
+        for row in range(self.filter_selector.count()):
+            item = self.filter_selector.item(row)
+            ext = item.data(Qt.UserRole)
+            files, size = self.ext_index.totals.get(ext, (0, 0))
+            item.setText(f"*{ext} ({files:,} files, {get_human_size(size)})")
+
+    def on_watch_changed(self, top_files, new_files, grown_files, deleted_files):
+        # The watcher already applies the current filter to its largest files
+        self.top_files = top_files
+        self.changes = (new_files, grown_files, deleted_files)
+        self.refresh_changes()
+
+    def on_scan_finished(self, ext_index, new_files, grown_files, deleted_files):
+        self.ext_index = ext_index
+        self.changes = (new_files, grown_files, deleted_files)
+        if ext_index is not None:
+            self.update_filter_totals()
+        self.apply_filter()
+        text = f"Scan complete: {self.last_scan_stats}"
+        if self.scan_errors:
+            text += " — failed: " + ", ".join(f"{mount} ({error})" for mount, error in self.scan_errors.items())
+        self.label.setText(text)
+        self.show_notification("File Scan Complete", f"{len(new_files)} new, {len(grown_files)} grew, {len(deleted_files)} deleted.")
+        self.scan_button.setEnabled(True)
+        self.watch_button.setEnabled(True)
+
+    def on_folder_index(self, dir_index, older_dir_index):
+        self.dir_index = dir_index
+        self.older_dir_index = older_dir_index
+        self.show_folder_level(None)
+
+    def show_folder_level(self, path):
+        # path None lists the scanned drives themselves, which have no folder above them
+        self.folder_path = path
+        self.folder_table.setRowCount(0)
+        if path is None:
+            roots = self.dir_index.roots()
+            if len(roots) == 1:
+                self.show_folder_level(roots[0])
+                return
+            rows = sorted((self.dir_index.growth(root, self.older_dir_index) for root in roots),
+                          key=lambda growth: growth.growth, reverse=True)
+        else:
+            rows = [self.dir_index.growth(path, self.older_dir_index)]
+            rows += self.dir_index.drill(self.older_dir_index, path, TOP_FOLDERS_COUNT)
+        for growth in rows:
+            row = self.folder_table.rowCount()
+            self.folder_table.insertRow(row)
+            self.folder_table.setItem(row, 0, QTableWidgetItem(growth.path))
+            self.folder_table.setItem(row, 1, QTableWidgetItem(get_human_size(growth.size)))
+            sign = "+" if growth.growth >= 0 else "-"
+            self.folder_table.setItem(row, 2, QTableWidgetItem(f"{sign}{get_human_size(abs(growth.growth))}"))
+
+    def on_folder_double_clicked(self, row, _column):
+        path = self.folder_table.item(row, 0).text()
+        if row == 0 and self.folder_path is not None:
+            # The first row is the folder being shown; double-clicking it goes back up
+            parent = tracker_engine.parent_directory(path, self.dir_index.totals)
+            if parent is None:
+                path = None if len(self.dir_index.roots()) > 1 else path
+            else:
+                path = parent
+        self.show_folder_level(path)
+
+    def show_top_files(self, top_files):
+        extensions = extension_index.normalize_extensions(self.selected_extensions())
+        if extensions is not None:
+            top_files = [item for item in top_files if tracker_engine.file_extension(item[0]) in extensions]
+        self.show_changes(top_files, [], [], [])
+
+    def show_changes(self, top_files, new_files, grown_files, deleted_files):
         self.table.setRowCount(0)
-        top_files = sorted(file_data.items(), key=lambda x: x[1], reverse=True)[:20]
         change_map = {path: "" for path, _ in top_files}
         for path, _ in new_files:
             change_map[path] = "🆕 New"
@@ -512,84 +1209,244 @@ class StorageApp(QWidget):
             self.table.setItem(row, 0, QTableWidgetItem(path))
             self.table.setItem(row, 1, QTableWidgetItem("—"))
             self.table.setItem(row, 2, QTableWidgetItem("❌ Deleted"))
+        top_paths = {path for path, _ in top_files}
         for path, size in new_files:
-            if path not in dict(top_files):
+            if path not in top_paths:
                 row = self.table.rowCount()
                 self.table.insertRow(row)
                 self.table.setItem(row, 0, QTableWidgetItem(path))
                 self.table.setItem(row, 1, QTableWidgetItem(get_human_size(size)))
                 self.table.setItem(row, 2, QTableWidgetItem("🆕 New"))
-        self.label.setText("Scan complete.")
-        self.show_notification("File Scan Complete", f"{len(new_files)} new, {len(grown_files)} grew, {len(deleted_files)} deleted.")
-        self.scan_button.setEnabled(True)
 
 class FolderScanWorker(QObject):
+    # Only the largest files of each extension cross the thread boundary, never the whole scan
     finished = Signal(object, object, object, object)
     progress = Signal(str)
+    scanned = Signal(object, object)
+    partial = Signal(object)
+    folders = Signal(object, object)
+
+    def __init__(self, root_paths=(tracker_engine.DEFAULT_SCAN_ROOT,), workers=SCAN_WORKERS):
+        super().__init__()
+        # The default drive keeps SNAPSHOT_FILE, so watch mode still sees it
+        self.tracker = file_tracker.VolumeTracker(list(root_paths), SNAPSHOT_FILE, SNAPSHOT_HISTORY_DIR,
+                                                  EXCLUDED_FOLDERS, workers, TOP_FILES_COUNT, LEGACY_SNAPSHOT_FILE)
+
+    def run(self):
+        self.progress.emit(f"Scanning {', '.join(self.tracker.trackers)} for file changes...")
+        # ScanStats throttles itself, so the label only gets a few updates per second
+        results, errors = self.tracker.scan(
+            on_partial=self.partial.emit,
+            on_progress=lambda stats: self.progress.emit(f"Scanning: {stats.progress_text()}"),
+            profile_dirs=PROFILE_SLOWEST_DIRS)
+        result = file_tracker.merge_results(results.values(), TOP_FILES_COUNT)
+        self.scanned.emit(result.stats, errors)
+        self.folders.emit(result.dir_index, result.older_dir_index)
+        self.finished.emit(result.ext_index, *result.changes)
+
+class BackgroundScanWorker(QObject):
+    """Scans the drives and enumerates the cleaner's rule categories at background priority, rate limited"""
+    finished = Signal(object, object, object, bool)
 
-    def __init__(self, extensions):
+    def __init__(self, root_paths, rule_set):
         super().__init__()
+        self.tracker = file_tracker.VolumeTracker(list(root_paths), SNAPSHOT_FILE, SNAPSHOT_HISTORY_DIR,
+                                                  EXCLUDED_FOLDERS, BACKGROUND_SCAN_WORKERS, TOP_FILES_COUNT,
+                                                  LEGACY_SNAPSHOT_FILE)
+        self.rule_set = rule_set
+        self.cancel_event = threading.Event()
+        self.pacer = background_scan.ScanPacer(BACKGROUND_FILES_PER_SECOND, BACKGROUND_SYSCALLS_PER_SECOND,
+                                               cancel=self.cancel_event)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        result = None
+        errors = {}
+        previews = {}
+        try:
+            background_scan.lower_thread_priority()
+            results, errors = self.tracker.scan(pacer=self.pacer, checkpoint_interval=BACKGROUND_CHECKPOINT_INTERVAL,
+                                                cancel=self.cancel_event)
+            result = file_tracker.merge_results(results.values(), TOP_FILES_COUNT) if results else None
+            previews = {} if self.cancel_event.is_set() else self.enumerate_previews()
+        except Exception as e:
+            print(f"Error during background scan: {e}")
+            errors = dict(errors, background=e)
+        finally:
+            # The tray only starts another background scan once this one reported back
+            self.finished.emit(result, errors, previews, self.cancel_event.is_set())
+
+    def enumerate_previews(self):
+        started = time.perf_counter()
+        created = time.time()
+        found = {name: [] for name in self.rule_set.categories}
+        try:
+            for name, record in self.rule_set.walk():
+                if self.cancel_event.is_set():
+                    return {}
+                found[name].append(record)
+                self.pacer.pace(1, 1)
+        except Exception as e:
+            print(f"Error enumerating cleanup categories: {e}")
+            return {}
+        elapsed = time.perf_counter() - started
+        return {name: preview_cache.PreviewEntry.build(records, created, elapsed) for name, records in found.items()}
+
+class FolderWatchWorker(QObject):
+    changed = Signal(object, object, object, object)
+    progress = Signal(str)
+    finished = Signal()
+
+    def __init__(self, extensions=None, root_path=tracker_engine.DEFAULT_SCAN_ROOT):
+        super().__init__()
+        # Set from the GUI thread whenever the filter changes; only the largest files depend on it
         self.extensions = extensions
+        self.root_path = root_path
+        self.running = True
+
+    def stop(self):
+        # Called from the GUI thread; the watch loop checks it between polls
+        self.running = False
 
     def run(self):
-        self.progress.emit("Scanning C:\\ for file changes...")
-        current = self.scan_folder_files(r"C:", self.extensions)
-        previous = self.load_snapshot()
-        if previous:
-            new, grown, deleted = self.compare_file_snapshots(previous, current)
-        else:
-            new, grown, deleted = [], [], []
-        self.save_snapshot(current)
-        self.finished.emit(current, new, grown, deleted)
-
-    def scan_folder_files(self, root_path, extensions=None):
-        file_info = {}
-        for current_root, dirs, files in os.walk(root_path, topdown=True):
-            if any(current_root.startswith(excluded) for excluded in EXCLUDED_FOLDERS):
-                dirs[:] = []
-                continue
-            for f in files:
-                try:
-                    if extensions and not any(f.lower().endswith(ext) for ext in extensions):
-                        continue
-                    path = os.path.join(current_root, f)
-                    size = os.path.getsize(path)
-                    file_info[path] = size
-                except (PermissionError, FileNotFoundError, OSError):
-                    continue
-        return file_info
-
-    def save_snapshot(self, snapshot):
-        os.makedirs(SNAPSHOT_BACKUP_DIR, exist_ok=True)
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        backup_path = os.path.join(SNAPSHOT_BACKUP_DIR, f"snapshot_{timestamp}.json")
-        with open(backup_path, 'w') as f:
-            json.dump(snapshot, f, indent=2)
-        with open(SNAPSHOT_FILE, 'w') as f:
-            json.dump(snapshot, f, indent=2)
-
-    def load_snapshot(self):
         try:
-            with open(SNAPSHOT_FILE, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return None
+            # Loaded as a PathTrie: the watcher keeps the baseline for the whole session
+            baseline = snapshot_format.read_snapshot_trie(SNAPSHOT_FILE)
+        except (FileNotFoundError, snapshot_format.SnapshotFormatError):
+            self.progress.emit("Run a scan before watching for changes.")
+            self.finished.emit()
+            return
+        watcher = tracker_watch.SnapshotWatcher(self.root_path, baseline, EXCLUDED_FOLDERS)
+        try:
+            watcher.start()
+        except (OSError, NotImplementedError) as e:
+            self.progress.emit(f"❌ Cannot watch {self.root_path}: {e}")
+            self.finished.emit()
+            return
+        self.progress.emit(f"Watching {self.root_path} for changes...")
+        last_update = 0.0
+        pending = False
+        try:
+            while self.running:
+                if watcher.poll(0.5):
+                    pending = True
+                if pending and time.monotonic() - last_update >= WATCH_UPDATE_INTERVAL:
+                    self.changed.emit(watcher.largest(TOP_FILES_COUNT, self.extensions), *watcher.diff())
+                    self.progress.emit(f"Watching {self.root_path}: {watcher.events_seen:,} changes seen")
+                    last_update = time.monotonic()
+                    pending = False
+        finally:
+            watcher.close()
+        self.finished.emit()
 
-    def compare_file_snapshots(self, old, new):
-        new_files = []
-        grown_files = []
-        deleted_files = []
-        for path, size in new.items():
-            if path not in old:
-                new_files.append((path, size))
-            else:
-                diff = size - old[path]
-                if diff > 10 * 1024 * 1024:  # 10MB threshold
-                    grown_files.append((path, diff))
-        for path in old:
-            if path not in new:
-                deleted_files.append(path)
-        return new_files, grown_files, deleted_files
+class DuplicateWorker(QObject):
+    progress = Signal(str, int, int)
+    finished = Signal(object, bool)
+
+    def __init__(self, snapshot_files=(SNAPSHOT_FILE,), min_size=DUPLICATE_MIN_SIZE, workers=HASH_WORKERS):
+        super().__init__()
+        self.snapshot_files = list(snapshot_files)
+        self.min_size = min_size
+        self.workers = workers
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        # Called from the GUI thread; find_duplicates checks it between files
+        self.cancel_event.set()
+
+    def run(self):
+        cache = duplicate_finder.HashCache(HASH_CACHE_FILE)
+        try:
+            groups = duplicate_finder.find_duplicates(self.snapshot_files, cache, self.min_size, self.workers,
+                                                      on_progress=self.progress.emit, cancel=self.cancel_event)
+        except (OSError, snapshot_format.SnapshotFormatError):
+            groups = None
+        else:
+            cache.save()
+        self.finished.emit(groups, self.cancel_event.is_set())
+
+class DuplicateFinder(QWidget):
+    def __init__(self, selected_drives=None):
+        """selected_drives() returns the Tracker's selected drives, whose snapshots are searched together"""
+        super().__init__()
+        self.layout = QVBoxLayout()
+        self.setLayout(self.layout)
+        self.selected_drives = selected_drives
+        self.worker = None
+        self.init_ui()
+
+    def init_ui(self):
+        self.label = QLabel("Find files with identical contents in the latest Tracker scans of the selected drives")
+        self.tree = QTreeWidget()
+        self.tree.setColumnCount(3)
+        self.tree.setHeaderLabels(["Duplicate Group / File", "Copies", "Reclaimable"])
+        self.tree.header().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.find_button = QPushButton("Find Duplicates")
+        self.find_button.clicked.connect(self.start_search)
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_search)
+        btn_layout = QHBoxLayout()
+        btn_layout.addWidget(self.find_button)
+        btn_layout.addWidget(self.cancel_button)
+        self.layout.addWidget(self.label)
+        self.layout.addWidget(self.tree)
+        self.layout.addLayout(btn_layout)
+
+    def snapshot_files(self):
+        drives = self.selected_drives() if self.selected_drives is not None else []
+        if not drives:
+            return [SNAPSHOT_FILE] if os.path.exists(SNAPSHOT_FILE) else []
+        files = [file_tracker.volume_files(drive, SNAPSHOT_FILE, SNAPSHOT_HISTORY_DIR)[0] for drive in drives]
+        return [snapshot_file for snapshot_file in files if os.path.exists(snapshot_file)]
+
+    def start_search(self):
+        snapshot_files = self.snapshot_files()
+        if not snapshot_files:
+            self.label.setText("Run a Tracker scan of the selected drives before looking for duplicates.")
+            return
+        self.tree.clear()
+        self.label.setText(f"Looking for duplicates of {get_human_size(DUPLICATE_MIN_SIZE)} or more...")
+        self.find_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        self.thread = QThread()
+        self.worker = DuplicateWorker(snapshot_files)
+        self.worker.moveToThread(self.thread)
+        self.thread.started.connect(self.worker.run)
+        self.worker.progress.connect(self.on_search_progress)
+        self.worker.finished.connect(self.on_search_finished)
+        self.worker.finished.connect(self.thread.quit)
+        self.worker.finished.connect(self.worker.deleteLater)
+        self.thread.finished.connect(self.thread.deleteLater)
+        self.thread.start()
+
+    def cancel_search(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.cancel_button.setEnabled(False)
+
+    def on_search_progress(self, stage, done, total):
+        step = "Comparing file heads and tails" if stage == duplicate_finder.PARTIAL else "Hashing whole files"
+        self.label.setText(f"{step}: {done:,} of {total:,}")
+
+    def on_search_finished(self, groups, cancelled):
+        self.worker = None
+        self.find_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+        if groups is None:
+            self.label.setText("❌ Could not read the Tracker snapshots.")
+            return
+        for group in groups:
+            item = QTreeWidgetItem([f"{get_human_size(group.size)} each", str(len(group.paths)),
+                                    get_human_size(group.reclaimable)])
+            for path in group.paths:
+                item.addChild(QTreeWidgetItem([path, "", ""]))
+            self.tree.addTopLevelItem(item)
+        total = sum(group.reclaimable for group in groups)
+        state = "Search cancelled" if cancelled else "Search complete"
+        self.label.setText(f"{state}: {len(groups):,} duplicate groups, {get_human_size(total)} reclaimable")
 
 # Main Application
 class MainApp(QMainWindow):
@@ -601,9 +1458,24 @@ class MainApp(QMainWindow):
         self.setCentralWidget(self.tab_widget)
         self.cleaner_tab = StorageCleaner()
         self.tracker_tab = StorageApp()
+        self.duplicates_tab = DuplicateFinder(self.tracker_tab.selected_drives)
         self.tab_widget.addTab(self.cleaner_tab, "🧹 Cleaner")
         self.tab_widget.addTab(self.tracker_tab, "📁 Tracker")
+        self.tab_widget.addTab(self.duplicates_tab, "🧬 Duplicates")
         self.init_system_tray()
+        self.cleaner_tab.mounts_found.connect(self.tracker_tab.set_mount_points)
+        self.background_thread = None
+        self.background_worker = None
+        self.background_schedule = background_scan.BackgroundSchedule(BACKGROUND_SCAN_INTERVAL_HOURS,
+                                                                      BACKGROUND_IDLE_MINUTES)
+        # Both would write the same snapshot files, so a scan started by hand waits for the background one to stop
+        self.tracker_tab.scan_requested.connect(self.on_scan_requested)
+        QApplication.instance().aboutToQuit.connect(self.stop_background_scan)
+        self.background_timer = QTimer(self)
+        self.background_timer.timeout.connect(self.check_background_schedule)
+        self.background_timer.start(BACKGROUND_CHECK_MS)
+        # Runs once the event loop has painted the window
+        QTimer.singleShot(0, self.cleaner_tab.start_probes)
 
     def init_system_tray(self):
         # Load icon from file
@@ -618,13 +1490,109 @@ class MainApp(QMainWindow):
         tray_menu = QMenu()
         restore_action = QAction("Restore", self)
         restore_action.triggered.connect(self.show)
+        self.background_action = QAction("Background Scans", self)
+        self.background_action.setCheckable(True)
+        self.background_action.setChecked(BACKGROUND_SCANS_ENABLED)
+        self.background_action.setToolTip(f"Scan every {BACKGROUND_SCAN_INTERVAL_HOURS} hours, or after "
+                                          f"{BACKGROUND_IDLE_MINUTES} idle minutes, at low priority")
+        self.background_action.toggled.connect(self.on_background_toggled)
+        scan_now_action = QAction("Scan in Background Now", self)
+        scan_now_action.triggered.connect(lambda: self.start_background_scan("requested"))
         exit_action = QAction("Exit", self)
         exit_action.triggered.connect(QApplication.instance().quit)
         tray_menu.addAction(restore_action)
+        tray_menu.addAction(self.background_action)
+        tray_menu.addAction(scan_now_action)
         tray_menu.addAction(exit_action)
         self.tray_icon.setContextMenu(tray_menu)
         self.tray_icon.show()
 
+    def background_state(self, drives):
+        """Return (time of the oldest last scan of drives, or None if one was never scanned, whether one was interrupted)"""
+        oldest = float("inf")
+        interrupted = False
+        for drive in drives:
+            snapshot_file = file_tracker.volume_files(drive, SNAPSHOT_FILE, SNAPSHOT_HISTORY_DIR)[0]
+            interrupted = interrupted or os.path.exists(file_tracker.checkpoint_files(snapshot_file)[1])
+            try:
+                with snapshot_format.SnapshotReader(snapshot_file) as reader:
+                    oldest = min(oldest, reader.scanned_at)
+            except (OSError, snapshot_format.SnapshotFormatError):
+                oldest = 0.0
+        return (oldest or None) if oldest != float("inf") else None, interrupted
+
+    def check_background_schedule(self):
+        if not self.background_action.isChecked() or self.background_thread is not None:
+            return
+        last_scan, interrupted = self.background_state(self.tracker_tab.selected_drives())
+        reason = self.background_schedule.due(last_scan, idle=background_scan.idle_seconds(),
+                                              interrupted=interrupted)
+        if reason is not None:
+            self.start_background_scan(reason)
+
+    def start_background_scan(self, reason):
+        # Scans started by hand (and watch mode) come first
+        if self.background_thread is not None or self.tracker_tab.is_busy():
+            return
+        drives = self.tracker_tab.selected_drives()
+        if not drives:
+            return
+        self.tray_icon.setToolTip(f"Storage Cleaner & File Tracker — background scan ({reason})")
+        self.background_thread = QThread()
+        self.background_worker = BackgroundScanWorker(drives, self.cleaner_tab.rule_set)
+        self.background_worker.moveToThread(self.background_thread)
+        self.background_thread.started.connect(self.background_worker.run)
+        self.background_worker.finished.connect(self.on_background_finished)
+        self.background_worker.finished.connect(self.background_thread.quit)
+        self.background_worker.finished.connect(self.background_worker.deleteLater)
+        self.background_thread.finished.connect(self.background_thread.deleteLater)
+        self.background_thread.start()
+
+    def on_background_toggled(self, checked):
+        if not checked:
+            self.cancel_background_scan()
+
+    def cancel_background_scan(self):
+        # The scan stops at its next folder, leaving a checkpoint the next background scan resumes from
+        if self.background_worker is not None:
+            self.background_worker.cancel()
+
+    def on_scan_requested(self):
+        # The GUI does not wait for the checkpoint to be written; on_background_finished starts the scan
+        if self.background_thread is not None:
+            self.tracker_tab.defer_scan()
+            self.cancel_background_scan()
+
+    def stop_background_scan(self):
+        # Only on quit, where the checkpoint must be written before the process ends
+        if self.background_thread is not None:
+            self.cancel_background_scan()
+            # finished -> quit is queued to this (blocked) thread, so the thread is told to quit here;
+            # its event loop then ends as soon as the cancelled run returns
+            self.background_thread.quit()
+            self.background_thread.wait()
+
+    def on_background_finished(self, result, errors, previews, cancelled):
+        self.background_thread = None
+        self.background_worker = None
+        self.tray_icon.setToolTip("Storage Cleaner & File Tracker")
+        if self.tracker_tab.scan_deferred:
+            self.tracker_tab.resume_scan()
+        if cancelled:
+            return
+        for name, entry in previews.items():
+            # A preview the user is waiting for is newer than this one
+            if not any(name in worker.generations for _, worker in self.cleaner_tab.preview_jobs.values()):
+                self.cleaner_tab.preview_cache.put(name, entry)
+        self.cleaner_tab.update_preview_summary()
+        if result is not None and not self.tracker_tab.is_busy():
+            self.tracker_tab.show_background_result(result, errors)
+        if result is not None:
+            new_files, grown_files, deleted_files = result.changes
+            self.tray_icon.showMessage("Background Scan Complete",
+                                       f"{len(new_files)} new, {len(grown_files)} grew, {len(deleted_files)} deleted.",
+                                       QSystemTrayIcon.Information, 5000)
+
     def closeEvent(self, event):
         event.ignore()
         self.hide()
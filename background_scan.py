@@ -0,0 +1,177 @@
+"""Low-impact background scans: lowered priority, rate limits and an interval/idle schedule.
+
+A ScanPacer is handed to the tracker_engine scans as their pacer. Every scanning
+thread is moved to background priority when it starts, and after each directory
+listing the pacer holds the scan to a files-per-second and a syscalls-per-second
+budget, so a scan of a busy server trickles along instead of competing with the
+foreground workload. Interrupted scans resume from the checkpoints FileTracker
+writes (see tracker_engine.ScanFrontier).
+"""
+import os
+import sys
+import threading
+import time
+
+# Background scans read at most this many files and make at most this many syscalls per second (0 = no limit)
+DEFAULT_FILES_PER_SECOND = 2000
+DEFAULT_SYSCALLS_PER_SECOND = 5000
+# Hours between scheduled scans, and minutes without keyboard or mouse input that count as idle
+DEFAULT_SCAN_INTERVAL_HOURS = 6
+DEFAULT_IDLE_MINUTES = 10
+# An idle machine is scanned at most this often
+DEFAULT_IDLE_GAP_HOURS = 1
+# Seconds between checkpoints of a background scan
+DEFAULT_CHECKPOINT_INTERVAL = 60.0
+
+# Nice value of background threads and processes (the lowest priority on Linux)
+LOW_NICE = 19
+# SetThreadPriority mode lowering the CPU, I/O and memory priority of the calling thread
+_THREAD_MODE_BACKGROUND_BEGIN = 0x00010000
+
+
+def lower_thread_priority():
+    """Move the calling thread to background priority; returns whether that worked.
+
+    Windows has a background mode for threads that lowers their CPU, I/O and memory priority.
+    On Linux the nice value is per thread, and the CFQ and BFQ I/O schedulers derive the I/O
+    priority of a thread from it. Unprivileged processes cannot raise it again, so call this
+    on a thread that ends with the job.
+    """
+    if os.name == "nt":
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        return bool(kernel32.SetThreadPriority(kernel32.GetCurrentThread(), _THREAD_MODE_BACKGROUND_BEGIN))
+    if sys.platform.startswith("linux"):
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), LOW_NICE)
+            return True
+        except OSError:
+            return False
+    return False
+
+
+def lower_process_priority():
+    """Lower the CPU and I/O priority of the whole process, for headless scans.
+
+    Threads started afterwards inherit it. Uses psutil when it is installed (idle I/O class);
+    without it only the nice value is raised. Returns whether anything was changed.
+    """
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        process = psutil.Process()
+        try:
+            if os.name == "nt":
+                process.nice(psutil.IDLE_PRIORITY_CLASS)
+                process.ionice(psutil.IOPRIO_VERYLOW)
+            else:
+                process.nice(LOW_NICE)
+                if hasattr(psutil, "IOPRIO_CLASS_IDLE"):
+                    process.ionice(psutil.IOPRIO_CLASS_IDLE)
+            return True
+        except (psutil.Error, OSError):
+            return False
+    if hasattr(os, "nice"):
+        try:
+            os.nice(max(0, LOW_NICE - os.nice(0)))
+            return True
+        except OSError:
+            return False
+    return False
+
+
+class RateLimiter:
+    """Token bucket of rate units per second, shared by any number of threads.
+
+    Bursts of up to one second's worth go through at once; beyond that take() sleeps until the
+    units are earned, or until cancel is set.
+    """
+
+    def __init__(self, rate, cancel=None):
+        self.rate = rate
+        self.cancel = cancel
+        self._tokens = rate
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, units):
+        if not self.rate or units <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate) - units
+            self._updated = now
+            # The units are reserved now, so threads queue up behind each other instead of racing
+            wait = -self._tokens / self.rate
+        if wait > 0:
+            if self.cancel is not None:
+                self.cancel.wait(wait)
+            else:
+                time.sleep(wait)
+
+
+class ScanPacer:
+    """Scan pacing for tracker_engine: background priority per scanning thread and rate limits.
+
+    Setting cancel ends any wait at once, so a cancelled scan reaches its next checkpoint quickly.
+    """
+
+    def __init__(self, files_per_second=DEFAULT_FILES_PER_SECOND, syscalls_per_second=DEFAULT_SYSCALLS_PER_SECOND,
+                 low_priority=True, cancel=None):
+        self.low_priority = low_priority
+        self.files = RateLimiter(files_per_second, cancel)
+        self.syscalls = RateLimiter(syscalls_per_second, cancel)
+
+    def start_thread(self):
+        if self.low_priority:
+            lower_thread_priority()
+
+    def pace(self, files, syscalls):
+        self.files.take(files)
+        self.syscalls.take(syscalls)
+
+
+def idle_seconds():
+    """Return the seconds since the last keyboard or mouse input, or None where that is unknown"""
+    if os.name != "nt":
+        return None
+    import ctypes
+    from ctypes import wintypes
+
+    class LASTINPUTINFO(ctypes.Structure):
+        _fields_ = [("cbSize", wintypes.UINT), ("dwTime", wintypes.DWORD)]
+
+    info = LASTINPUTINFO(ctypes.sizeof(LASTINPUTINFO), 0)
+    if not ctypes.windll.user32.GetLastInputInfo(ctypes.byref(info)):
+        return None
+    # Both are 32-bit tick counts, so the difference survives the wraparound every 49.7 days
+    return ((ctypes.windll.kernel32.GetTickCount() - info.dwTime) & 0xFFFFFFFF) / 1000.0
+
+
+class BackgroundSchedule:
+    """Decides when a background scan is due: every interval, or sooner once the machine is idle"""
+
+    def __init__(self, interval_hours=DEFAULT_SCAN_INTERVAL_HOURS, idle_minutes=DEFAULT_IDLE_MINUTES,
+                 idle_gap_hours=DEFAULT_IDLE_GAP_HOURS):
+        self.interval = interval_hours * 3600
+        self.idle_after = idle_minutes * 60
+        self.idle_gap = idle_gap_hours * 3600
+
+    def due(self, last_scan, now=None, idle=None, interrupted=False):
+        """Return why a scan is due ("interval", "idle" or "resume"), or None.
+
+        last_scan is the time of the last completed scan (None before the first one), idle the
+        seconds without user input (None when unknown) and interrupted whether a checkpoint waits.
+        """
+        if now is None:
+            now = time.time()
+        idle_now = idle is not None and idle >= self.idle_after
+        if interrupted and (idle is None or idle_now):
+            return "resume"
+        if last_scan is None or now - last_scan >= self.interval:
+            return "interval"
+        if idle_now and now - last_scan >= self.idle_gap:
+            return "idle"
+        return None
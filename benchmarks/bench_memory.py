@@ -0,0 +1,105 @@
+"""Memory of an in-memory snapshot: {path: size} + {path: mtime} dicts against a PathTrie.
+
+Paths are generated in memory with the shape of a Windows profile (deep AppData
+folders with long shared prefixes), so no files are created. With --root an
+existing folder is scanned instead. Run from the repository root:
+
+    python benchmarks/bench_memory.py --files 1000000
+    python benchmarks/bench_memory.py --root /usr
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import path_trie
+import tracker_engine
+
+APP_FOLDERS = [
+    r"AppData\Local\Google\Chrome\User Data\Default\Cache\Cache_Data",
+    r"AppData\Local\Microsoft\Edge\User Data\Default\Service Worker\CacheStorage",
+    r"AppData\Local\Packages\Microsoft.WindowsStore_8wekyb3d8bbwe\LocalCache\Local\Microsoft",
+    r"AppData\Roaming\Code\User\workspaceStorage",
+    r"AppData\Local\npm-cache\_cacache\content-v2\sha512",
+    r"Documents\Projects\storage-cleaner\node_modules",
+]
+EXTENSIONS = (".dll", ".json", ".js", ".dat", ".png", ".log", "")
+
+
+def generate_records(file_count, seed=0, sep="\\"):
+    """Yield (path, size, mtime) for file_count files spread over a few deep profile folders"""
+    rng = random.Random(seed)
+    users = [f"C:\\Users\\user{index:02d}" for index in range(4)]
+    produced = 0
+    while produced < file_count:
+        folder = sep.join([rng.choice(users), rng.choice(APP_FOLDERS).replace("\\", sep)]
+                          + [f"{rng.getrandbits(16):04x}" for _ in range(rng.randint(1, 4))])
+        for index in range(min(rng.randint(1, 200), file_count - produced)):
+            yield f"{folder}{sep}f{index:05d}{rng.choice(EXTENSIONS)}", rng.getrandbits(24), 1.6e9 + rng.random() * 3e7
+            produced += 1
+
+
+def scanned_records(root):
+    for rec in tracker_engine.iter_file_records(root):
+        yield rec.path, rec.size, rec.mtime
+
+
+def build_dicts(records):
+    sizes = {}
+    mtimes = {}
+    for path, size, mtime in records:
+        sizes[path] = size
+        mtimes[path] = mtime
+    return sizes, mtimes
+
+
+def build_trie(records, sep):
+    return path_trie.PathTrie.from_items(records, sep)
+
+
+def measure(build, records):
+    """Return (structure, bytes still allocated, peak bytes, seconds) for building from records"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    structure = build(records)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return structure, current, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=500_000, help="Generated files (ignored with --root)")
+    parser.add_argument("--root", help="Scan this folder instead of generating paths")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sep = os.sep if args.root else "\\"
+
+    def records():
+        return scanned_records(args.root) if args.root else generate_records(args.files, args.seed, sep)
+
+    results = {}
+    structures = {}
+    for name, build in (("dict", build_dicts), ("trie", lambda rows: build_trie(rows, sep))):
+        structures[name], current, peak, elapsed = measure(build, records())
+        results[name] = (current, peak, elapsed)
+    files = len(structures["trie"])
+    for name, (current, peak, elapsed) in results.items():
+        print(f"{name:<5} {files:>10,} files {current / 1024 ** 2:9.1f} MB held {peak / 1024 ** 2:9.1f} MB peak "
+              f"{current / max(files, 1):7.1f} B/file {elapsed:7.2f}s")
+    print(f"trie holds {results['trie'][0] / max(results['dict'][0], 1):.0%} of the dict memory")
+    # Both must describe the same snapshot
+    sizes, mtimes = structures["dict"]
+    trie = structures["trie"]
+    assert len(sizes) == len(trie) and all(trie.get(path) == size for path, size in sizes.items())
+
+
+if __name__ == "__main__":
+    main()
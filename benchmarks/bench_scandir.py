@@ -0,0 +1,109 @@
+"""Compare the os.scandir scan engine against the old os.walk + os.path.getsize scan.
+
+Builds a synthetic tree (1M files by default) and times both scans over it.
+Linux only, run from the repository root:
+
+    python benchmarks/bench_scandir.py --files 1000000 --workers 2 4 8 16
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import tracker_engine
+
+
+def build_tree(root, file_count, files_per_dir=1000, dirs_per_level=32):
+    """Create file_count sparse files spread over a two-level directory tree"""
+    created = 0
+    dir_index = 0
+    while created < file_count:
+        folder = os.path.join(root, f"d{dir_index // dirs_per_level:04d}", f"d{dir_index % dirs_per_level:03d}")
+        os.makedirs(folder, exist_ok=True)
+        for i in range(min(files_per_dir, file_count - created)):
+            path = os.path.join(folder, f"f{i:05d}.dat")
+            with open(path, "wb") as f:
+                f.truncate((created * 7919) % 65536)
+            created += 1
+        dir_index += 1
+    return created
+
+
+def legacy_scan(root_path):
+    # The original FolderScanWorker.scan_folder_files loop
+    file_info = {}
+    for current_root, dirs, files in os.walk(root_path, topdown=True):
+        for f in files:
+            try:
+                path = os.path.join(current_root, f)
+                file_info[path] = os.path.getsize(path)
+            except OSError:
+                continue
+    return file_info
+
+
+def scandir_scan(root_path):
+    return tracker_engine.scan_folder_files(root_path)
+
+
+def parallel_scan(workers):
+    def scan(root_path):
+        return tracker_engine.scan_folder_files(root_path, workers=workers)
+    return scan
+
+
+def best_of(func, root, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(root)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, nargs="*", default=[],
+                        help="Also time the thread-pool scan with each of these pool sizes")
+    parser.add_argument("--root", help="Reuse or create the tree here instead of a temp directory")
+    parser.add_argument("--keep", action="store_true", help="Do not delete the tree afterwards")
+    args = parser.parse_args()
+
+    if not sys.platform.startswith("linux"):
+        sys.exit("This benchmark is meant to run on Linux.")
+
+    root = args.root or tempfile.mkdtemp(prefix="scan_bench_")
+    try:
+        if not os.listdir(root):
+            start = time.perf_counter()
+            build_tree(root, args.files)
+            print(f"Built {args.files} files in {time.perf_counter() - start:.1f}s under {root}")
+
+        legacy_time, legacy = best_of(legacy_scan, root, args.repeat)
+        scandir_time, current = best_of(scandir_scan, root, args.repeat)
+        if legacy != current:
+            sys.exit("Scan results differ between os.walk and os.scandir engines!")
+
+        count = len(current)
+        print(f"os.walk + getsize : {legacy_time:8.2f}s  {count / legacy_time:12,.0f} files/s")
+        print(f"os.scandir engine : {scandir_time:8.2f}s  {count / scandir_time:12,.0f} files/s")
+        print(f"Speedup           : {legacy_time / scandir_time:8.2f}x over {count} files")
+        for workers in args.workers:
+            parallel_time, result = best_of(parallel_scan(workers), root, args.repeat)
+            if result != current:
+                sys.exit(f"Parallel scan with {workers} workers differs from the serial scan!")
+            print(f"{workers:2d} worker threads : {parallel_time:8.2f}s  {count / parallel_time:12,.0f} files/s")
+    finally:
+        if not args.keep and not args.root:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Cold-start benchmark: import time of the app, broken down by module, and time to a shown window.
+
+Each run starts a fresh interpreter with -X importtime, so nothing is cached
+between runs except by the OS. The report gives the median wall time, the
+modules the app imports directly ranked by cumulative time, and the modules
+with the most time of their own. Both only count the app's import tree, not what
+the interpreter imports at startup (site, encodings). Run from the repository root:
+
+    python benchmarks/bench_startup.py --runs 7
+    python benchmarks/bench_startup.py --module file_tracker --top 20
+    python benchmarks/bench_startup.py --window --output startup.json
+
+--window also times QApplication, MainApp and the first shown frame (needs
+PySide6; the offscreen platform is used unless QT_QPA_PLATFORM is set).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WINDOW_SNIPPET = """
+import json, time
+started = time.perf_counter()
+import Cry4pt
+imported = time.perf_counter()
+app = Cry4pt.QApplication([])
+Cry4pt.apply_dark_mode(app)
+created = time.perf_counter()
+window = Cry4pt.MainApp()
+built = time.perf_counter()
+window.show()
+app.processEvents()
+shown = time.perf_counter()
+print(json.dumps({"import": imported - started, "qapplication": created - imported,
+                  "main_window": built - created, "first_frame": shown - built, "total": shown - started}))
+"""
+
+
+def parse_importtime(stderr):
+    """Return [(module, depth, self_us, cumulative_us)] from -X importtime output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), depth, int(fields[0]), int(fields[1])))
+    return rows
+
+
+def import_run(module):
+    """Import module in a new interpreter; return (wall seconds, importtime rows)"""
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=ROOT, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if proc.returncode:
+        raise RuntimeError(f"importing {module} failed:\n" + "\n".join(proc.stderr.splitlines()[-5:]))
+    return elapsed, parse_importtime(proc.stderr)
+
+
+def window_run():
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    proc = subprocess.run([sys.executable, "-c", WINDOW_SNIPPET], cwd=ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode:
+        raise RuntimeError("starting the window failed:\n" + "\n".join(proc.stderr.splitlines()[-5:]))
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def subtree(rows, module):
+    """Return the rows of module and everything it imported, leaving out the interpreter's own startup imports"""
+    end = next((index for index, (name, depth, _, _) in enumerate(rows) if name == module and depth == 0), None)
+    if end is None:
+        return []
+    # -X importtime lists a module after its own imports, one indent level deeper, so its
+    # imports are the rows between the previous top-level module and its own row
+    start = end
+    while start > 0 and rows[start - 1][1] > 0:
+        start -= 1
+    return rows[start:end + 1]
+
+
+def breakdown(rows, module, top):
+    """Return (the module's cumulative us, its direct imports by cumulative us, modules by self us)"""
+    rows = subtree(rows, module)
+    total = rows[-1][3] if rows else 0
+    direct = sorted(((name, cumulative) for name, depth, _, cumulative in rows if depth == 1),
+                    key=lambda row: row[1], reverse=True)
+    own = sorted(((name, self_us) for name, _, self_us, _ in rows), key=lambda row: row[1], reverse=True)
+    return total, direct[:top], own[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="Cry4pt", help="Module to import (default: the GUI)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Modules listed per ranking")
+    parser.add_argument("--window", action="store_true", help="Also time the window up to its first frame")
+    parser.add_argument("--output", help="Write the results as JSON")
+    args = parser.parse_args()
+
+    try:
+        runs = [import_run(args.module) for _ in range(args.runs)]
+    except RuntimeError as e:
+        sys.exit(str(e))
+    walls = [wall for wall, _ in runs]
+    # The breakdown comes from the run with the median import time
+    totals = [breakdown(rows, args.module, args.top)[0] for _, rows in runs]
+    median_run = sorted(range(len(runs)), key=lambda index: totals[index])[len(runs) // 2]
+    total, direct, own = breakdown(runs[median_run][1], args.module, args.top)
+
+    print(f"{args.module}: {statistics.median(totals) / 1000:.1f} ms to import "
+          f"(min {min(totals) / 1000:.1f}, max {max(totals) / 1000:.1f}); "
+          f"{statistics.median(walls) * 1000:.1f} ms interpreter wall time, median of {len(runs)} runs")
+    print(f"\nDirect imports by cumulative time:")
+    for name, cumulative in direct:
+        print(f"  {cumulative / 1000:9.1f} ms {cumulative / max(total, 1):6.1%}  {name}")
+    print(f"\nModules by own time:")
+    for name, self_us in own:
+        print(f"  {self_us / 1000:9.1f} ms  {name}")
+    results = {"module": args.module, "runs": len(runs), "import_ms": statistics.median(totals) / 1000,
+               "wall_ms": statistics.median(walls) * 1000,
+               "direct_imports_ms": {name: cumulative / 1000 for name, cumulative in direct},
+               "self_ms": {name: self_us / 1000 for name, self_us in own}}
+
+    if args.window:
+        try:
+            windows = [window_run() for _ in range(args.runs)]
+        except RuntimeError as e:
+            sys.exit(str(e))
+        window = {stage: statistics.median(run[stage] for run in windows) * 1000 for stage in windows[0]}
+        print("\nWindow startup (median ms): " + ", ".join(f"{stage} {ms:.1f}" for stage, ms in window.items()))
+        results["window_ms"] = window
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
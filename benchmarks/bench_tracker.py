@@ -0,0 +1,207 @@
+"""Stage-by-stage benchmark of the File Tracker engine on synthetic trees.
+
+For each layout (wide, deep, tiny, huge) a deterministic tree is built and the
+walk, stat, filter, scan, serialize, load, diff and top-N stages are timed, with
+files/s and the peak RSS of each stage. walk only lists the folders, stat only
+stats the paths walk found and filter only matches the stat'ed files against
+the extension filter, so each stage is measured on its own; scan is the
+engine's complete walk-and-stat, as the Tracker runs it. Every stage runs --repeat times and
+reports its best time (the median is recorded too). Linux only, run from the
+repository root:
+
+    python benchmarks/bench_tracker.py --files 200000 --output results.json
+    python benchmarks/bench_tracker.py --files 200000 --repeat 5 --baseline results.json --tolerance 0.2
+
+With --baseline, the exit status is 1 when any stage is slower than the baseline
+by more than the tolerance (best files/s compared per layout and stage). Stages
+that take less than --min-seconds in either run are too noisy to compare and
+are skipped.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import extension_index
+import snapshot_diff
+import snapshot_format
+import tracker_engine
+from synthetic_tree import LAYOUTS, build_tree, mutate_tree
+
+STAGES = ("walk", "stat", "filter", "scan", "serialize", "load", "diff", "top_n")
+FILTER = [".log", ".txt"]
+
+
+def reset_peak_rss():
+    # Writing 5 to clear_refs resets VmHWM, so each stage reports its own peak
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_kb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1])
+    return 0
+
+
+def walk_names(root):
+    """Listing only: os.scandir without any stat calls; returns the file paths"""
+    paths = []
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                else:
+                    paths.append(entry.path)
+    return paths
+
+
+def stat_paths(paths):
+    """Stat only: returns ({path: size}, {path: mtime})"""
+    sizes = {}
+    mtimes = {}
+    for path in paths:
+        st = os.stat(path)
+        sizes[path] = st.st_size
+        mtimes[path] = st.st_mtime
+    return sizes, mtimes
+
+
+def filter_sizes(sizes, extensions):
+    """Filter only: the files matching extensions, the way the scan engine matches them"""
+    extensions = tuple(ext.lower() for ext in extensions)
+    return {path: size for path, size in sizes.items() if os.path.basename(path).lower().endswith(extensions)}
+
+
+def timed(results, stage, files, repeat, func, *args):
+    """Run func repeat times; the stage gets the best time, the median time and the highest peak RSS"""
+    times = []
+    peak = 0
+    for _ in range(max(1, repeat)):
+        reset_peak_rss()
+        start = time.perf_counter()
+        value = func(*args)
+        times.append(time.perf_counter() - start)
+        peak = max(peak, peak_rss_kb())
+    best = min(times)
+    results[stage] = {
+        "seconds": round(best, 4),
+        "median_seconds": round(statistics.median(times), 4),
+        "runs": len(times),
+        "files_per_second": round(files / best, 1) if best else 0.0,
+        "peak_rss_kb": peak,
+    }
+    return value
+
+
+def bench_layout(work_dir, layout, file_count, seed, workers, repeat=1):
+    root = os.path.join(work_dir, layout)
+    paths = build_tree(root, layout, file_count, seed)
+    files = len(paths)
+    results = {}
+    walked = timed(results, "walk", files, repeat, walk_names, root)
+    sizes, mtimes = timed(results, "stat", files, repeat, stat_paths, walked)
+    del walked
+    timed(results, "filter", files, repeat, filter_sizes, sizes, FILTER)
+    timed(results, "scan", files, repeat, tracker_engine.scan_folder_files, root, None, (), workers)
+    old_path = os.path.join(work_dir, f"{layout}_old.snap")
+    timed(results, "serialize", files, repeat, snapshot_format.write_snapshot, old_path, sizes, mtimes)
+    timed(results, "load", files, repeat, snapshot_format.read_snapshot, old_path)
+
+    mutate_tree(paths, seed)
+    new_path = os.path.join(work_dir, f"{layout}_new.snap")
+    snapshot_format.write_snapshot(new_path, tracker_engine.scan_folder_files(root, workers=workers))
+    timed(results, "diff", files, repeat, snapshot_diff.compare_snapshot_files, old_path, new_path)
+    timed(results, "top_n", files, repeat, extension_index.ExtensionIndex.from_snapshot, new_path)
+    shutil.rmtree(root, ignore_errors=True)
+    return files, results
+
+
+def compare(results, baseline, tolerance, min_seconds=0.0):
+    """Print the stages that got slower than baseline allows; returns how many did.
+
+    Stages shorter than min_seconds in either run are skipped: at that length timer and
+    scheduler noise outweighs the tolerance.
+    """
+    regressions = 0
+    for layout, stages in results.items():
+        for stage, current in stages.items():
+            previous = baseline.get(layout, {}).get(stage)
+            if not previous or not previous["files_per_second"]:
+                continue
+            if min(current["seconds"], previous["seconds"]) < min_seconds:
+                continue
+            ratio = current["files_per_second"] / previous["files_per_second"]
+            if ratio < 1 - tolerance:
+                regressions += 1
+                print(f"REGRESSION {layout}/{stage}: {current['files_per_second']:,.0f} files/s "
+                      f"vs {previous['files_per_second']:,.0f} baseline ({ratio:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=100_000, help="Files per layout (the huge layout caps at 64)")
+    parser.add_argument("--layouts", nargs="*", default=list(LAYOUTS), choices=LAYOUTS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1, help="Scan threads for the scan stage")
+    parser.add_argument("--dir", help="Build the trees here instead of a temp directory")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed files/s drop against the baseline")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage; the best one is reported")
+    parser.add_argument("--min-seconds", type=float, default=0.05,
+                        help="Stages shorter than this are not compared against the baseline")
+    args = parser.parse_args()
+
+    if not sys.platform.startswith("linux"):
+        sys.exit("This benchmark is meant to run on Linux.")
+
+    work_dir = tempfile.mkdtemp(prefix="tracker_bench_", dir=args.dir)
+    results = {}
+    counts = {}
+    try:
+        for layout in args.layouts:
+            counts[layout], results[layout] = bench_layout(work_dir, layout, args.files, args.seed, args.workers,
+                                                           args.repeat)
+            print(f"{layout} ({counts[layout]:,} files)")
+            for stage in STAGES:
+                r = results[layout][stage]
+                print(f"  {stage:<10} {r['seconds']:9.3f}s (median {r['median_seconds']:.3f}s) "
+                      f"{r['files_per_second']:14,.0f} files/s "
+                      f"{r['peak_rss_kb'] / 1024:9.1f} MB peak")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    document = {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(), "seed": args.seed,
+                 "workers": args.workers, "repeat": args.repeat, "files": counts, "created": time.time()},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(document, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline["results"], args.tolerance, args.min_seconds):
+            sys.exit(1)
+        print(f"No stage slower than the baseline by more than {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Interrupt/resume check of background scans on synthetic trees.
+
+Each layout is scanned once without interruption, then again from scratch while
+being cancelled every few hundred files and resumed from its checkpoint until it
+completes. The resumed snapshot must hold exactly the rows of the uninterrupted
+one: no path missing and none listed twice. Run from the repository root:
+
+    python benchmarks/check_resume.py --files 20000 --workers 8
+    python benchmarks/check_resume.py --layouts deep --rounds 10
+
+The exit status is 1 when any resumed snapshot differs.
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import file_tracker
+import snapshot_format
+import tracker_engine
+from synthetic_tree import LAYOUTS, build_tree
+
+
+class CancelAfter:
+    """Scan pacer that sets cancel once a scan has read limit files"""
+
+    def __init__(self, cancel, limit):
+        self.cancel = cancel
+        self.limit = limit
+        self.files = 0
+        self._lock = threading.Lock()
+
+    def start_thread(self):
+        pass
+
+    def pace(self, files, syscalls):
+        with self._lock:
+            self.files += files
+            if self.files >= self.limit:
+                self.cancel.set()
+
+
+def snapshot_rows(snapshot_path):
+    with snapshot_format.SnapshotReader(snapshot_path) as reader:
+        return list(zip(reader.iter_paths(), reader.sizes, reader.mtimes))
+
+
+def resumed_scan(tracker, rng, min_files, max_files, limit=1000):
+    """Scan until it completes, cancelling every run after a random number of files; returns the interruptions"""
+    for interruptions in range(limit):
+        cancel = threading.Event()
+        try:
+            tracker.scan(pacer=CancelAfter(cancel, rng.randint(min_files, max_files)), checkpoint_interval=0.0,
+                         cancel=cancel)
+            return interruptions
+        except tracker_engine.ScanInterrupted:
+            continue
+    raise RuntimeError(f"scan still interrupted after {limit} runs")
+
+
+def check_layout(work_dir, layout, file_count, seed, workers, rounds):
+    """Return the number of rounds whose resumed snapshot differs from the uninterrupted one"""
+    root = os.path.join(work_dir, layout)
+    build_tree(root, layout, file_count, seed)
+    reference = file_tracker.FileTracker(root, os.path.join(work_dir, "reference.snap"),
+                                         os.path.join(work_dir, "reference_history"), (), workers)
+    reference.scan()
+    expected = snapshot_rows(reference.snapshot_file)
+    rng = random.Random(seed)
+    failures = 0
+    for round_number in range(rounds):
+        snapshot_file = os.path.join(work_dir, f"resumed_{round_number}.snap")
+        tracker = file_tracker.FileTracker(root, snapshot_file, os.path.join(work_dir, f"resumed_{round_number}_history"),
+                                           (), workers)
+        interruptions = resumed_scan(tracker, rng, max(1, len(expected) // 20), max(1, len(expected) // 4))
+        rows = snapshot_rows(snapshot_file)
+        duplicates = len(rows) - len({path for path, _, _ in rows})
+        if rows != expected:
+            failures += 1
+            print(f"  round {round_number}: {len(rows):,} rows for {len(expected):,} files "
+                  f"({duplicates:,} duplicated) after {interruptions} interruptions")
+    shutil.rmtree(root, ignore_errors=True)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=5000, help="Files per layout (the huge layout caps at 64)")
+    parser.add_argument("--layouts", nargs="*", default=["wide", "deep"], choices=LAYOUTS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=tracker_engine.DEFAULT_SCAN_WORKERS)
+    parser.add_argument("--rounds", type=int, default=5, help="Interrupted scans per layout")
+    parser.add_argument("--dir", help="Build the trees here instead of a temp directory")
+    args = parser.parse_args()
+
+    failures = 0
+    for layout in args.layouts:
+        work_dir = tempfile.mkdtemp(prefix="resume_check_", dir=args.dir)
+        try:
+            failed = check_layout(work_dir, layout, args.files, args.seed, args.workers, args.rounds)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        print(f"{layout}: {args.rounds - failed} of {args.rounds} resumed scans match with {args.workers} workers")
+        failures += failed
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Deterministic synthetic folder trees for the scan benchmarks.
+
+Every layout is generated from a seed, so two machines (or two commits) build
+byte-for-byte the same names, sizes and mtimes. Files are sparse: sizes come
+from truncate(), so even the huge layout takes next to no disk space.
+"""
+import os
+import random
+
+LAYOUTS = ("wide", "deep", "tiny", "huge")
+EXTENSIONS = (".log", ".txt", ".dat", ".tmp", ".jpg", ".dll", ".json", "")
+# Fixed base for the generated mtimes, so snapshots of the same tree are identical
+BASE_MTIME = 1_600_000_000
+
+
+def _folders(layout, file_count):
+    """Return the relative folders of a layout and how many files go into each"""
+    if layout == "wide":
+        # One level of many small folders
+        count = max(1, file_count // 50)
+        return [f"w{i:05d}" for i in range(count)]
+    if layout == "deep":
+        # Binary tree of folders 12 levels deep, files spread over all of them
+        folders = []
+        level = [""]
+        while len(folders) < max(1, file_count // 8) and level:
+            next_level = []
+            for parent in level:
+                for branch in ("l", "r"):
+                    folder = os.path.join(parent, branch) if parent else branch
+                    folders.append(folder)
+                    if folder.count(os.sep) < 11:
+                        next_level.append(folder)
+            level = next_level
+        return folders[:max(1, file_count // 8)]
+    if layout == "tiny":
+        # Few folders packed with tiny files
+        return [f"t{i:03d}" for i in range(max(1, file_count // 2000))]
+    if layout == "huge":
+        return ["huge"]
+    raise ValueError(f"Unknown layout {layout!r}, expected one of {', '.join(LAYOUTS)}")
+
+
+def _size(layout, rng):
+    if layout == "tiny":
+        return rng.randint(0, 512)
+    if layout == "huge":
+        return rng.randint(1, 8) * 1024 ** 3
+    return int(rng.lognormvariate(9, 2.5)) % (256 * 1024 ** 2)
+
+
+def build_tree(root, layout, file_count, seed=0):
+    """Create file_count files (a few dozen for the huge layout) under root; returns the file paths"""
+    rng = random.Random(f"{layout}:{file_count}:{seed}")
+    if layout == "huge":
+        file_count = min(file_count, 64)
+    folders = _folders(layout, file_count)
+    paths = []
+    for index in range(file_count):
+        folder = os.path.join(root, folders[index % len(folders)])
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"f{index:07d}{rng.choice(EXTENSIONS)}")
+        with open(path, "wb") as f:
+            f.truncate(_size(layout, rng))
+        mtime = BASE_MTIME + rng.randint(0, 365 * 24 * 3600)
+        os.utime(path, (mtime, mtime))
+        paths.append(path)
+    return paths
+
+
+def mutate_tree(paths, seed=0, fraction=0.01, growth=64 * 1024 ** 2):
+    """Grow, delete and add about fraction of the files each, for the diff stage; returns the new path list"""
+    rng = random.Random(f"mutate:{len(paths)}:{seed}")
+    count = max(1, int(len(paths) * fraction))
+    chosen = rng.sample(range(len(paths)), min(len(paths), count * 2))
+    grown, deleted = chosen[:count], set(chosen[count:])
+    for index in grown:
+        with open(paths[index], "r+b") as f:
+            f.truncate(os.path.getsize(paths[index]) + growth)
+    for index in deleted:
+        os.remove(paths[index])
+    remaining = [path for index, path in enumerate(paths) if index not in deleted]
+    for index in range(count):
+        path = os.path.join(os.path.dirname(rng.choice(remaining)), f"new{index:07d}.dat")
+        with open(path, "wb") as f:
+            f.truncate(rng.randint(0, 1024 ** 2))
+        remaining.append(path)
+    return remaining
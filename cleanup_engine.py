@@ -0,0 +1,138 @@
+"""Deletion engine for the Storage Cleaner.
+
+Files are grouped by folder into batches that a thread pool deletes in
+parallel. Where the platform allows it, each batch opens its folder once and
+unlinks the names relative to that handle, so the folder path is not resolved
+again for every file.
+"""
+import os
+import stat
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+DEFAULT_DELETE_WORKERS = 8
+DELETE_BATCH_SIZE = 512
+
+DELETED = "deleted"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+# error is the errno (or the exception text when there is none) for FAILED records
+CleanupRecord = namedtuple("CleanupRecord", ["category", "path", "action", "size", "error"])
+
+UNLINK_HAS_DIR_FD = os.unlink in os.supports_dir_fd and os.lstat in os.supports_dir_fd and hasattr(os, "O_DIRECTORY")
+
+
+class CategoryResult:
+    """Freed bytes and file counts of one cleanup category"""
+
+    def __init__(self):
+        self.freed = 0
+        self.deleted = 0
+        self.skipped = 0
+        self.failed = 0
+
+    def add(self, record):
+        if record.action == DELETED:
+            self.deleted += 1
+            self.freed += record.size
+        elif record.action == SKIPPED:
+            self.skipped += 1
+        else:
+            self.failed += 1
+
+    def __str__(self):
+        text = f"{self.deleted} deleted"
+        if self.skipped:
+            text += f", {self.skipped} skipped"
+        if self.failed:
+            text += f", {self.failed} failed"
+        return text
+
+
+def plan_batches(categories, batch_size=DELETE_BATCH_SIZE):
+    """Split {category: [paths]} into (category, folder, [names]) batches of at most batch_size files"""
+    batches = []
+    for category, paths in categories.items():
+        folders = {}
+        for path in paths:
+            folder, name = os.path.split(path)
+            folders.setdefault(folder, []).append(name)
+        for folder, names in folders.items():
+            for start in range(0, len(names), batch_size):
+                batches.append((category, folder, names[start:start + batch_size]))
+    return batches
+
+
+def _error_code(e):
+    return e.errno if getattr(e, "errno", None) is not None else str(e)
+
+
+def delete_batch(category, folder, names, cancel=None):
+    """Delete regular files (and links) named in folder; return a CleanupRecord per file handled"""
+    records = []
+    fd = None
+    if UNLINK_HAS_DIR_FD:
+        try:
+            fd = os.open(folder, os.O_RDONLY | os.O_DIRECTORY)
+        except OSError:
+            fd = None
+    try:
+        for name in names:
+            if cancel is not None and cancel.is_set():
+                break
+            path = os.path.join(folder, name)
+            target = name if fd is not None else path
+            try:
+                st = os.lstat(target, dir_fd=fd)
+                if not (stat.S_ISREG(st.st_mode) or stat.S_ISLNK(st.st_mode)):
+                    records.append(CleanupRecord(category, path, SKIPPED, 0, None))
+                    continue
+                os.unlink(target, dir_fd=fd)
+                records.append(CleanupRecord(category, path, DELETED, st.st_size, None))
+            except OSError as e:
+                records.append(CleanupRecord(category, path, FAILED, 0, _error_code(e)))
+    finally:
+        if fd is not None:
+            os.close(fd)
+    return records
+
+
+def delete_files(categories, workers=DEFAULT_DELETE_WORKERS, cancel=None, on_progress=None, on_records=None,
+                 interval=0.2):
+    """Delete {category: [paths]} on a thread pool and return {category: CategoryResult}.
+
+    on_progress(done, total) is called at most every interval seconds and once at the end;
+    on_records receives the CleanupRecords of each finished batch. Setting the cancel Event
+    stops the workers between files.
+    """
+    if cancel is None:
+        cancel = threading.Event()
+    total = sum(len(paths) for paths in categories.values())
+    results = {category: CategoryResult() for category in categories}
+    done = 0
+    last_progress = 0.0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [pool.submit(delete_batch, category, folder, names, cancel)
+                   for category, folder, names in plan_batches(categories)]
+        try:
+            for future in as_completed(futures):
+                records = future.result()
+                for record in records:
+                    results[record.category].add(record)
+                done += len(records)
+                if on_records is not None and records:
+                    on_records(records)
+                now = time.monotonic()
+                if on_progress is not None and now - last_progress >= interval:
+                    last_progress = now
+                    on_progress(done, total)
+        except BaseException:
+            # Unstarted batches see the event and return at once
+            cancel.set()
+            raise
+    if on_progress is not None:
+        on_progress(done, total)
+    return results
@@ -0,0 +1,123 @@
+"""On-disk journal of Storage Cleaner actions.
+
+Every cleanup writes its CleanupRecords to its own JSON Lines journal as they
+arrive, one compact array per file:
+
+    [time, category, action, bytes, error code, path]
+
+Only the newest journals are kept. Memory use stays flat however many files a
+cleanup touches: the journal keeps running counters, and exports stream
+straight from the file.
+"""
+import csv
+import json
+import os
+import time
+from datetime import datetime
+
+from cleanup_engine import CleanupRecord, DELETED, FAILED, SKIPPED
+
+CLEANUP_LOG_DIR = "cleanup_logs"
+CLEANUP_LOG_KEEP = 10
+JOURNAL_EXTENSION = ".jsonl"
+EXPORT_FIELDS = ("time", "category", "action", "bytes", "error", "path")
+
+
+def record_message(record):
+    """Format a CleanupRecord the way the status log shows it"""
+    if record.action == DELETED:
+        return f"Deleted: {record.path}"
+    if record.action == SKIPPED:
+        return f"Skipped (not file): {record.path}"
+    error = os.strerror(record.error) if isinstance(record.error, int) else record.error
+    return f"Failed to delete: {record.path} — {error}"
+
+
+class CleanupJournal:
+    """Journal of one cleanup run, with per-action counters"""
+
+    def __init__(self, directory=CLEANUP_LOG_DIR, keep=CLEANUP_LOG_KEEP):
+        os.makedirs(directory, exist_ok=True)
+        now = datetime.now().strftime("%Y-%m-%d_%H-%M-%S-%f")
+        self.file_path = os.path.join(directory, f"cleanup_{now}{JOURNAL_EXTENSION}")
+        self.counts = {DELETED: 0, SKIPPED: 0, FAILED: 0}
+        self.freed = 0
+        self._file = open(self.file_path, "w", encoding="utf-8", errors="surrogateescape")
+        self._rotate(directory, keep)
+
+    @staticmethod
+    def _rotate(directory, keep):
+        journals = sorted(name for name in os.listdir(directory)
+                          if name.startswith("cleanup_") and name.endswith(JOURNAL_EXTENSION))
+        for name in journals[:max(0, len(journals) - keep)]:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+    def __len__(self):
+        return sum(self.counts.values())
+
+    def write(self, records):
+        now = round(time.time(), 3)
+        lines = []
+        for record in records:
+            self.counts[record.action] += 1
+            if record.action == DELETED:
+                self.freed += record.size
+            lines.append(json.dumps([now, record.category, record.action, record.size, record.error, record.path],
+                                    ensure_ascii=False))
+        lines.append("")
+        self._file.write("\n".join(lines))
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def summary(self):
+        return (f"{self.counts[DELETED]} deleted ({self.freed:,} bytes), "
+                f"{self.counts[SKIPPED]} skipped, {self.counts[FAILED]} failed")
+
+    def iter_entries(self):
+        """Yield (time, CleanupRecord) pairs back from the journal file"""
+        # The cleanup worker closes the journal when it is done, which has flushed it already
+        if not self._file.closed:
+            self._file.flush()
+        return iter_journal(self.file_path)
+
+    def export(self, file_path):
+        """Stream the journal to a .csv file, or to JSON Lines for any other extension"""
+        if os.path.splitext(file_path)[1].lower() == ".csv":
+            return export_csv(self.iter_entries(), file_path)
+        return export_jsonl(self.iter_entries(), file_path)
+
+
+def iter_journal(file_path):
+    with open(file_path, "r", encoding="utf-8", errors="surrogateescape") as f:
+        for line in f:
+            if line.strip():
+                stamp, category, action, size, error, path = json.loads(line)
+                yield stamp, CleanupRecord(category, path, action, size, error)
+
+
+def export_csv(entries, file_path):
+    count = 0
+    with open(file_path, "w", newline="", encoding="utf-8", errors="surrogateescape") as f:
+        writer = csv.writer(f)
+        writer.writerow(EXPORT_FIELDS)
+        for stamp, record in entries:
+            writer.writerow((datetime.fromtimestamp(stamp).isoformat(timespec="seconds"), record.category,
+                             record.action, record.size, "" if record.error is None else record.error, record.path))
+            count += 1
+    return count
+
+
+def export_jsonl(entries, file_path):
+    count = 0
+    with open(file_path, "w", encoding="utf-8", errors="surrogateescape") as f:
+        for stamp, record in entries:
+            f.write(json.dumps(dict(zip(EXPORT_FIELDS, (stamp, record.category, record.action, record.size,
+                                                        record.error, record.path))), ensure_ascii=False))
+            f.write("\n")
+            count += 1
+    return count
@@ -0,0 +1,206 @@
+"""Plan a cleanup that frees a given amount of space with as few files as possible.
+
+Instead of emptying every selected category, the planner reads candidates as
+they are enumerated and keeps, in a min-heap keyed by score, the best-scoring
+files that together cover the target. A file scores its size, weighted by its
+category's priority and by its age:
+
+    score = size * priority * (1 + age_days / AGE_DOUBLING_DAYS)
+
+Whenever the heap covers more than the target, its lowest-scoring files are
+dropped, so it never holds more than the plan needs. Categories are read in
+priority tiers (priority_tiers), highest first. A tier is always read to its end,
+so the plan is the best-scoring cover of every tier read; enumeration stops at
+the first tier boundary where the target is covered (unless exhaustive is set).
+Lower tiers are then never walked, and a tier whose previews are cached needs no
+walk at all. The trade-off: a big old file in a lower tier is not considered once
+higher tiers cover the target, even if it would score better.
+
+Dry run against a fixture tree, printing the plan as JSON:
+
+    python cleanup_planner.py --free 5G --var TEMP=/tmp/fixture/Temp
+    python cleanup_planner.py --usage 85 --volume C:\\
+"""
+import heapq
+import json
+import os
+import shutil
+import sys
+import time
+from collections import namedtuple
+
+import cleanup_rules
+
+# A file this many days old scores twice as much as a new one of the same size
+AGE_DOUBLING_DAYS = 30
+_DAY = 24 * 60 * 60
+
+PlanItem = namedtuple("PlanItem", ["category", "record", "score"])
+_UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+def parse_size(text):
+    """Return the bytes of '5G', '750M', '1.5T' or a plain byte count"""
+    text = text.strip().upper().rstrip("B")
+    if text and text[-1] in _UNITS:
+        return int(float(text[:-1]) * _UNITS[text[-1]])
+    return int(text)
+
+
+def system_volume():
+    """Return the root of the system drive (C:\\ on Windows, / elsewhere)"""
+    return os.path.join(os.environ.get("SystemDrive", os.sep), os.sep)
+
+
+def bytes_to_free(volume, target_percent):
+    """Return how many bytes must go for volume to be at most target_percent full"""
+    usage = shutil.disk_usage(volume)
+    return max(0, usage.used - int(usage.total * target_percent / 100))
+
+
+def score(record, priority, now):
+    age_days = max(0.0, (now - record.mtime) / _DAY)
+    return record.size * priority * (1 + age_days / AGE_DOUBLING_DAYS)
+
+
+def priority_tiers(categories, priorities):
+    """Group categories by priority, highest first, keeping their order within a tier"""
+    tiers = {}
+    for category in categories:
+        tiers.setdefault(priorities.get(category, cleanup_rules.DEFAULT_PRIORITY), []).append(category)
+    return [tiers[priority] for priority in sorted(tiers, reverse=True)]
+
+
+def tiered_rule_candidates(rule_set):
+    """Yield (category, PreviewRecord) of a RuleSet one priority tier at a time"""
+    for tier in priority_tiers(rule_set.categories, rule_set.priorities()):
+        rules = [rule for rule in rule_set.rules if rule.name in tier]
+        yield from cleanup_rules.RuleSet(rules, rule_set.variables).walk()
+
+
+class CleanupPlan:
+    """The files chosen to free target bytes, best-scoring first"""
+
+    def __init__(self, target, items, enumerated, exhausted):
+        self.target = target
+        self.items = items
+        # Candidates read before the planner stopped, and whether the sources ran dry
+        self.enumerated = enumerated
+        self.exhausted = exhausted
+        self.total_bytes = sum(item.record.size for item in items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def reached(self):
+        return self.total_bytes >= self.target
+
+    def categories(self):
+        """Return {category: [paths]}, the shape cleanup_engine.delete_files takes"""
+        selected = {}
+        for item in self.items:
+            selected.setdefault(item.category, []).append(item.record.path)
+        return selected
+
+    def category_totals(self):
+        """Return {category: (files, bytes)}"""
+        totals = {}
+        for item in self.items:
+            files, size = totals.get(item.category, (0, 0))
+            totals[item.category] = (files + 1, size + item.record.size)
+        return totals
+
+    def __str__(self):
+        state = "reaches" if self.reached else "falls short of"
+        return (f"{len(self.items):,} files, {self.total_bytes:,} bytes ({state} the {self.target:,} byte target; "
+                f"{self.enumerated:,} candidates read)")
+
+
+def plan_cleanup(candidates, target, priorities=None, now=None, exhaustive=False, cancel=None):
+    """Pick files from (category, PreviewRecord) candidates until target bytes are covered.
+
+    priorities maps categories to weights (cleanup_rules.DEFAULT_PRIORITY when missing), and
+    candidates come one priority tier at a time, highest first. Without exhaustive, reading
+    stops when a lower tier starts and the chosen files already cover the target; with it
+    every candidate is read. Either way the plan is the best-scoring cover of what was read.
+    """
+    if target <= 0:
+        # Nothing to free (e.g. the volume is already below the target usage), so nothing is walked
+        return CleanupPlan(target, [], 0, False)
+    if now is None:
+        now = time.time()
+    priorities = priorities or {}
+    heap = []
+    total = 0
+    enumerated = 0
+    exhausted = True
+    tier = None
+    for sequence, (category, record) in enumerate(candidates):
+        if cancel is not None and cancel.is_set():
+            exhausted = False
+            break
+        priority = priorities.get(category, cleanup_rules.DEFAULT_PRIORITY)
+        if tier is not None and priority < tier and total >= target and not exhaustive:
+            # The tiers read so far cover the target, so the lower ones are never walked
+            exhausted = False
+            break
+        tier = priority
+        enumerated += 1
+        if record.size is None or record.size <= 0:
+            continue
+        item_score = score(record, priority, now)
+        if total >= target and heap and item_score <= heap[0][0]:
+            # Covered already by files that all score higher
+            continue
+        # The sequence number keeps records from ever being compared
+        heapq.heappush(heap, (item_score, sequence, category, record))
+        total += record.size
+        while heap and total - heap[0][3].size >= target:
+            total -= heapq.heappop(heap)[3].size
+    items = [PlanItem(category, record, item_score)
+             for item_score, _, category, record in sorted(heap, reverse=True)]
+    return CleanupPlan(target, items, enumerated, exhausted)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Plan (without deleting) the files to clean to free some space")
+    goal = parser.add_mutually_exclusive_group(required=True)
+    goal.add_argument("--free", help="Space to free, e.g. 5G or 750M")
+    goal.add_argument("--usage", type=float, help="Target usage percentage of --volume")
+    parser.add_argument("--volume", default=system_volume(),
+                        help="Volume that --usage applies to")
+    parser.add_argument("--rules", default=cleanup_rules.CLEANUP_RULES_FILE)
+    parser.add_argument("--var", action="append", default=[], metavar="NAME=VALUE",
+                        help="Set a root placeholder, e.g. --var TEMP=/tmp/fixture/Temp")
+    parser.add_argument("--category", action="append", help="Only take files from these categories")
+    parser.add_argument("--exhaustive", action="store_true", help="Read every candidate before deciding")
+    args = parser.parse_args()
+
+    variables = cleanup_rules.default_variables()
+    for item in args.var:
+        name, _, value = item.partition("=")
+        variables[name] = value
+    rules = cleanup_rules.load_rules(args.rules)
+    if args.category:
+        rules = [rule for rule in rules if rule.name in args.category]
+    rule_set = cleanup_rules.RuleSet(rules, variables)
+    try:
+        target = parse_size(args.free) if args.free else bytes_to_free(args.volume, args.usage)
+    except ValueError:
+        parser.error(f"--free expects a size such as 5G or 750M, not {args.free!r}")
+    except OSError as e:
+        parser.error(f"cannot read the usage of {args.volume}: {e}")
+    plan = plan_cleanup(tiered_rule_candidates(rule_set), target, rule_set.priorities(), exhaustive=args.exhaustive)
+    json.dump({"target": target, "bytes": plan.total_bytes, "reached": plan.reached, "files": len(plan),
+               "enumerated": plan.enumerated, "exhausted": plan.exhausted,
+               "categories": {name: {"files": files, "bytes": size}
+                              for name, (files, size) in plan.category_totals().items()},
+               "plan": [{"category": item.category, "path": item.record.path, "size": item.record.size}
+                        for item in plan.items]}, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""Records produced by the Storage Cleaner previews.
+
+Each enumerated file comes back as a PreviewRecord whose size and mtime come
+from the same os.scandir listing that found it (see cleanup_rules), so the
+reclaimable space of a category is known without statting every file again.
+"""
+import os
+from collections import namedtuple
+
+# size is None for rows that are not files, such as enumeration errors
+PreviewRecord = namedtuple("PreviewRecord", ["path", "size", "mtime"])
+
+
+def entry_record(entry):
+    """Return the PreviewRecord of a DirEntry, or None if it vanished"""
+    try:
+        st = entry.stat(follow_symlinks=False)
+    except OSError:
+        return None
+    return PreviewRecord(entry.path, st.st_size, st.st_mtime)
+
+
+def path_record(path):
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return PreviewRecord(path, 0, 0.0)
+    return PreviewRecord(path, st.st_size, st.st_mtime)
@@ -0,0 +1,268 @@
+"""Declarative cleanup rules for the Storage Cleaner.
+
+A rule names the category it belongs to and says where and what to clean:
+
+    {
+        "name": "Windows Upgrade Logs",
+        "roots": ["{SystemRoot}/Panther"],
+        "patterns": ["*.log"],
+        "exclude": ["*/Panther/Rollback"],
+        "min_age_days": 0,
+        "max_depth": null,
+        "include_dirs": false,
+        "priority": 1.0
+    }
+
+roots may use {VARIABLE} placeholders, filled from the environment or the
+variables given to RuleSet; a root whose variables are unknown is skipped.
+patterns are case-insensitive globs on file names (all files when omitted),
+exclude are globs on folder paths written with "/" that prune whole subtrees,
+max_depth limits how far below a root files are taken (0 = only the root
+itself) and include_dirs also takes matching folders at that level. priority
+weighs the category when cleanup_planner picks files to reach a space target
+(higher goes first). Several rules may share a name; together they make up
+one category.
+
+A RuleSet compiles the selected rules into a single traversal: every folder
+below any root is listed once and each file goes to the first rule that
+matches it, so categories sharing a root no longer walk it separately.
+
+Rules are loaded from a JSON file; run this module against a fixture tree to
+check what a rules file would pick up without deleting anything:
+
+    python cleanup_rules.py cleanup_rules.json --var LOCALAPPDATA=/tmp/fixture/Local
+"""
+import fnmatch
+import json
+import os
+import re
+import sys
+import time
+
+from cleanup_preview import entry_record
+
+CLEANUP_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cleanup_rules.json")
+
+_DAY = 24 * 60 * 60
+# Planner weight of rules that do not set one
+DEFAULT_PRIORITY = 1.0
+
+
+class CleanupRuleError(ValueError):
+    pass
+
+
+def _compile_globs(patterns):
+    if not patterns:
+        return None
+    return re.compile("|".join(fnmatch.translate(pattern) for pattern in patterns), re.IGNORECASE)
+
+
+def _slashes(path):
+    return path.replace(os.sep, "/") if os.sep != "/" else path
+
+
+class CleanupRule:
+    def __init__(self, name, roots, patterns=None, exclude=(), min_age_days=0, max_depth=None, include_dirs=False,
+                 priority=DEFAULT_PRIORITY):
+        self.name = name
+        self.roots = list(roots)
+        self.patterns = list(patterns or ())
+        self.exclude = list(exclude)
+        self.min_age_days = min_age_days
+        self.max_depth = max_depth
+        self.include_dirs = include_dirs
+        self.priority = priority
+        self._names = _compile_globs(self.patterns)
+        self._excluded = _compile_globs(self.exclude)
+
+    @classmethod
+    def from_dict(cls, data):
+        try:
+            return cls(data["name"], data["roots"], data.get("patterns"), data.get("exclude", ()),
+                       data.get("min_age_days", 0), data.get("max_depth"), data.get("include_dirs", False),
+                       data.get("priority", DEFAULT_PRIORITY))
+        except (KeyError, TypeError) as e:
+            raise CleanupRuleError(f"Invalid cleanup rule {data!r}: {e}")
+
+    def to_dict(self):
+        return {"name": self.name, "roots": self.roots, "patterns": self.patterns, "exclude": self.exclude,
+                "min_age_days": self.min_age_days, "max_depth": self.max_depth, "include_dirs": self.include_dirs,
+                "priority": self.priority}
+
+    def __repr__(self):
+        return f"CleanupRule({self.name!r}, {self.roots!r})"
+
+    def resolve_roots(self, variables):
+        """Return the roots with their placeholders filled in, leaving out those that cannot be"""
+        resolved = []
+        for root in self.roots:
+            try:
+                path = root.format_map(variables)
+            except (KeyError, ValueError):
+                continue
+            if path:
+                resolved.append(os.path.normpath(os.path.expanduser(path)))
+        return resolved
+
+    def matches(self, name):
+        return self._names is None or self._names.match(name) is not None
+
+    def excludes(self, folder):
+        return self._excluded is not None and self._excluded.match(_slashes(folder)) is not None
+
+    def old_enough(self, mtime, now):
+        return not self.min_age_days or now - mtime > self.min_age_days * _DAY
+
+
+def load_rules(file_path=CLEANUP_RULES_FILE):
+    """Read a list of CleanupRules from a JSON file holding a list (or {"rules": [...]})"""
+    with open(file_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("rules", [])
+    return [CleanupRule.from_dict(item) for item in data]
+
+
+def rule_categories(rules):
+    """Return {category: [rules]} keeping the order the categories first appear in"""
+    categories = {}
+    for rule in rules:
+        categories.setdefault(rule.name, []).append(rule)
+    return categories
+
+
+def default_variables():
+    variables = dict(os.environ)
+    variables.setdefault("HOME", os.path.expanduser("~"))
+    variables.setdefault("Downloads", os.path.join(os.path.expanduser("~"), "Downloads"))
+    return variables
+
+
+class _Variables(dict):
+    # Unknown placeholders raise KeyError so the root is skipped rather than half filled in
+    def __missing__(self, key):
+        raise KeyError(key)
+
+
+class RuleSet:
+    """Rules compiled into one shared traversal"""
+
+    def __init__(self, rules, variables=None):
+        self.rules = list(rules)
+        self.variables = _Variables(default_variables() if variables is None else variables)
+        # {case-folded root: (root, [rule indexes])} for every root that could be resolved
+        self._roots = {}
+        for index, rule in enumerate(self.rules):
+            for root in rule.resolve_roots(self.variables):
+                self._roots.setdefault(os.path.normcase(root), (root, []))[1].append(index)
+
+    @property
+    def categories(self):
+        return list(rule_categories(self.rules))
+
+    def priorities(self):
+        """Return {category: priority}, the highest priority of the category's rules"""
+        priorities = {}
+        for rule in self.rules:
+            priorities[rule.name] = max(priorities.get(rule.name, rule.priority), rule.priority)
+        return priorities
+
+    def _top_roots(self):
+        """Roots that are not inside another root, as the traversal starting points"""
+        tops = []
+        for key in sorted(self._roots, key=len):
+            if not any(key.startswith(top.rstrip(os.sep) + os.sep) for top in tops):
+                tops.append(key)
+        return sorted(tops)
+
+    def _pending_below(self, folder_key):
+        prefix = folder_key.rstrip(os.sep) + os.sep
+        return any(key.startswith(prefix) for key in self._roots)
+
+    def walk(self, now=None):
+        """Yield (category, PreviewRecord) for every file (or folder) claimed by a rule"""
+        if now is None:
+            now = time.time()
+        rules = self.rules
+        # Each stack item is a folder and the (rule index, depth) pairs active in it
+        stack = []
+        for key in reversed(self._top_roots()):
+            root, indexes = self._roots[key]
+            stack.append((root, [(index, 0) for index in indexes]))
+        while stack:
+            folder, active = stack.pop()
+            subdirs = []
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        try:
+                            is_dir = entry.is_dir(follow_symlinks=False)
+                            if is_dir:
+                                subdirs.append(entry.path)
+                            elif not entry.is_file():
+                                continue
+                        except OSError:
+                            continue
+                        record = None
+                        for index, depth in active:
+                            rule = rules[index]
+                            if is_dir and not rule.include_dirs:
+                                continue
+                            if not rule.matches(entry.name):
+                                continue
+                            if record is None:
+                                record = entry_record(entry)
+                                if record is None:
+                                    break
+                            if rule.old_enough(record.mtime, now):
+                                yield rule.name, record
+                                break
+            except OSError:
+                continue
+            children = []
+            for path in subdirs:
+                key = os.path.normcase(path)
+                child = [(index, depth + 1) for index, depth in active
+                         if (rules[index].max_depth is None or depth + 1 <= rules[index].max_depth)
+                         and not rules[index].excludes(path)]
+                if key in self._roots:
+                    seen = {index for index, _ in child}
+                    child.extend((index, 0) for index in self._roots[key][1] if index not in seen)
+                if child or self._pending_below(key):
+                    children.append((path, child))
+            stack.extend(reversed(children))
+
+    def iter_category(self, name):
+        """Yield the PreviewRecords of a single category"""
+        for category, record in RuleSet([rule for rule in self.rules if rule.name == name], self.variables).walk():
+            yield record
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="List what cleanup rules match, without deleting anything")
+    parser.add_argument("rules", nargs="?", default=CLEANUP_RULES_FILE)
+    parser.add_argument("--var", action="append", default=[], metavar="NAME=VALUE",
+                        help="Set a root placeholder, e.g. --var ProgramData=/tmp/fixture/ProgramData")
+    parser.add_argument("--category", action="append", help="Only run these categories")
+    args = parser.parse_args()
+
+    variables = default_variables()
+    for item in args.var:
+        name, _, value = item.partition("=")
+        variables[name] = value
+    rules = load_rules(args.rules)
+    if args.category:
+        rules = [rule for rule in rules if rule.name in args.category]
+    totals = {}
+    for category, record in RuleSet(rules, variables).walk():
+        print(f"{category}\t{record.size}\t{record.path}")
+        count, size = totals.get(category, (0, 0))
+        totals[category] = (count + 1, size + record.size)
+    for category, (count, size) in totals.items():
+        print(f"# {category}: {count} files, {size} bytes", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Per-directory size index stored with each snapshot.
+
+Answers "which subtree ate the disk" from the rolled-up directory totals of two
+snapshots, without touching the per-file tables.
+"""
+import heapq
+import os
+from collections import namedtuple
+from operator import attrgetter
+
+from snapshot_format import SnapshotReader
+from tracker_engine import parent_directory
+
+# size / files are the current totals, growth / files_added the change against the older index
+DirectoryGrowth = namedtuple("DirectoryGrowth", ["path", "size", "growth", "files", "files_added"])
+
+
+class DirectoryIndex:
+    """{directory: (cumulative bytes, cumulative files)} with subtree queries"""
+
+    def __init__(self, totals):
+        self.totals = totals
+        self._children = None
+
+    @classmethod
+    def from_snapshot(cls, file_path):
+        """Load the directory totals of a snapshot file, or None if it has none"""
+        with SnapshotReader(file_path) as reader:
+            totals = reader.dir_totals()
+        return cls(totals) if totals is not None else None
+
+    def __contains__(self, path):
+        return path in self.totals
+
+    def __len__(self):
+        return len(self.totals)
+
+    def size(self, path):
+        return self.totals.get(path, (0, 0))[0]
+
+    def roots(self):
+        """Return the directories that have no parent in the index"""
+        return [path for path in self.totals if parent_directory(path, self.totals) is None]
+
+    def children(self, path):
+        """Return the direct subdirectories of path"""
+        if self._children is None:
+            self._children = {}
+            for child in self.totals:
+                parent = parent_directory(child, self.totals)
+                if parent is not None:
+                    self._children.setdefault(parent, []).append(child)
+        return self._children.get(path, [])
+
+    def growth(self, path, older):
+        """Return the DirectoryGrowth of path against an older index (None means everything is new)"""
+        size, files = self.totals.get(path, (0, 0))
+        old_size, old_files = older.totals.get(path, (0, 0)) if older is not None else (0, 0)
+        return DirectoryGrowth(path, size, size - old_size, files, files - old_files)
+
+    def diff(self, older):
+        """Yield the DirectoryGrowth of every directory present in either index"""
+        for path in self.totals:
+            yield self.growth(path, older)
+        if older is not None:
+            for path, (old_size, old_files) in older.totals.items():
+                if path not in self.totals:
+                    yield DirectoryGrowth(path, 0, -old_size, 0, -old_files)
+
+    def top_growing(self, older, count=10, under=None):
+        """Return the count directories that grew the most, optionally limited to the subtree under"""
+        candidates = self.diff(older)
+        if under is not None:
+            prefix = under if under.endswith(os.sep) else under + os.sep
+            candidates = (g for g in candidates if g.path == under or g.path.startswith(prefix))
+        return heapq.nlargest(count, candidates, key=attrgetter("growth"))
+
+    def drill(self, older, path, count=10):
+        """Return the direct subdirectories of path that grew the most"""
+        children = set(self.children(path))
+        if older is not None:
+            children.update(older.children(path))
+        return heapq.nlargest(count, (self.growth(child, older) for child in children), key=attrgetter("growth"))
@@ -0,0 +1,234 @@
+"""Duplicate file finder working from Tracker snapshots, one per scanned volume.
+
+Candidates are narrowed in three passes, each cheaper than the next one:
+
+    size     files sharing a size, from the snapshot's size column alone
+    partial  a hash of the first and last HASH_BLOCK_SIZE bytes, on a thread pool
+    full     a hash of the whole memory-mapped file, on a process pool
+
+Files no larger than two blocks are fully covered by the partial hash and skip
+the last pass. Hashes are cached by (path, size, mtime) in a JSON file, so a
+rerun only reads the files that are new or changed since the last one.
+"""
+import hashlib
+import json
+import mmap
+import os
+import time
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from snapshot_format import SnapshotReader
+
+HASH_BLOCK_SIZE = 64 * 1024
+# Bytes hashed per update when a whole file is hashed
+FULL_HASH_CHUNK = 8 * 1024 * 1024
+DEFAULT_HASH_WORKERS = min(4, os.cpu_count() or 1)
+DEFAULT_HASH_CACHE_FILE = "hash_cache.json"
+# Empty files are all "duplicates" of each other and free nothing
+MIN_DUPLICATE_SIZE = 1
+
+PARTIAL = "partial"
+FULL = "full"
+
+# reclaimable is what deleting every copy but one would free
+DuplicateGroup = namedtuple("DuplicateGroup", ["size", "digest", "paths", "reclaimable"])
+
+
+def _new_hash():
+    return hashlib.blake2b(digest_size=20)
+
+
+def partial_hash(path, size, block=HASH_BLOCK_SIZE):
+    """Hash the first and the last block of a file (the whole file when it fits in two blocks)"""
+    digest = _new_hash()
+    with open(path, "rb") as f:
+        digest.update(f.read(block))
+        if size > block:
+            f.seek(max(block, size - block))
+            digest.update(f.read(block))
+    return digest.hexdigest()
+
+
+def full_hash(path):
+    """Hash a whole file through a read-only mapping; runs in the process pool"""
+    digest = _new_hash()
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+                for offset in range(0, size, FULL_HASH_CHUNK):
+                    digest.update(view[offset:offset + FULL_HASH_CHUNK])
+    return digest.hexdigest()
+
+
+def _full_hash_or_none(path):
+    try:
+        return full_hash(path)
+    except OSError:
+        return None
+
+
+class HashCache:
+    """{path: [size, mtime, partial hash, full hash]} kept between runs.
+
+    save() only writes the entries used since the cache was loaded, so files that are
+    gone or no longer duplicate candidates drop out.
+    """
+
+    def __init__(self, file_path=DEFAULT_HASH_CACHE_FILE):
+        self.file_path = file_path
+        self.entries = {}
+        self.used = {}
+        self.hits = 0
+        if file_path is not None:
+            try:
+                with open(file_path, "r") as f:
+                    self.entries = json.load(f)
+            except (FileNotFoundError, ValueError):
+                self.entries = {}
+
+    def get(self, path, size, mtime, kind):
+        entry = self.entries.get(path)
+        if entry is None or entry[0] != size or entry[1] != mtime:
+            return None
+        self.used[path] = entry
+        value = entry[2] if kind == PARTIAL else entry[3]
+        if value is not None:
+            self.hits += 1
+        return value
+
+    def put(self, path, size, mtime, kind, value):
+        entry = self.entries.get(path)
+        if entry is None or entry[0] != size or entry[1] != mtime:
+            entry = self.entries[path] = [size, mtime, None, None]
+        entry[2 if kind == PARTIAL else 3] = value
+        self.used[path] = entry
+
+    def save(self):
+        if self.file_path is None:
+            return
+        tmp_path = self.file_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.used, f)
+        os.replace(tmp_path, self.file_path)
+
+
+def size_candidates(snapshot_paths, min_size=MIN_DUPLICATE_SIZE):
+    """Return {size: [path, ...]} for the sizes shared by more than one file of the snapshots.
+
+    snapshot_paths is one snapshot or a list of them; a copy on another volume is a candidate too.
+    """
+    if isinstance(snapshot_paths, str):
+        snapshot_paths = [snapshot_paths]
+    # The size columns are counted first, so only the paths of candidates are decoded
+    counts = Counter()
+    for snapshot_path in snapshot_paths:
+        with SnapshotReader(snapshot_path) as reader:
+            counts.update(reader.sizes)
+    wanted = {size for size, count in counts.items() if count > 1 and size >= min_size}
+    groups = {}
+    for snapshot_path in snapshot_paths:
+        with SnapshotReader(snapshot_path) as reader:
+            for path, size in zip(reader.iter_paths(), reader.sizes):
+                if size in wanted:
+                    groups.setdefault(size, set()).add(path)
+    # A path in two snapshots (a volume mounted inside another one) is still a single file
+    return {size: sorted(paths) for size, paths in groups.items() if len(paths) > 1}
+
+
+class _Progress:
+    """Calls on_progress(stage, done, total) at most every interval seconds, and at the end of a stage"""
+
+    def __init__(self, on_progress, interval=0.25):
+        self.on_progress = on_progress
+        self.interval = interval
+        self.last = 0.0
+
+    def __call__(self, stage, done, total):
+        if self.on_progress is None:
+            return
+        now = time.monotonic()
+        if done == total or now - self.last >= self.interval:
+            self.last = now
+            self.on_progress(stage, done, total)
+
+
+def _stat_and_hash(path, size, cache, block):
+    """Return (path, mtime, partial hash), or None when the file changed size or is unreadable"""
+    try:
+        st = os.stat(path)
+        if st.st_size != size:
+            return None
+        digest = cache.get(path, size, st.st_mtime, PARTIAL)
+        if digest is None:
+            digest = partial_hash(path, size, block)
+        return path, st.st_mtime, digest
+    except OSError:
+        return None
+
+
+def find_duplicates(snapshot_paths, cache=None, min_size=MIN_DUPLICATE_SIZE, workers=DEFAULT_HASH_WORKERS,
+                    block=HASH_BLOCK_SIZE, on_progress=None, cancel=None):
+    """Return the DuplicateGroups of one snapshot or a list of them, the most reclaimable first.
+
+    on_progress(stage, done, total) is called a few times per second with stage "partial" or
+    "full"; setting the cancel event stops the search and returns what was confirmed so far.
+    """
+    if cache is None:
+        cache = HashCache(None)
+    progress = _Progress(on_progress)
+    by_size = size_candidates(snapshot_paths, min_size)
+
+    candidates = [(size, path) for size, paths in by_size.items() for path in paths]
+    del by_size
+    partial_groups = {}
+    # Partial hashes are a couple of small reads each, so threads keep enough of them in flight
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(lambda item: _stat_and_hash(item[1], item[0], cache, block), candidates)
+        for done, ((size, _), result) in enumerate(zip(candidates, results), 1):
+            if result is not None:
+                path, mtime, digest = result
+                cache.put(path, size, mtime, PARTIAL, digest)
+                partial_groups.setdefault((size, digest), []).append((path, mtime))
+            progress(PARTIAL, done, len(candidates))
+            if cancel is not None and cancel.is_set():
+                executor.shutdown(cancel_futures=True)
+                break
+    del candidates
+
+    confirmed = {}
+    to_hash = []
+    for (size, digest), members in partial_groups.items():
+        if len(members) < 2:
+            continue
+        if size <= 2 * block:
+            confirmed[(size, digest)] = [path for path, _ in members]
+            continue
+        for path, mtime in members:
+            cached = cache.get(path, size, mtime, FULL)
+            if cached is not None:
+                confirmed.setdefault((size, cached), []).append(path)
+            else:
+                to_hash.append((size, path, mtime))
+    del partial_groups
+
+    if to_hash and not (cancel is not None and cancel.is_set()):
+        # multiprocessing is slow to import, and most searches never get this far
+        from concurrent.futures import ProcessPoolExecutor
+        # Whole-file hashing is CPU bound, so it runs in processes rather than threads
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = executor.map(_full_hash_or_none, [path for _, path, _ in to_hash], chunksize=16)
+            for done, ((size, path, mtime), digest) in enumerate(zip(to_hash, futures), 1):
+                if digest is not None:
+                    cache.put(path, size, mtime, FULL, digest)
+                    confirmed.setdefault((size, digest), []).append(path)
+                progress(FULL, done, len(to_hash))
+                if cancel is not None and cancel.is_set():
+                    executor.shutdown(cancel_futures=True)
+                    break
+
+    groups = [DuplicateGroup(size, digest, sorted(paths), size * (len(paths) - 1))
+              for (size, digest), paths in confirmed.items() if len(paths) > 1]
+    groups.sort(key=lambda group: group.reclaimable, reverse=True)
+    return groups
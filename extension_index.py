@@ -0,0 +1,101 @@
+"""Per-extension index of a snapshot.
+
+Built from the ext column that every snapshot stores, it keeps the file count,
+bytes and largest files of each extension, so switching the File Tracker's
+extension filter (or combining several) is a lookup instead of a new scan.
+"""
+import heapq
+
+from snapshot_format import SnapshotReader
+from tracker_engine import DEFAULT_TOP_FILES, file_extension
+
+
+def normalize_extensions(extensions):
+    """Return a set of lower-cased extensions with their dots, or None for no filter"""
+    if not extensions:
+        return None
+    return {ext.lower() if ext.startswith(".") else "." + ext.lower() for ext in extensions}
+
+
+def filter_changes(new_files, grown_files, deleted_files, extensions=None):
+    """Keep only the changes whose paths have one of extensions"""
+    extensions = normalize_extensions(extensions)
+    if extensions is None:
+        return new_files, grown_files, deleted_files
+    return ([item for item in new_files if file_extension(item[0]) in extensions],
+            [item for item in grown_files if file_extension(item[0]) in extensions],
+            [path for path in deleted_files if file_extension(path) in extensions])
+
+
+class ExtensionIndex:
+    """{extension: (files, bytes)} plus the count largest files of every extension"""
+
+    def __init__(self, totals, largest, count=DEFAULT_TOP_FILES):
+        self.totals = totals
+        self.largest_by_extension = largest
+        self.count = count
+
+    @classmethod
+    def from_snapshot(cls, file_path, count=DEFAULT_TOP_FILES):
+        """Index a snapshot file, or return None if it predates the ext column"""
+        with SnapshotReader(file_path) as reader:
+            names = reader.extension_names()
+            if names is None:
+                return None
+            files = [0] * len(names)
+            sizes = [0] * len(names)
+            heaps = [[] for _ in names]
+            # Only the columns are read here; paths are decoded for the winning rows alone
+            for row, (ext, size) in enumerate(zip(reader.column("ext"), reader.sizes)):
+                files[ext] += 1
+                sizes[ext] += size
+                heap = heaps[ext]
+                if len(heap) < count:
+                    heapq.heappush(heap, (size, row))
+                elif size > heap[0][0]:
+                    heapq.heapreplace(heap, (size, row))
+            wanted = {row for heap in heaps for _, row in heap}
+            paths = {}
+            last = max(wanted, default=-1)
+            for row, path in enumerate(reader.iter_paths()):
+                if row > last:
+                    break
+                if row in wanted:
+                    paths[row] = path
+        totals = {}
+        largest = {}
+        for index, name in enumerate(names):
+            if files[index]:
+                totals[name] = (files[index], sizes[index])
+                largest[name] = [(paths[row], size) for size, row in sorted(heaps[index], reverse=True)]
+        return cls(totals, largest, count)
+
+    @classmethod
+    def merged(cls, indexes, count=DEFAULT_TOP_FILES):
+        """Combine the indexes of separate snapshots (one per volume); None entries are skipped"""
+        totals = {}
+        candidates = {}
+        for index in indexes:
+            if index is None:
+                continue
+            for ext, (files, size) in index.totals.items():
+                old_files, old_size = totals.get(ext, (0, 0))
+                totals[ext] = (old_files + files, old_size + size)
+            for ext, largest in index.largest_by_extension.items():
+                candidates.setdefault(ext, []).extend(largest)
+        largest = {ext: heapq.nlargest(count, items, key=lambda item: item[1]) for ext, items in candidates.items()}
+        return cls(totals, largest, count)
+
+    def __len__(self):
+        return len(self.totals)
+
+    def extensions(self):
+        """Return the extensions from the most to the fewest bytes"""
+        return sorted(self.totals, key=lambda ext: self.totals[ext][1], reverse=True)
+
+    def largest(self, extensions=None):
+        """Return [(path, size), ...] of the largest files having one of extensions (all files for None)"""
+        extensions = normalize_extensions(extensions)
+        keys = self.largest_by_extension if extensions is None else extensions
+        candidates = (item for ext in keys for item in self.largest_by_extension.get(ext, ()))
+        return heapq.nlargest(self.count, candidates, key=lambda item: item[1])
@@ -0,0 +1,656 @@
+"""GUI-free File Tracker: scan a folder tree into snapshots, diff them and report.
+
+Only the standard library and the other tracker modules are imported, so the
+same engine the desktop app uses can run on headless machines and from cron:
+
+    python file_tracker.py scan --root / --snapshot /var/lib/tracker/files.snap
+    python file_tracker.py scan --all-volumes --snapshot /var/lib/tracker/files.snap
+    python file_tracker.py scan --root / --background --files-per-second 500
+    python file_tracker.py diff OLD.snap NEW.snap
+    python file_tracker.py report --snapshot /var/lib/tracker/files.snap
+    python file_tracker.py history --history-dir /var/lib/tracker/history growth /home --days 7
+    python file_tracker.py duplicates --snapshot /var/lib/tracker/files.snap --min-size 1048576
+
+Every command prints one JSON document on stdout.
+"""
+import heapq
+import json
+import os
+import platform
+import re
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+
+import background_scan
+import directory_index
+import duplicate_finder
+import extension_index
+import path_trie
+import snapshot_diff
+import snapshot_format
+import snapshot_history
+import tracker_engine
+
+DEFAULT_SNAPSHOT_FILE = "snapshot_files.snap"
+# Indented-JSON snapshot written by older versions, converted on first load
+DEFAULT_LEGACY_SNAPSHOT_FILE = "snapshot_files.json"
+DEFAULT_HISTORY_DIR = "snapshot_history"
+# Full timestamped copies written by older versions, importable into the history
+DEFAULT_BACKUP_DIR = "snapshot_backups"
+WINDOWS_EXCLUDED_FOLDERS = [
+    r"C:\Windows", r"C:\Program Files", r"C:\Program Files (x86)",
+    r"C:\$Recycle.Bin", r"C:\System Volume Information"
+]
+POSIX_EXCLUDED_FOLDERS = ["/proc", "/sys", "/dev", "/run"]
+# Checkpoints of interrupted scans older than this are dropped rather than resumed
+CHECKPOINT_MAX_AGE = 24 * 60 * 60
+
+
+def default_root():
+    return tracker_engine.DEFAULT_SCAN_ROOT if os.name == "nt" else "/"
+
+
+def default_excluded():
+    return WINDOWS_EXCLUDED_FOLDERS if os.name == "nt" else POSIX_EXCLUDED_FOLDERS
+
+
+def list_mount_points():
+    """Return the mount points of the local partitions, or just the default root without psutil"""
+    try:
+        import psutil
+    except ImportError:
+        return [default_root()]
+    return [part.mountpoint for part in psutil.disk_partitions() if "cdrom" not in part.opts]
+
+
+def _windows_disk_number(mount):
+    """Return the number of the physical disk holding a drive letter, or None"""
+    import ctypes
+    from ctypes import wintypes
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    kernel32.CreateFileW.restype = wintypes.HANDLE
+    # Querying the extents needs no access rights, so this works without elevation
+    handle = kernel32.CreateFileW(rf"\\.\{mount.rstrip(os.sep)}", 0, 3, None, 3, 0, None)
+    if handle == wintypes.HANDLE(-1).value:
+        return None
+    try:
+        # VOLUME_DISK_EXTENTS with room for one DISK_EXTENT: count, padding, disk number, offset, length
+        buffer = ctypes.create_string_buffer(32)
+        returned = wintypes.DWORD()
+        ioctl_volume_get_volume_disk_extents = 0x00560000
+        if not kernel32.DeviceIoControl(handle, ioctl_volume_get_volume_disk_extents, None, 0, buffer,
+                                        len(buffer), ctypes.byref(returned), None):
+            return None
+        return int.from_bytes(buffer.raw[8:12], "little")
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+def device_key(mount):
+    """Return an identifier of the physical device behind a mount point.
+
+    Partitions of one disk share a key (their parent block device on Linux, the disk number on
+    Windows); virtual file systems such as tmpfs get one key each.
+    """
+    if os.name == "nt":
+        try:
+            disk = _windows_disk_number(mount)
+        except (OSError, AttributeError):
+            disk = None
+        if disk is not None:
+            return f"disk{disk}"
+    dev = os.stat(mount).st_dev
+    if sys.platform.startswith("linux"):
+        block = os.path.realpath(f"/sys/dev/block/{os.major(dev)}:{os.minor(dev)}")
+        if os.path.exists(block):
+            if os.path.exists(os.path.join(block, "partition")):
+                block = os.path.dirname(block)
+            return os.path.basename(block)
+        return f"{os.major(dev)}:{os.minor(dev)}"
+    return f"dev{dev}"
+
+
+def group_by_device(mounts):
+    """Return {device key: [mount, ...]} keeping the order of mounts"""
+    groups = {}
+    for mount in mounts:
+        try:
+            key = device_key(mount)
+        except OSError:
+            key = mount
+        groups.setdefault(key, []).append(mount)
+    return groups
+
+
+def _is_below(path, root):
+    return path != root and path.startswith(root.rstrip("\\/") + os.sep)
+
+
+def volume_files(mount, snapshot_file=DEFAULT_SNAPSHOT_FILE, history_dir=DEFAULT_HISTORY_DIR):
+    """Return the snapshot file and history folder of one volume; the default root keeps the plain names"""
+    if os.path.normcase(mount) == os.path.normcase(default_root()):
+        return snapshot_file, history_dir
+    slug = re.sub(r"[^0-9A-Za-z]+", "_", mount).strip("_") or "root"
+    base, ext = os.path.splitext(snapshot_file)
+    return f"{base}_{slug}{ext}", f"{history_dir}_{slug}"
+
+
+def checkpoint_files(snapshot_file):
+    """Return the partial snapshot and the state file an interrupted scan of snapshot_file leaves"""
+    return snapshot_file + ".partial", snapshot_file + ".checkpoint.json"
+
+
+class ScanResult:
+    """Everything one FileTracker.scan produced, small enough to hand to a GUI thread"""
+
+    def __init__(self, stats, snapshot_path, ext_index, dir_index, older_dir_index, new_files, grown_files,
+                 deleted_files):
+        self.stats = stats
+        self.snapshot_path = snapshot_path
+        self.ext_index = ext_index
+        self.dir_index = dir_index
+        self.older_dir_index = older_dir_index
+        self.new_files = new_files
+        self.grown_files = grown_files
+        self.deleted_files = deleted_files
+
+    @property
+    def changes(self):
+        return self.new_files, self.grown_files, self.deleted_files
+
+
+class FileTracker:
+    """Scans root_path into snapshot_file and records every scan in the history store in history_dir"""
+
+    def __init__(self, root_path=None, snapshot_file=DEFAULT_SNAPSHOT_FILE, history_dir=DEFAULT_HISTORY_DIR,
+                 excluded=None, workers=tracker_engine.DEFAULT_SCAN_WORKERS, top_count=tracker_engine.DEFAULT_TOP_FILES,
+                 legacy_snapshot_file=DEFAULT_LEGACY_SNAPSHOT_FILE):
+        self.root_path = root_path or default_root()
+        self.snapshot_file = snapshot_file
+        self.history = snapshot_history.SnapshotHistory(history_dir)
+        self.excluded = default_excluded() if excluded is None else excluded
+        self.workers = workers
+        self.top_count = top_count
+        self.legacy_snapshot_file = legacy_snapshot_file
+
+    def migrate_legacy_snapshot(self):
+        """Convert a leftover JSON snapshot once; returns whether a previous snapshot exists"""
+        if (self.legacy_snapshot_file and not os.path.exists(self.snapshot_file)
+                and os.path.exists(self.legacy_snapshot_file)):
+            snapshot_format.convert_json_snapshot(self.legacy_snapshot_file, self.snapshot_file)
+        return os.path.exists(self.snapshot_file)
+
+    def has_previous_snapshot(self):
+        """Return whether a previous scan left files to diff against; an empty snapshot counts as none"""
+        if not self.migrate_legacy_snapshot():
+            return False
+        try:
+            with snapshot_format.SnapshotReader(self.snapshot_file) as reader:
+                return len(reader) > 0
+        except snapshot_format.SnapshotFormatError:
+            return False
+
+    def load_snapshot(self, column="size"):
+        """Return the current snapshot as {path: value}, or None before the first scan"""
+        self.migrate_legacy_snapshot()
+        try:
+            return snapshot_format.read_snapshot(self.snapshot_file, column)
+        except FileNotFoundError:
+            return None
+
+    def save_snapshot(self, snapshot, mtimes=None, dir_mtimes=None, scanned_at=0.0, dir_totals=None):
+        """Write the snapshot (a dict or PathTrie) next to the current one and return its path.
+
+        install_snapshot makes it current.
+        """
+        new_path = self.snapshot_file + ".new"
+        snapshot_format.write_snapshot(new_path, snapshot, mtimes, dir_mtimes, scanned_at, dir_totals)
+        return new_path
+
+    def install_snapshot(self, new_path):
+        """Record the new snapshot in the history, then make it the current one"""
+        previous = self.snapshot_file if os.path.exists(self.snapshot_file) else None
+        self.history.add(new_path, previous)
+        os.replace(new_path, self.snapshot_file)
+
+    @property
+    def checkpoint_files(self):
+        return checkpoint_files(self.snapshot_file)
+
+    def has_checkpoint(self):
+        return os.path.exists(self.checkpoint_files[1])
+
+    def write_checkpoint(self, frontier, trie, dir_mtimes, dir_totals, scanned_at):
+        """Save the files found so far and the folders still to list"""
+        partial_path, state_path = self.checkpoint_files
+        snapshot_format.write_snapshot(partial_path, trie, None, dir_mtimes, scanned_at, dir_totals)
+        state = {"root": self.root_path, "scanned_at": scanned_at, "files": len(trie),
+                 "pending": sorted(frontier.pending)}
+        # The state goes last and names the file count, so a partial from a later checkpoint is never mixed in
+        tmp_path = state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, state_path)
+
+    def load_checkpoint(self):
+        """Return (trie, dir_mtimes, direct dir totals, pending folders, scanned_at), or None without a usable one"""
+        partial_path, state_path = self.checkpoint_files
+        try:
+            with open(state_path, "r") as f:
+                state = json.load(f)
+            if state["root"] != self.root_path or time.time() - state["scanned_at"] > CHECKPOINT_MAX_AGE:
+                return None
+            with snapshot_format.SnapshotReader(partial_path) as reader:
+                if len(reader) != state["files"]:
+                    return None
+                trie = path_trie.PathTrie.from_items(zip(reader.iter_paths(), reader.sizes, reader.mtimes))
+                dir_mtimes = reader.dir_mtimes() or {}
+                # The directory table also lists excluded folders, which never had totals
+                dir_totals = {path: totals for path, totals in (reader.dir_totals() or {}).items()
+                              if totals != (0, 0) or dir_mtimes.get(path) != tracker_engine.UNKNOWN_DIR_MTIME}
+        except (OSError, ValueError, KeyError):
+            return None
+        return trie, dir_mtimes, dir_totals, state["pending"], state["scanned_at"]
+
+    def discard_checkpoint(self):
+        for path in self.checkpoint_files:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def scan(self, on_partial=None, on_progress=None, profile_dirs=0, pacer=None, checkpoint_interval=None,
+             cancel=None):
+        """Scan, save and install a new snapshot and diff it against the previous one.
+
+        on_partial receives the running list of largest files while the scan is in progress,
+        on_progress the ScanStats a few times per second, and profile_dirs > 0 keeps that many
+        of the slowest directories in stats.slowest_dirs(). pacer is handed to the scan threads
+        (see background_scan.ScanPacer). With checkpoint_interval the scan resumes from the
+        checkpoint of an interrupted one and writes a new checkpoint every that many seconds;
+        setting cancel stops it at the next folder with tracker_engine.ScanInterrupted.
+
+        A root that cannot be listed (an unplugged drive, a missing folder) raises OSError and
+        leaves the previous snapshot in place, instead of recording every file as deleted.
+        """
+        # Raises the actual error (not found, access denied, device not ready) before anything is written
+        with os.scandir(self.root_path):
+            pass
+        scanned_at = time.time()
+        has_previous = self.has_previous_snapshot()
+        stats = tracker_engine.ScanStats(on_progress, profile_dirs=profile_dirs)
+        with stats.stage("load"):
+            resumed = self.load_checkpoint() if checkpoint_interval is not None else None
+        top = tracker_engine.TopFiles(self.top_count, on_update=on_partial)
+        dir_totals = tracker_engine.DirectoryTotals()
+        # A PathTrie holds each folder once instead of a full path string per file
+        current = path_trie.PathTrie()
+        dir_mtimes = {}
+        pending = [self.root_path]
+        if resumed is not None:
+            # The snapshot keeps the time the interrupted scan started, which is the safe side for change detection
+            current, dir_mtimes, direct_totals, pending, scanned_at = resumed
+            dir_totals.direct.update(direct_totals)
+            for path, size in current.items():
+                top.push(path, size)
+            stats.resumed_files = len(current)
+        frontier = None
+        if checkpoint_interval is not None or cancel is not None:
+            on_checkpoint = None
+            if checkpoint_interval is not None:
+                def on_checkpoint(frontier):
+                    # dict.copy() is atomic, while scan threads may still be adding mtimes
+                    self.write_checkpoint(frontier, current, dir_mtimes.copy(), dict(dir_totals.direct),
+                                          scanned_at)
+            frontier = tracker_engine.ScanFrontier(pending, on_checkpoint, checkpoint_interval or 0.0, cancel)
+        with stats.stage("scan"):
+            current = tracker_engine.scan_folder_files(self.root_path, None, self.excluded, self.workers, stats,
+                                                       None, dir_mtimes, top, dir_totals, current, pacer, frontier)
+        if dir_mtimes.get(self.root_path, tracker_engine.UNKNOWN_DIR_MTIME) == tracker_engine.UNKNOWN_DIR_MTIME:
+            # The root went away while the scan was running
+            raise OSError(f"could not list the scan root {self.root_path}")
+        with stats.stage("save"):
+            totals = dir_totals.rolled_up()
+            new_path = self.save_snapshot(current, None, dir_mtimes, scanned_at, totals)
+        del current
+        # Both snapshots are on disk and path-sorted, so the previous one is never loaded into a dict
+        older_dir_index = None
+        with stats.stage("diff"):
+            if has_previous:
+                new, grown, deleted = snapshot_diff.compare_snapshot_files(self.snapshot_file, new_path)
+                older_dir_index = directory_index.DirectoryIndex.from_snapshot(self.snapshot_file)
+            else:
+                new, grown, deleted = [], [], []
+        with stats.stage("history"):
+            self.install_snapshot(new_path)
+            # Whatever scan finished last supersedes an interrupted one
+            self.discard_checkpoint()
+        with stats.stage("index"):
+            ext_index = extension_index.ExtensionIndex.from_snapshot(self.snapshot_file, self.top_count)
+        return ScanResult(stats, self.snapshot_file, ext_index, directory_index.DirectoryIndex(totals), older_dir_index,
+                          new, grown, deleted)
+
+
+class VolumeTracker:
+    """One FileTracker per mount point, scanned concurrently with one pipeline per physical device.
+
+    Volumes on the same device are scanned one after the other so they do not compete for
+    the same disk; different devices run side by side. Mounts nested inside another selected
+    mount are excluded from the outer scan.
+    """
+
+    def __init__(self, mounts, snapshot_file=DEFAULT_SNAPSHOT_FILE, history_dir=DEFAULT_HISTORY_DIR,
+                 excluded=None, workers=tracker_engine.DEFAULT_SCAN_WORKERS, top_count=tracker_engine.DEFAULT_TOP_FILES,
+                 legacy_snapshot_file=DEFAULT_LEGACY_SNAPSHOT_FILE):
+        excluded = list(default_excluded() if excluded is None else excluded)
+        self.top_count = top_count
+        self.trackers = {}
+        for mount in mounts:
+            nested = [other for other in mounts if _is_below(other, mount)]
+            volume_snapshot, volume_history = volume_files(mount, snapshot_file, history_dir)
+            legacy = legacy_snapshot_file if volume_snapshot == snapshot_file else None
+            self.trackers[mount] = FileTracker(mount, volume_snapshot, volume_history, excluded + nested, workers,
+                                               top_count, legacy)
+        self.devices = group_by_device(list(self.trackers))
+
+    def scan(self, on_partial=None, on_progress=None, profile_dirs=0, pacer=None, checkpoint_interval=None,
+             cancel=None):
+        """Scan every volume; returns ({mount: ScanResult}, {mount: error}) for the volumes that failed.
+
+        Interrupted volumes (see FileTracker.scan) are among the errors as ScanInterrupted.
+        """
+        results = {}
+        errors = {}
+        partials = {}
+        lock = threading.Lock()
+
+        def partial_for(mount):
+            def update(top_files):
+                with lock:
+                    partials[mount] = top_files
+                    merged = heapq.nlargest(self.top_count, (item for files in partials.values() for item in files),
+                                            key=lambda item: item[1])
+                on_partial(merged)
+            return update if on_partial is not None else None
+
+        def scan_device(mounts):
+            for mount in mounts:
+                if cancel is not None and cancel.is_set():
+                    errors[mount] = tracker_engine.ScanInterrupted("scan stopped before this volume")
+                    continue
+                try:
+                    results[mount] = self.trackers[mount].scan(partial_for(mount), on_progress, profile_dirs,
+                                                               pacer, checkpoint_interval, cancel)
+                except (OSError, ValueError, tracker_engine.ScanInterrupted) as e:
+                    errors[mount] = e
+
+        threads = [threading.Thread(target=scan_device, args=(mounts,), daemon=True)
+                   for mounts in self.devices.values()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return {mount: results[mount] for mount in self.trackers if mount in results}, errors
+
+
+def merge_results(results, top_count=tracker_engine.DEFAULT_TOP_FILES):
+    """Combine the ScanResults of several volumes into one for a merged view (snapshot_path is None)"""
+    results = list(results)
+    totals = {}
+    older_totals = {}
+    has_older = False
+    for result in results:
+        totals.update(result.dir_index.totals)
+        if result.older_dir_index is not None:
+            older_totals.update(result.older_dir_index.totals)
+            has_older = True
+    return ScanResult(tracker_engine.ScanStats.combined([result.stats for result in results]), None,
+                      extension_index.ExtensionIndex.merged([result.ext_index for result in results], top_count),
+                      directory_index.DirectoryIndex(totals),
+                      directory_index.DirectoryIndex(older_totals) if has_older else None,
+                      [item for result in results for item in result.new_files],
+                      [item for result in results for item in result.grown_files],
+                      [path for result in results for path in result.deleted_files])
+
+
+def _changes_json(new_files, grown_files, deleted_files):
+    return {
+        "new": [{"path": path, "size": size} for path, size in new_files],
+        "grown": [{"path": path, "growth": growth} for path, growth in grown_files],
+        "deleted": deleted_files,
+    }
+
+
+def _files_json(files):
+    return [{"path": path, "size": size} for path, size in files]
+
+
+def _stats_json(stats):
+    result = {"dirs": stats.dirs, "files": stats.files, "bytes": stats.bytes, "elapsed": round(stats.elapsed, 3),
+              "files_per_second": round(stats.files_per_second, 1),
+              "errors": stats.errors, "permission_errors": stats.permission_errors, "resumed_files": stats.resumed_files,
+              "stages": {name: round(seconds, 3) for name, seconds in stats.stage_times.items()},
+              # user time well above system time means Python overhead, not syscalls, bounds the scan
+              "cpu": {"user": round(stats.user_time, 3), "system": round(stats.system_time, 3)}}
+    if stats.profile_dirs:
+        result["slowest_dirs"] = [{"path": path, "seconds": round(seconds, 4)}
+                                  for seconds, path in stats.slowest_dirs()]
+    return result
+
+
+def _print_progress(stats):
+    sys.stderr.write(stats.progress_text() + "\n")
+
+
+def _background_options(args):
+    """Return (pacer, checkpoint_interval, cancel) for --background; SIGINT and SIGTERM then stop at a checkpoint"""
+    if not args.background:
+        return None, None, None
+    background_scan.lower_process_priority()
+    cancel = threading.Event()
+    for name in ("SIGINT", "SIGTERM"):
+        signal.signal(getattr(signal, name), lambda *_: cancel.set())
+    # The whole process already runs at low priority, so the scan threads are left as they are
+    pacer = background_scan.ScanPacer(args.files_per_second, args.syscalls_per_second, low_priority=False,
+                                      cancel=cancel)
+    return pacer, args.checkpoint_interval, cancel
+
+
+def scan_command(args):
+    roots = list_mount_points() if args.all_volumes else (args.root or [None])
+    on_progress = _print_progress if args.progress else None
+    pacer, checkpoint_interval, cancel = _background_options(args)
+    if len(roots) > 1:
+        return volumes_command(args, roots, on_progress, pacer, checkpoint_interval, cancel)
+    tracker = FileTracker(roots[0], args.snapshot, args.history_dir, args.exclude, args.workers, args.top)
+    try:
+        result = tracker.scan(on_progress=on_progress, profile_dirs=args.profile, pacer=pacer,
+                              checkpoint_interval=checkpoint_interval, cancel=cancel)
+    except tracker_engine.ScanInterrupted as e:
+        return {"command": "scan", "host": platform.node(), "root": tracker.root_path, "interrupted": str(e),
+                "checkpoint": tracker.checkpoint_files[1]}
+    return {
+        "command": "scan",
+        "host": platform.node(),
+        "root": tracker.root_path,
+        "snapshot": result.snapshot_path,
+        "stats": _stats_json(result.stats),
+        "largest": _files_json(result.ext_index.largest() if result.ext_index is not None else []),
+        "changes": _changes_json(*result.changes),
+    }
+
+
+def volumes_command(args, roots, on_progress, pacer=None, checkpoint_interval=None, cancel=None):
+    tracker = VolumeTracker(roots, args.snapshot, args.history_dir, args.exclude, args.workers, args.top)
+    results, errors = tracker.scan(on_progress=on_progress, profile_dirs=args.profile, pacer=pacer,
+                                   checkpoint_interval=checkpoint_interval, cancel=cancel)
+    merged = merge_results(results.values(), args.top)
+    return {
+        "command": "scan",
+        "host": platform.node(),
+        "devices": tracker.devices,
+        "volumes": [{"root": mount, "snapshot": result.snapshot_path, "stats": _stats_json(result.stats),
+                     "changes": _changes_json(*result.changes)} for mount, result in results.items()],
+        "errors": {mount: str(error) for mount, error in errors.items()},
+        "stats": _stats_json(merged.stats),
+        "largest": _files_json(merged.ext_index.largest()),
+        "changes": _changes_json(*merged.changes),
+    }
+
+
+def diff_command(args):
+    changes = snapshot_diff.compare_snapshot_files(args.old, args.new, args.threshold)
+    return {"command": "diff", "host": platform.node(), "old": args.old, "new": args.new,
+            "changes": _changes_json(*changes)}
+
+
+def report_command(args):
+    with snapshot_format.SnapshotReader(args.snapshot) as reader:
+        count = len(reader)
+        scanned_at = reader.scanned_at
+        total = sum(reader.sizes)
+    report = {"command": "report", "host": platform.node(), "snapshot": args.snapshot, "files": count,
+              "bytes": total, "scanned_at": scanned_at}
+    ext_index = extension_index.ExtensionIndex.from_snapshot(args.snapshot, args.top)
+    if ext_index is not None:
+        report["largest"] = _files_json(ext_index.largest())
+        report["extensions"] = [{"extension": ext, "files": ext_index.totals[ext][0], "bytes": ext_index.totals[ext][1]}
+                                for ext in ext_index.extensions()[:args.top]]
+    dir_index = directory_index.DirectoryIndex.from_snapshot(args.snapshot)
+    if dir_index is not None:
+        largest = sorted(dir_index.totals.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+        report["folders"] = [{"path": path, "bytes": size, "files": files} for path, (size, files) in largest]
+    return report
+
+
+def duplicates_command(args):
+    if not args.snapshot:
+        args.snapshot = [DEFAULT_SNAPSHOT_FILE]
+    cache = duplicate_finder.HashCache(args.cache)
+    groups = duplicate_finder.find_duplicates(args.snapshot, cache, args.min_size, args.workers)
+    cache.save()
+    return {"command": "duplicates", "host": platform.node(), "snapshots": args.snapshot,
+            "groups": len(groups), "reclaimable": sum(group.reclaimable for group in groups),
+            "cache_hits": cache.hits,
+            "duplicates": [{"size": group.size, "hash": group.digest, "reclaimable": group.reclaimable,
+                            "paths": group.paths} for group in groups[:args.top]]}
+
+
+def _time_range(args):
+    """Return (start, end) timestamps from --since/--until dates or --days"""
+    end = datetime.fromisoformat(args.until).timestamp() if args.until else None
+    if args.days is not None:
+        start = (end or time.time()) - args.days * 86400
+    else:
+        start = datetime.fromisoformat(args.since).timestamp() if args.since else None
+    return start, end
+
+
+def history_command(args):
+    history = snapshot_history.SnapshotHistory(args.history_dir)
+    output = {"command": "history", "action": args.action, "history_dir": args.history_dir}
+    if args.action == "import":
+        output["imported"] = history.import_backups(args.backup_dir)
+    elif args.action == "compact":
+        history.compact()
+    if args.action in ("list", "import", "compact"):
+        output["entries"] = [entry._asdict() for entry in history.entries()]
+        return output
+    start, end = _time_range(args)
+    output.update(since=start, until=end)
+    if args.action == "growth":
+        output.update(path=args.path, growth=history.growth(args.path, start, end))
+    elif args.action == "appeared":
+        output["appeared"] = _files_json(history.appeared(start, end, args.under))
+    else:
+        output["changes"] = _changes_json(*history.changes_between(start, end, args.threshold, args.under))
+    return output
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Headless File Tracker; every command prints JSON")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scan = commands.add_parser("scan", help="Scan a folder tree, save a snapshot and diff it against the previous one")
+    scan.add_argument("--root", action="append", default=None,
+                      help="Folder to scan (default: C:\\ on Windows, / elsewhere); repeat to scan several volumes")
+    scan.add_argument("--all-volumes", action="store_true", help="Scan every local partition (needs psutil)")
+    scan.add_argument("--snapshot", default=DEFAULT_SNAPSHOT_FILE)
+    scan.add_argument("--history-dir", default=DEFAULT_HISTORY_DIR)
+    scan.add_argument("--exclude", action="append", default=None, help="Folder to skip (repeatable)")
+    scan.add_argument("--workers", type=int, default=tracker_engine.DEFAULT_SCAN_WORKERS)
+    scan.add_argument("--top", type=int, default=tracker_engine.DEFAULT_TOP_FILES)
+    scan.add_argument("--progress", action="store_true", help="Print scan progress on stderr")
+    scan.add_argument("--profile", type=int, default=0, metavar="N",
+                      help="Report the N directories that took the longest to list")
+    scan.add_argument("--background", action="store_true",
+                      help="Run at low CPU and I/O priority, rate limited, checkpointing so an interrupted "
+                           "scan (SIGINT/SIGTERM) resumes on the next run")
+    scan.add_argument("--files-per-second", type=int, default=background_scan.DEFAULT_FILES_PER_SECOND,
+                      help="With --background, files read per second at most (0 = no limit)")
+    scan.add_argument("--syscalls-per-second", type=int, default=background_scan.DEFAULT_SYSCALLS_PER_SECOND,
+                      help="With --background, directory listings and stat calls per second at most (0 = no limit)")
+    scan.add_argument("--checkpoint-interval", type=float, default=background_scan.DEFAULT_CHECKPOINT_INTERVAL,
+                      help="With --background, seconds between checkpoints")
+    scan.set_defaults(handler=scan_command)
+
+    diff = commands.add_parser("diff", help="Compare two snapshot files")
+    diff.add_argument("old")
+    diff.add_argument("new")
+    diff.add_argument("--threshold", type=int, default=snapshot_diff.GROWTH_THRESHOLD,
+                      help="Minimum growth in bytes to report a file as grown")
+    diff.set_defaults(handler=diff_command)
+
+    report = commands.add_parser("report", help="Summarize a snapshot file")
+    report.add_argument("--snapshot", default=DEFAULT_SNAPSHOT_FILE)
+    report.add_argument("--top", type=int, default=tracker_engine.DEFAULT_TOP_FILES)
+    report.set_defaults(handler=report_command)
+
+    duplicates = commands.add_parser("duplicates", help="Find files with identical contents in snapshots")
+    duplicates.add_argument("--snapshot", action="append",
+                            help="Snapshot to search; repeat it to match files across volumes "
+                                 f"(default: {DEFAULT_SNAPSHOT_FILE})")
+    duplicates.add_argument("--cache", default=duplicate_finder.DEFAULT_HASH_CACHE_FILE,
+                            help="Hash cache reused by later runs")
+    duplicates.add_argument("--min-size", type=int, default=duplicate_finder.MIN_DUPLICATE_SIZE)
+    duplicates.add_argument("--workers", type=int, default=duplicate_finder.DEFAULT_HASH_WORKERS)
+    duplicates.add_argument("--top", type=int, default=100, help="Number of groups to list")
+    duplicates.set_defaults(handler=duplicates_command)
+
+    history = commands.add_parser("history", help="Query and maintain the snapshot history")
+    history.add_argument("--history-dir", default=DEFAULT_HISTORY_DIR)
+    actions = history.add_subparsers(dest="action", required=True)
+    actions.add_parser("list", help="List the base snapshot and the deltas")
+    actions.add_parser("compact", help="Apply the retention policy now")
+    imports = actions.add_parser("import", help="Add the timestamped backups of older versions")
+    imports.add_argument("--backup-dir", default=DEFAULT_BACKUP_DIR)
+    growth = actions.add_parser("growth", help="Net growth of a file or folder over a time range")
+    growth.add_argument("path")
+    appeared = actions.add_parser("appeared", help="Files that appeared over a time range")
+    changes = actions.add_parser("changes", help="New, grown and deleted files over a time range")
+    changes.add_argument("--threshold", type=int, default=snapshot_diff.GROWTH_THRESHOLD)
+    for action in (growth, appeared, changes):
+        action.add_argument("--since", help="ISO date or time; changes scanned after it are counted")
+        action.add_argument("--until", help="ISO date or time (default: the latest scan)")
+        action.add_argument("--days", type=float, help="Shorthand for --since N days before --until")
+        if action is not growth:
+            action.add_argument("--under", help="Only report files below this folder")
+    history.set_defaults(handler=history_command)
+
+    args = parser.parse_args(argv)
+    try:
+        output = args.handler(args)
+    except (OSError, ValueError) as e:
+        print(json.dumps({"command": args.command, "error": str(e)}), file=sys.stderr)
+        return 1
+    json.dump(output, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
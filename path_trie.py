@@ -0,0 +1,212 @@
+"""Compact in-memory snapshot: a trie of path components with array-backed columns.
+
+A {path: size} dict of a full drive holds every absolute path as its own string,
+so the long prefixes under AppData are stored millions of times over. PathTrie
+stores each directory once, as a node holding one component, and each file as
+a slot in parallel arrays: directory node, file name, size and mtime. Full paths
+are only rebuilt while iterating.
+
+It reads like a dict of sizes (len, in, [], get, iteration, items) so it can
+stand in for the snapshot dicts; the per-directory name lookup that [] and in
+need is built on first use.
+"""
+import os
+from array import array
+
+ROOT_NODE = 0
+
+
+class PathTrie:
+    """{path: size} (plus an mtime per path) stored as a trie of directories"""
+
+    def __init__(self, sep=os.sep):
+        self.sep = sep
+        # Directory nodes; node 0 is the unnamed root that paths without a separator hang off
+        self.dir_names = [""]
+        self.dir_parents = array("i", [-1])
+        self.dir_children = [None]
+        # File slots
+        self.file_dirs = array("I")
+        self.file_names = []
+        self.sizes = array("q")
+        self.mtimes = array("d")
+        # Component strings shared by every directory node with the same name
+        self._components = {}
+        self._file_index = None
+        self._last_dir = None
+        self._last_node = ROOT_NODE
+
+    @classmethod
+    def from_items(cls, items, sep=os.sep):
+        """Build a trie from (path, size, mtime) triples, e.g. the rows of a snapshot file"""
+        trie = cls(sep)
+        for path, size, mtime in items:
+            trie.add(path, size, mtime)
+        return trie
+
+    def _dir_node(self, dir_path, create):
+        if dir_path == self._last_dir:
+            return self._last_node
+        node = ROOT_NODE
+        for part in dir_path.split(self.sep):
+            children = self.dir_children[node]
+            child = children.get(part) if children is not None else None
+            if child is None:
+                if not create:
+                    return None
+                part = self._components.setdefault(part, part)
+                child = len(self.dir_names)
+                if children is None:
+                    children = self.dir_children[node] = {}
+                children[part] = child
+                self.dir_names.append(part)
+                self.dir_parents.append(node)
+                self.dir_children.append(None)
+            node = child
+        # Scans add the files of one directory back to back, so the last directory is usually the next one
+        self._last_dir = dir_path
+        self._last_node = node
+        return node
+
+    def _dir_path(self, node):
+        """Return the path of a directory node (None for the root node)"""
+        if node == ROOT_NODE:
+            return None
+        parts = []
+        while node != ROOT_NODE:
+            parts.append(self.dir_names[node])
+            node = self.dir_parents[node]
+        return self.sep.join(reversed(parts))
+
+    def _split(self, path, create):
+        dir_path, sep, name = path.rpartition(self.sep)
+        node = self._dir_node(dir_path, create) if sep else ROOT_NODE
+        return node, name
+
+    def _index(self):
+        if self._file_index is None:
+            index = [None] * len(self.dir_names)
+            for slot, (file_dir, file_name) in enumerate(zip(self.file_dirs, self.file_names)):
+                if index[file_dir] is None:
+                    index[file_dir] = {}
+                index[file_dir][file_name] = slot
+            self._file_index = index
+        return self._file_index
+
+    def _slot(self, path):
+        node, name = self._split(path, False)
+        if node is None:
+            return None
+        index = self._index()
+        if node >= len(index) or index[node] is None:
+            return None
+        return index[node].get(name)
+
+    def iter_under(self, dir_path):
+        """Yield the paths of the files anywhere below the directory dir_path, visiting only that subtree"""
+        # A root such as / or C:\ is stored without its trailing separator
+        dir_path = dir_path.rstrip(self.sep) or dir_path[:0]
+        node = self._dir_node(dir_path, False)
+        if node is None:
+            return
+        index = self._index()
+        stack = [(node, dir_path)]
+        while stack:
+            node, path = stack.pop()
+            prefix = path + self.sep
+            if node < len(index) and index[node] is not None:
+                for name in index[node]:
+                    yield prefix + name
+            for name, child in (self.dir_children[node] or {}).items():
+                stack.append((child, prefix + name))
+
+    def add(self, path, size, mtime=0.0):
+        """Append a file; paths are assumed new, as a scan yields each file once (see __setitem__)"""
+        node, name = self._split(path, True)
+        slot = len(self.file_names)
+        self.file_dirs.append(node)
+        self.file_names.append(name)
+        self.sizes.append(size)
+        self.mtimes.append(mtime)
+        if self._file_index is not None:
+            self._file_index.extend([None] * (len(self.dir_names) - len(self._file_index)))
+            if self._file_index[node] is None:
+                self._file_index[node] = {}
+            self._file_index[node][name] = slot
+
+    def __setitem__(self, path, size):
+        slot = self._slot(path)
+        if slot is None:
+            self.add(path, size)
+        else:
+            self.sizes[slot] = size
+
+    def __len__(self):
+        return len(self.file_names)
+
+    def __contains__(self, path):
+        return self._slot(path) is not None
+
+    def __getitem__(self, path):
+        slot = self._slot(path)
+        if slot is None:
+            raise KeyError(path)
+        return self.sizes[slot]
+
+    def get(self, path, default=None):
+        slot = self._slot(path)
+        return default if slot is None else self.sizes[slot]
+
+    def mtime(self, path, default=None):
+        slot = self._slot(path)
+        return default if slot is None else self.mtimes[slot]
+
+    def _iter_paths(self):
+        last_node = None
+        prefix = ""
+        for node, name in zip(self.file_dirs, self.file_names):
+            if node != last_node:
+                dir_path = self._dir_path(node)
+                prefix = "" if dir_path is None else dir_path + self.sep
+                last_node = node
+            yield prefix + name
+
+    def __iter__(self):
+        """Yield the paths in insertion order"""
+        return self._iter_paths()
+
+    def keys(self):
+        return self._iter_paths()
+
+    def values(self):
+        return iter(self.sizes)
+
+    def items(self):
+        """Yield (path, size) in insertion order"""
+        return zip(self._iter_paths(), self.sizes)
+
+    def sorted_items(self):
+        """Yield (path, size, mtime) in code point order of the full paths, without sorting them all at once.
+
+        Within a directory a file sorts by its name and a subdirectory by its name plus the
+        separator, which orders the subtree exactly as the full paths would be.
+        """
+        by_dir = [None] * len(self.dir_names)
+        for slot, node in enumerate(self.file_dirs):
+            if by_dir[node] is None:
+                by_dir[node] = array("I")
+            by_dir[node].append(slot)
+        sep = self.sep
+        stack = [(False, ROOT_NODE, None)]
+        while stack:
+            is_file, ident, path = stack.pop()
+            if is_file:
+                yield path, self.sizes[ident], self.mtimes[ident]
+                continue
+            entries = [(self.file_names[slot], True, slot) for slot in by_dir[ident] or ()]
+            entries += [(name + sep, False, child) for name, child in (self.dir_children[ident] or {}).items()]
+            by_dir[ident] = None
+            entries.sort(reverse=True)
+            base = "" if path is None else path + sep
+            for key, entry_is_file, entry in entries:
+                stack.append((entry_is_file, entry, base + (key if entry_is_file else key[:-len(sep)])))
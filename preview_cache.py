@@ -0,0 +1,107 @@
+"""Per-category cache of Storage Cleaner preview results.
+
+A category's preview is reused until its TTL runs out or one of the folders
+its files were found in changes mtime, which happens whenever a file is added,
+removed or renamed there. Changes deeper down in folders that held no files
+are only picked up once the TTL expires.
+"""
+import os
+import time
+
+PREVIEW_CACHE_TTL = 300.0  # 5 minutes
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+class PreviewEntry:
+    """The PreviewRecords of one category and the mtimes of their folders"""
+
+    def __init__(self, records, dir_mtimes, created=None, elapsed=0.0):
+        self.records = records
+        self.dir_mtimes = dir_mtimes
+        self.created = time.time() if created is None else created
+        # Seconds the enumeration took, to rank categories by bytes freed per second of I/O
+        self.elapsed = elapsed
+        self.total_bytes = sum(record.size for record in records)
+
+    @classmethod
+    def build(cls, records, created=None, elapsed=0.0):
+        """Record the mtimes of the folders the enumerated files were found in"""
+        dir_mtimes = {folder: _mtime(folder) for folder in {os.path.dirname(record.path) for record in records}}
+        return cls(records, dir_mtimes, created, elapsed)
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def paths(self):
+        return [record.path for record in self.records]
+
+    @property
+    def bytes_per_second(self):
+        return self.total_bytes / self.elapsed if self.elapsed else float(self.total_bytes)
+
+    def is_fresh(self, ttl=PREVIEW_CACHE_TTL):
+        if time.time() - self.created > ttl:
+            return False
+        return all(_mtime(folder) == mtime for folder, mtime in self.dir_mtimes.items())
+
+    def without(self, removed):
+        """Return a copy without the paths of removed that no longer exist on disk.
+
+        Only those paths and their folders are checked again, so the entry stays
+        fresh after a cleanup without enumerating the category a second time.
+        """
+        records = []
+        touched = set()
+        for record in self.records:
+            if record.path in removed and not os.path.lexists(record.path):
+                touched.add(os.path.dirname(record.path))
+                continue
+            records.append(record)
+        dir_mtimes = dict(self.dir_mtimes)
+        for folder in touched:
+            dir_mtimes[folder] = _mtime(folder)
+        return PreviewEntry(records, dir_mtimes, self.created, self.elapsed)
+
+
+class PreviewCache:
+    """{category: PreviewEntry}; entries are replaced, never changed in place"""
+
+    def __init__(self, ttl=PREVIEW_CACHE_TTL):
+        self.ttl = ttl
+        self.entries = {}
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def peek(self, name):
+        """Return the entry of name without checking whether it is still fresh"""
+        return self.entries.get(name)
+
+    def get(self, name):
+        """Return the entry of name, or None if there is none or it went stale"""
+        entry = self.entries.get(name)
+        if entry is not None and not entry.is_fresh(self.ttl):
+            del self.entries[name]
+            return None
+        return entry
+
+    def put(self, name, entry):
+        self.entries[name] = entry
+
+    def invalidate(self, name=None):
+        if name is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(name, None)
+
+    def discard_deleted(self, name, removed):
+        entry = self.entries.get(name)
+        if entry is not None:
+            self.entries[name] = entry.without(removed)
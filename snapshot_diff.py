@@ -0,0 +1,66 @@
+"""Streaming diff of two path-sorted snapshots.
+
+Both inputs are walked once, side by side, the same way a sorted merge works,
+so only the current entry of each side is held in memory.
+"""
+from collections import namedtuple
+
+from snapshot_format import SnapshotReader
+
+GROWTH_THRESHOLD = 10 * 1024 * 1024  # 10MB
+
+NEW = "new"
+GROWN = "grown"
+DELETED = "deleted"
+
+# size is the file size for NEW, the growth in bytes for GROWN and the old size for DELETED
+DiffRecord = namedtuple("DiffRecord", ["kind", "path", "size"])
+
+
+def iter_snapshot_diff(old_items, new_items, threshold=GROWTH_THRESHOLD):
+    """Yield DiffRecords for two iterables of (path, size) pairs that are both sorted by path"""
+    old_iter = iter(old_items)
+    new_iter = iter(new_items)
+    old = next(old_iter, None)
+    new = next(new_iter, None)
+    while old is not None and new is not None:
+        old_path, old_size = old
+        new_path, new_size = new
+        if old_path == new_path:
+            if new_size - old_size > threshold:
+                yield DiffRecord(GROWN, new_path, new_size - old_size)
+            old = next(old_iter, None)
+            new = next(new_iter, None)
+        elif old_path < new_path:
+            yield DiffRecord(DELETED, old_path, old_size)
+            old = next(old_iter, None)
+        else:
+            yield DiffRecord(NEW, new_path, new_size)
+            new = next(new_iter, None)
+    while old is not None:
+        yield DiffRecord(DELETED, old[0], old[1])
+        old = next(old_iter, None)
+    while new is not None:
+        yield DiffRecord(NEW, new[0], new[1])
+        new = next(new_iter, None)
+
+
+def diff_snapshot_files(old_path, new_path, threshold=GROWTH_THRESHOLD):
+    """Yield DiffRecords between two snapshot files without loading either into a dict"""
+    with SnapshotReader(old_path) as old, SnapshotReader(new_path) as new:
+        yield from iter_snapshot_diff(old.items(), new.items(), threshold)
+
+
+def compare_snapshot_files(old_path, new_path, threshold=GROWTH_THRESHOLD):
+    """Return (new_files, grown_files, deleted_files) shaped like compare_file_snapshots"""
+    new_files = []
+    grown_files = []
+    deleted_files = []
+    for record in diff_snapshot_files(old_path, new_path, threshold):
+        if record.kind == NEW:
+            new_files.append((record.path, record.size))
+        elif record.kind == GROWN:
+            grown_files.append((record.path, record.size))
+        else:
+            deleted_files.append(record.path)
+    return new_files, grown_files, deleted_files
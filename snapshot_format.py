@@ -0,0 +1,324 @@
+"""Compact binary snapshot format for the File Tracker.
+
+A snapshot file holds the scanned paths sorted in code point order, front-coded
+against the previous path, plus fixed-width columns that can be memory-mapped:
+
+    header   magic, version, entry count, scan time, then a table of named sections
+    shared   uint32 per path: bytes shared with the previous path
+    suffix   uint32 per path: length of the bytes that follow the shared prefix
+    names    the concatenated UTF-8 path suffixes
+    size     int64 per path
+    mtime    float64 per path
+    ext      uint32 per path: index of the file's extension in extnames
+    extnames the distinct lower-cased extensions, NUL separated ("" first)
+
+Snapshots can also carry a directory table (dshared, dsuffix, dnames) with
+per-directory columns: dmtime, the mtime every visited directory had when an
+unfiltered scan listed it (checkpoints restore it on resume), and dsize /
+dcount, the cumulative bytes and file count below each directory.
+
+History deltas (see snapshot_history) reuse the same layout with one more
+column, psize: the size a path had before the change, -1 for new files. Their
+size column is -1 for deleted files.
+
+Columns are stored little-endian and aligned to 8 bytes, so a reader can view
+the size or mtime column straight out of the mapping without touching the rest.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from path_trie import PathTrie
+from tracker_engine import file_extension
+
+SNAPSHOT_MAGIC = b"CRYSNAP\0"
+SNAPSHOT_VERSION = 2
+SNAPSHOT_EXTENSION = ".snap"
+
+# Section name -> array typecode
+SECTION_TYPES = {
+    "shared": "I", "suffix": "I", "names": "B", "size": "q", "mtime": "d", "ext": "I", "extnames": "B",
+    "dshared": "I", "dsuffix": "I", "dnames": "B", "dmtime": "d", "dsize": "q", "dcount": "q", "psize": "q",
+}
+_PREFIX = struct.Struct("<8sH")
+_HEADER = struct.Struct("<8sHHIQd")
+_SECTION = struct.Struct("<8sQQ")
+# Version 1 files had a fixed list of sections and no scan time
+_HEADER_V1 = struct.Struct("<8sHHIQ" + "QQ" * 5)
+_SECTIONS_V1 = ("shared", "suffix", "names", "size", "mtime")
+_PATH_ENCODING = ("utf-8", "surrogatepass")
+
+
+class SnapshotFormatError(ValueError):
+    pass
+
+
+def _common_prefix_len(a, b):
+    n = min(len(a), len(b))
+    if a[:n] == b[:n]:
+        return n
+    # Binary search on slice comparisons keeps the byte-by-byte work in C
+    lo, hi = 0, n - 1
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _front_code(sorted_paths):
+    """Return the (shared, suffix, names) columns for already sorted paths"""
+    shared_col = array(SECTION_TYPES["shared"])
+    suffix_col = array(SECTION_TYPES["suffix"])
+    names = bytearray()
+    prev = b""
+    for path in sorted_paths:
+        encoded = path.encode(*_PATH_ENCODING)
+        shared = _common_prefix_len(prev, encoded)
+        shared_col.append(shared)
+        suffix_col.append(len(encoded) - shared)
+        names += encoded[shared:]
+        prev = encoded
+    return shared_col, suffix_col, array("B", names)
+
+
+def _little_endian(column):
+    if sys.byteorder != "little" and column.itemsize > 1:
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column
+
+
+def _file_columns(rows):
+    """Return the path table, size, mtime and extension sections for (path, size, mtime) rows in path order"""
+    shared_col = array(SECTION_TYPES["shared"])
+    suffix_col = array(SECTION_TYPES["suffix"])
+    names = bytearray()
+    size_col = array(SECTION_TYPES["size"])
+    mtime_col = array(SECTION_TYPES["mtime"])
+    ext_col = array(SECTION_TYPES["ext"])
+    ext_ids = {"": 0}
+    prev = b""
+    for path, size, mtime in rows:
+        encoded = path.encode(*_PATH_ENCODING)
+        shared = _common_prefix_len(prev, encoded)
+        shared_col.append(shared)
+        suffix_col.append(len(encoded) - shared)
+        names += encoded[shared:]
+        prev = encoded
+        size_col.append(size)
+        mtime_col.append(mtime)
+        ext = file_extension(path)
+        index = ext_ids.get(ext)
+        if index is None:
+            index = ext_ids[ext] = len(ext_ids)
+        ext_col.append(index)
+    extnames = "\0".join(ext_ids).encode(*_PATH_ENCODING)
+    return {"shared": shared_col, "suffix": suffix_col, "names": array("B", names), "size": size_col,
+            "mtime": mtime_col, "ext": ext_col, "extnames": array("B", extnames)}
+
+
+def write_snapshot(file_path, sizes, mtimes=None, dir_mtimes=None, scanned_at=0.0, dir_totals=None,
+                   previous_sizes=None):
+    """Write a {path: size} snapshot to file_path.
+
+    sizes may also be a PathTrie, which carries its own mtimes and is written in path order
+    without building the sorted list of full paths. mtimes adds {path: mtime} for the files;
+    dir_mtimes and dir_totals ({dir: (bytes, files)}) add the directory table, and
+    previous_sizes ({path: size}) the psize column of a delta.
+    """
+    if isinstance(sizes, PathTrie):
+        sections = _file_columns(sizes.sorted_items())
+        if previous_sizes is not None:
+            raise ValueError("previous_sizes needs a {path: size} snapshot")
+    else:
+        paths = sorted(sizes)
+        sections = _file_columns((path, sizes[path], mtimes.get(path, 0.0) if mtimes else 0.0) for path in paths)
+        if previous_sizes is not None:
+            sections["psize"] = array("q", [previous_sizes.get(path, -1) for path in paths])
+    count = len(sections["size"])
+    if dir_mtimes is not None or dir_totals is not None:
+        dirs = sorted(set(dir_mtimes or ()) | set(dir_totals or ()))
+        sections.update(zip(("dshared", "dsuffix", "dnames"), _front_code(dirs)))
+        if dir_mtimes is not None:
+            # Directories without an mtime get -1, which never matches a real one
+            sections["dmtime"] = array("d", [dir_mtimes.get(path, -1.0) for path in dirs])
+        if dir_totals is not None:
+            sections["dsize"] = array("q", [dir_totals.get(path, (0, 0))[0] for path in dirs])
+            sections["dcount"] = array("q", [dir_totals.get(path, (0, 0))[1] for path in dirs])
+
+    offset = _HEADER.size + _SECTION.size * len(sections)
+    table = []
+    for name, column in sections.items():
+        offset += -offset % 8
+        length = len(column) * column.itemsize
+        table.append((name, offset, length))
+        offset += length
+
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, len(table), count, scanned_at))
+        for name, section_offset, length in table:
+            f.write(_SECTION.pack(name.encode("ascii"), section_offset, length))
+        for name, section_offset, _ in table:
+            f.write(b"\0" * (section_offset - f.tell()))
+            _little_endian(sections[name]).tofile(f)
+    os.replace(tmp_path, file_path)
+
+
+class SnapshotReader:
+    """Memory-mapped view of a snapshot file; columns are only paged in when used.
+
+    Column views are valid until close().
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        with open(file_path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views = []
+        try:
+            self._read_header()
+        except (struct.error, SnapshotFormatError):
+            self._map.close()
+            raise SnapshotFormatError(f"{file_path} is not a valid snapshot (up to version {SNAPSHOT_VERSION})")
+
+    def _read_header(self):
+        magic, version = _PREFIX.unpack_from(self._map, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise SnapshotFormatError(magic)
+        if version == 1:
+            fields = _HEADER_V1.unpack_from(self._map, 0)
+            self.count = fields[4]
+            self.scanned_at = 0.0
+            self._sections = {name: fields[5 + i * 2:7 + i * 2] for i, name in enumerate(_SECTIONS_V1)}
+        elif version == SNAPSHOT_VERSION:
+            _, _, _, section_count, self.count, self.scanned_at = _HEADER.unpack_from(self._map, 0)
+            self._sections = {}
+            for index in range(section_count):
+                name, offset, length = _SECTION.unpack_from(self._map, _HEADER.size + index * _SECTION.size)
+                self._sections[name.rstrip(b"\0").decode("ascii")] = (offset, length)
+        else:
+            raise SnapshotFormatError(version)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        for view in reversed(self._views):
+            view.release()
+        self._views.clear()
+        self._map.close()
+
+    def has_section(self, name):
+        return name in self._sections
+
+    def column(self, name):
+        """Return the named column as a memoryview (or an array on big-endian hosts)"""
+        offset, length = self._sections[name]
+        code = SECTION_TYPES[name]
+        raw = memoryview(self._map)[offset:offset + length]
+        self._views.append(raw)
+        if code == "B":
+            return raw
+        if sys.byteorder != "little":
+            column = array(code, raw.tobytes())
+            column.byteswap()
+            return column
+        view = raw.cast(code)
+        self._views.append(view)
+        return view
+
+    @property
+    def sizes(self):
+        return self.column("size")
+
+    @property
+    def mtimes(self):
+        return self.column("mtime")
+
+    @property
+    def has_dirs(self):
+        return self.has_section("dmtime")
+
+    def _decode_paths(self, shared_name, suffix_name, names_name):
+        names = self._map
+        prev = b""
+        pos = self._sections[names_name][0]
+        for shared, length in zip(self.column(shared_name), self.column(suffix_name)):
+            prev = prev[:shared] + names[pos:pos + length]
+            pos += length
+            yield prev.decode(*_PATH_ENCODING)
+
+    def iter_paths(self):
+        """Yield the paths in sorted order, decoding the front-coded path table"""
+        return self._decode_paths("shared", "suffix", "names")
+
+    def iter_dir_paths(self):
+        """Yield the directories of the directory table in sorted order"""
+        return self._decode_paths("dshared", "dsuffix", "dnames")
+
+    def items(self, column="size"):
+        """Yield (path, value) pairs for one column, in path order"""
+        return zip(self.iter_paths(), self.column(column))
+
+    def to_dict(self, column="size"):
+        return dict(self.items(column))
+
+    def extension_names(self):
+        """Return the extension table the ext column indexes into, or None for older snapshots"""
+        if not self.has_section("ext"):
+            return None
+        return bytes(self.column("extnames")).decode(*_PATH_ENCODING).split("\0")
+
+    def dir_mtimes(self):
+        """Return {directory: mtime}, or None for snapshots without directory mtimes"""
+        if not self.has_dirs:
+            return None
+        return dict(zip(self.iter_dir_paths(), self.column("dmtime")))
+
+    def dir_totals(self):
+        """Return {directory: (cumulative bytes, cumulative files)}, or None when not stored"""
+        if not self.has_section("dsize"):
+            return None
+        return dict(zip(self.iter_dir_paths(), zip(self.column("dsize"), self.column("dcount"))))
+
+
+def read_snapshot(file_path, column="size"):
+    """Return {path: value} for a single column of a snapshot file"""
+    with SnapshotReader(file_path) as reader:
+        return reader.to_dict(column)
+
+
+def read_snapshot_trie(file_path):
+    """Load a snapshot file as a PathTrie of sizes and mtimes"""
+    with SnapshotReader(file_path) as reader:
+        return PathTrie.from_items(zip(reader.iter_paths(), reader.sizes, reader.mtimes))
+
+
+def convert_json_snapshot(json_path, snap_path=None):
+    """One-time conversion of a legacy indented-JSON {path: size} snapshot; returns the new path"""
+    if snap_path is None:
+        snap_path = os.path.splitext(json_path)[0] + SNAPSHOT_EXTENSION
+    with open(json_path, "r") as f:
+        sizes = json.load(f)
+    write_snapshot(snap_path, sizes)
+    return snap_path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python snapshot_format.py SNAPSHOT.json [SNAPSHOT.json ...]")
+    for json_file in sys.argv[1:]:
+        print(f"{json_file} -> {convert_json_snapshot(json_file)}")
@@ -0,0 +1,369 @@
+"""Snapshot history: one full base snapshot plus a delta per scan.
+
+Every scan adds a delta holding only the files that appeared, changed size or
+disappeared since the previous scan, so a history of daily scans costs about
+one snapshot plus the churn instead of one full copy per day. The store lives
+in a folder:
+
+    history.json              index of the base and the deltas, oldest first
+    base.snap                 full snapshot at the start of the history
+    delta_<timestamp>.snap    the changes of one scan (see snapshot_format, psize)
+
+Range queries ("growth of this folder between two dates", "files that appeared
+this week") only read the deltas in the range, never a full snapshot.
+compact() folds deltas older than keep_days into the base and merges the
+deltas older than daily_after_days into one per day.
+"""
+import json
+import os
+import re
+import shutil
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import snapshot_diff
+import snapshot_format
+from path_trie import PathTrie
+from snapshot_format import SnapshotReader
+
+HISTORY_INDEX_FILE = "history.json"
+HISTORY_BASE_FILE = "base.snap"
+# Deltas older than this are folded into the base snapshot
+HISTORY_KEEP_DAYS = 90
+# Deltas older than this are merged into one per day
+HISTORY_DAILY_AFTER_DAYS = 7
+# A scan recorded at or before the latest one (the clock was set back) is moved this many seconds after it
+CLOCK_STEP = 0.001
+# Timestamped backups written by FileTracker.save_snapshot before the history store
+BACKUP_NAME = re.compile(r"snapshot_(\d{4}-\d\d-\d\d_\d\d-\d\d-\d\d)\.(json|snap)$")
+BACKUP_TIME_FORMAT = "%Y-%m-%d_%H-%M-%S"
+
+# file is relative to the history folder; new/grown/deleted are file counts, bytes the net growth
+HistoryEntry = namedtuple("HistoryEntry", ["file", "scanned_at", "files", "new", "grown", "deleted", "bytes"])
+
+
+def _items(reader):
+    """Yield (path, size, mtime) in path order"""
+    return zip(reader.iter_paths(), reader.sizes, reader.mtimes)
+
+
+def _changed_items(old_items, new_items):
+    """Yield (path, previous size, size, mtime) for paths whose size differs; -1 marks a missing side"""
+    old_iter = iter(old_items)
+    new_iter = iter(new_items)
+    old = next(old_iter, None)
+    new = next(new_iter, None)
+    while old is not None or new is not None:
+        if new is None or (old is not None and old[0] < new[0]):
+            yield old[0], old[1], -1, 0.0
+            old = next(old_iter, None)
+        elif old is None or new[0] < old[0]:
+            yield new[0], -1, new[1], new[2]
+            new = next(new_iter, None)
+        else:
+            if old[1] != new[1]:
+                yield new[0], old[1], new[1], new[2]
+            old = next(old_iter, None)
+            new = next(new_iter, None)
+
+
+def _apply_changes(base_items, changes):
+    """Yield the (path, size, mtime) of base_items with {path: (previous, size, mtime)} applied"""
+    pending = iter(sorted(changes.items()))
+    change = next(pending, None)
+    for path, size, mtime in base_items:
+        while change is not None and change[0] < path:
+            if change[1][1] >= 0:
+                yield change[0], change[1][1], change[1][2]
+            change = next(pending, None)
+        if change is not None and change[0] == path:
+            if change[1][1] >= 0:
+                yield path, change[1][1], change[1][2]
+            change = next(pending, None)
+        else:
+            yield path, size, mtime
+    while change is not None:
+        if change[1][1] >= 0:
+            yield change[0], change[1][1], change[1][2]
+        change = next(pending, None)
+
+
+def _write_state(file_path, items, scanned_at):
+    # A PathTrie holds each folder once, so rebuilding a whole drive never keeps every full path string
+    trie = PathTrie.from_items(items)
+    snapshot_format.write_snapshot(file_path, trie, scanned_at=scanned_at)
+    return len(trie)
+
+
+def _under(prefix):
+    """Return a predicate matching prefix itself and every path below it"""
+    folder = prefix.rstrip("\\/")
+    if not folder:
+        return lambda candidate: True
+    starts = (folder + "\\", folder + "/")
+    return lambda candidate: candidate == prefix or candidate == folder or candidate.startswith(starts)
+
+
+def backup_time(file_name):
+    """Return the timestamp encoded in a snapshot backup name, or None"""
+    match = BACKUP_NAME.search(file_name)
+    if match is None:
+        return None
+    return datetime.strptime(match.group(1), BACKUP_TIME_FORMAT).timestamp()
+
+
+class SnapshotHistory:
+    """Base snapshot plus deltas in history_dir, with retention and range queries"""
+
+    def __init__(self, history_dir, keep_days=HISTORY_KEEP_DAYS, daily_after_days=HISTORY_DAILY_AFTER_DAYS):
+        self.history_dir = history_dir
+        self.keep_days = keep_days
+        self.daily_after_days = daily_after_days
+        self.base = None
+        self.deltas = []
+        self._load_index()
+
+    def _path(self, file_name):
+        return os.path.join(self.history_dir, file_name)
+
+    def _load_index(self):
+        try:
+            with open(self._path(HISTORY_INDEX_FILE), "r") as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return
+        self.base = HistoryEntry(**index["base"])
+        self.deltas = [HistoryEntry(**delta) for delta in index["deltas"]]
+
+    def _save_index(self):
+        index = {"base": self.base._asdict(), "deltas": [delta._asdict() for delta in self.deltas]}
+        tmp_path = self._path(HISTORY_INDEX_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(index, f, indent=1)
+        os.replace(tmp_path, self._path(HISTORY_INDEX_FILE))
+
+    def __len__(self):
+        return len(self.deltas) + (self.base is not None)
+
+    def entries(self):
+        """Return the base followed by the deltas, oldest first"""
+        return ([self.base] if self.base is not None else []) + self.deltas
+
+    @property
+    def latest_scan(self):
+        entries = self.entries()
+        return entries[-1].scanned_at if entries else None
+
+    def _delta_name(self, scanned_at):
+        name = f"delta_{datetime.fromtimestamp(scanned_at).strftime(BACKUP_TIME_FORMAT)}"
+        taken = {delta.file for delta in self.deltas}
+        suffix = 0
+        file_name = name + snapshot_format.SNAPSHOT_EXTENSION
+        while file_name in taken or os.path.exists(self._path(file_name)):
+            suffix += 1
+            file_name = f"{name}_{suffix}{snapshot_format.SNAPSHOT_EXTENSION}"
+        return file_name
+
+    def _write_delta(self, changes, scanned_at, files):
+        """Write {path: (previous, size, mtime)} as a delta file and return its HistoryEntry"""
+        file_name = self._delta_name(scanned_at)
+        sizes = {}
+        mtimes = {}
+        previous = {}
+        new = grown = deleted = growth = 0
+        for path, (old_size, size, mtime) in changes.items():
+            sizes[path] = size
+            mtimes[path] = mtime
+            previous[path] = old_size
+            if old_size < 0:
+                new += 1
+            elif size < 0:
+                deleted += 1
+            elif size > old_size:
+                grown += 1
+            growth += max(size, 0) - max(old_size, 0)
+        snapshot_format.write_snapshot(self._path(file_name), sizes, mtimes, scanned_at=scanned_at,
+                                       previous_sizes=previous)
+        return HistoryEntry(file_name, scanned_at, files, new, grown, deleted, growth)
+
+    def add(self, snapshot_path, previous_path=None, scanned_at=None):
+        """Record a full snapshot file in the history and apply the retention policy.
+
+        previous_path may name the snapshot of the latest recorded scan (the file the caller
+        already diffs against); otherwise that state is rebuilt from the history. A scan that is
+        not newer than the latest one, as after the clock was set back, is recorded just after it.
+        """
+        os.makedirs(self.history_dir, exist_ok=True)
+        with SnapshotReader(snapshot_path) as reader:
+            if scanned_at is None:
+                scanned_at = reader.scanned_at or time.time()
+            if self.base is None:
+                files = len(reader)
+        if self.base is None:
+            shutil.copyfile(snapshot_path, self._path(HISTORY_BASE_FILE))
+            self.base = HistoryEntry(HISTORY_BASE_FILE, scanned_at, files, files, 0, 0, 0)
+            self._save_index()
+            return self.base
+        if scanned_at <= self.latest_scan:
+            # Refusing it would keep the snapshot from being installed until the clock caught up
+            scanned_at = self.latest_scan + CLOCK_STEP
+
+        rebuilt = None
+        if not self._is_latest(previous_path):
+            rebuilt = previous_path = self._path("latest.snap.tmp")
+            self.write_snapshot_at(self.latest_scan, rebuilt)
+        try:
+            with SnapshotReader(previous_path) as old, SnapshotReader(snapshot_path) as new:
+                files = len(new)
+                changes = {path: (old_size, size, mtime)
+                           for path, old_size, size, mtime in _changed_items(_items(old), _items(new))}
+        finally:
+            if rebuilt is not None:
+                os.remove(rebuilt)
+        entry = self._write_delta(changes, scanned_at, files)
+        self.deltas.append(entry)
+        self._save_index()
+        self.compact(scanned_at)
+        return entry
+
+    def _is_latest(self, previous_path):
+        if previous_path is None or not os.path.exists(previous_path):
+            return False
+        try:
+            with SnapshotReader(previous_path) as reader:
+                return reader.scanned_at == self.latest_scan and len(reader) == self.entries()[-1].files
+        except snapshot_format.SnapshotFormatError:
+            return False
+
+    def _deltas_between(self, start=None, end=None):
+        return [delta for delta in self.deltas
+                if (start is None or delta.scanned_at > start) and (end is None or delta.scanned_at <= end)]
+
+    def _merge(self, deltas, include=None):
+        """Return {path: (previous, size, mtime)}: the net change of each path over deltas"""
+        changes = {}
+        for delta in deltas:
+            with SnapshotReader(self._path(delta.file)) as reader:
+                rows = zip(reader.iter_paths(), reader.column("psize"), reader.sizes, reader.mtimes)
+                for path, old_size, size, mtime in rows:
+                    if include is not None and not include(path):
+                        continue
+                    first = changes.get(path)
+                    changes[path] = (old_size if first is None else first[0], size, mtime)
+        # Files that appeared and vanished inside the range are no change at all
+        return {path: change for path, change in changes.items() if change[0] >= 0 or change[1] >= 0}
+
+    def changes_between(self, start=None, end=None, threshold=snapshot_diff.GROWTH_THRESHOLD, under=None):
+        """Return (new_files, grown_files, deleted_files) between the scans at start and end.
+
+        Shaped like snapshot_diff.compare_snapshot_files; only the deltas scanned after start and
+        up to end are read. under limits the changes to one folder.
+        """
+        include = _under(under) if under else None
+        new_files = []
+        grown_files = []
+        deleted_files = []
+        for path, (old_size, size, _) in sorted(self._merge(self._deltas_between(start, end), include).items()):
+            if old_size < 0:
+                new_files.append((path, size))
+            elif size < 0:
+                deleted_files.append(path)
+            elif size - old_size > threshold:
+                grown_files.append((path, size - old_size))
+        return new_files, grown_files, deleted_files
+
+    def appeared(self, start=None, end=None, under=None):
+        """Return [(path, size), ...] of the files that appeared between start and end"""
+        return self.changes_between(start, end, under=under)[0]
+
+    def growth(self, path, start=None, end=None):
+        """Return the net growth in bytes of a file or folder between the scans at start and end"""
+        include = _under(path)
+        total = 0
+        for delta in self._deltas_between(start, end):
+            with SnapshotReader(self._path(delta.file)) as reader:
+                for candidate, old_size, size in zip(reader.iter_paths(), reader.column("psize"), reader.sizes):
+                    if include(candidate):
+                        total += max(size, 0) - max(old_size, 0)
+        return total
+
+    def write_snapshot_at(self, when, file_path):
+        """Rebuild the full snapshot of the latest scan at or before when into file_path.
+
+        Only sizes are tracked by the deltas, so files whose size never changed keep the mtime
+        they had in the base.
+        """
+        if self.base is None:
+            raise FileNotFoundError(f"No snapshot history in {self.history_dir}")
+        deltas = self._deltas_between(None, when)
+        scanned_at = deltas[-1].scanned_at if deltas else self.base.scanned_at
+        changes = self._merge(deltas)
+        with SnapshotReader(self._path(self.base.file)) as base:
+            return _write_state(file_path, _apply_changes(_items(base), changes), scanned_at)
+
+    def compact(self, now=None):
+        """Fold deltas older than keep_days into the base and merge older ones into one per day"""
+        if now is None:
+            now = self.latest_scan or time.time()
+        expired = self._deltas_between(None, now - self.keep_days * 86400)
+        if expired:
+            tmp_path = self._path(HISTORY_BASE_FILE + ".tmp")
+            files = self.write_snapshot_at(expired[-1].scanned_at, tmp_path)
+            os.replace(tmp_path, self._path(HISTORY_BASE_FILE))
+            self.base = self.base._replace(scanned_at=expired[-1].scanned_at, files=files)
+            self.deltas = self.deltas[len(expired):]
+            self._save_index()
+            for delta in expired:
+                os.remove(self._path(delta.file))
+
+        cutoff = now - self.daily_after_days * 86400
+        days = {}
+        for delta in self._deltas_between(None, cutoff):
+            days.setdefault(datetime.fromtimestamp(delta.scanned_at).date(), []).append(delta)
+        for group in days.values():
+            if len(group) < 2:
+                continue
+            merged = self._write_delta(self._merge(group), group[-1].scanned_at, group[-1].files)
+            position = self.deltas.index(group[0])
+            self.deltas[position:position + len(group)] = [merged]
+            self._save_index()
+            for delta in group:
+                os.remove(self._path(delta.file))
+
+    def import_backups(self, backup_dir):
+        """Add the timestamped snapshot_*.json / .snap backups of backup_dir; returns how many were added"""
+        backups = []
+        for file_name in os.listdir(backup_dir):
+            scanned_at = backup_time(file_name)
+            if scanned_at is not None:
+                backups.append((scanned_at, file_name))
+        os.makedirs(self.history_dir, exist_ok=True)
+        added = 0
+        previous = None
+        try:
+            for scanned_at, file_name in sorted(backups):
+                if self.latest_scan is not None and scanned_at <= self.latest_scan:
+                    continue
+                source = os.path.join(backup_dir, file_name)
+                mtimes = None
+                if file_name.endswith(".json"):
+                    with open(source, "r") as f:
+                        sizes = json.load(f)
+                else:
+                    with SnapshotReader(source) as reader:
+                        sizes = reader.to_dict()
+                        mtimes = reader.to_dict("mtime")
+                # Rewritten with the time from the file name, so each import can be diffed against the last
+                converted = self._path(f"import_{added % 2}.snap.tmp")
+                snapshot_format.write_snapshot(converted, sizes, mtimes, scanned_at=scanned_at)
+                del sizes, mtimes
+                self.add(converted, previous)
+                if previous is not None:
+                    os.remove(previous)
+                previous = converted
+                added += 1
+        finally:
+            if previous is not None:
+                os.remove(previous)
+        return added
@@ -0,0 +1,85 @@
+"""Startup probes: slow lookups the window no longer waits for.
+
+Drive usage and browser cache detection stat folders that may sit on slow or
+disconnected network drives, where a single call can block for a long time.
+Every probe runs on its own daemon thread and gets PROBE_TIMEOUT seconds; a
+probe that is still blocked by then is reported as timed out and left behind
+(a thread stuck in a system call cannot be stopped, but a daemon thread does
+not keep the process alive).
+"""
+import os
+import queue
+import shutil
+import threading
+import time
+
+# Seconds a single probe may take before it is reported as timed out
+PROBE_TIMEOUT = 3.0
+
+
+def run_probes(probes, on_result, timeout=PROBE_TIMEOUT):
+    """Run {key: callable} side by side and call on_result(key, value, error) as each one ends.
+
+    error is the exception a probe raised, or a TimeoutError for the probes still running
+    timeout seconds after they were started. Returns once every probe was reported.
+    """
+    results = queue.Queue()
+
+    def run(key, probe):
+        try:
+            results.put((key, probe(), None))
+        except Exception as e:
+            results.put((key, None, e))
+
+    for key, probe in probes.items():
+        threading.Thread(target=run, args=(key, probe), name=f"probe {key}", daemon=True).start()
+    pending = set(probes)
+    deadline = time.monotonic() + timeout
+    while pending:
+        try:
+            key, value, error = results.get(timeout=max(0.0, deadline - time.monotonic()))
+        except queue.Empty:
+            break
+        pending.discard(key)
+        on_result(key, value, error)
+    for key in probes:
+        if key in pending:
+            on_result(key, None, TimeoutError(f"no answer within {timeout:g}s"))
+
+
+def drive_usage_probes(mounts):
+    """Return {mount: probe} reading the usage of every mount"""
+    return {mount: (lambda mount=mount: shutil.disk_usage(mount)) for mount in mounts}
+
+
+def _existing(path):
+    return [path] if os.path.exists(path) else []
+
+
+def firefox_cache_paths():
+    profiles_dir = os.path.join(os.environ.get('APPDATA', ''), "Mozilla", "Firefox", "Profiles")
+    cache_paths = []
+    if os.path.exists(profiles_dir):
+        for profile in os.listdir(profiles_dir):
+            cache_dir = os.path.join(profiles_dir, profile, "cache2")
+            if os.path.isdir(cache_dir):
+                cache_paths.append(cache_dir)
+    return cache_paths
+
+
+def browser_cache_probes():
+    """Return {category: probe}; each probe returns the cache folders found for that browser"""
+    local = os.environ.get('LOCALAPPDATA', '')
+    roaming = os.environ.get('APPDATA', '')
+    folders = {
+        "Chrome Cache": os.path.join(local, "Google", "Chrome", "User Data", "Default", "Cache"),
+        "Edge Cache": os.path.join(local, "Microsoft", "Edge", "User Data", "Default", "Cache"),
+        "Firefox Cache": None,
+        "Opera Cache": os.path.join(roaming, "Opera Software", "Opera Stable", "Cache"),
+        "Brave Cache": os.path.join(local, "BraveSoftware", "Brave-Browser", "User Data", "Default", "Cache"),
+        "Vivaldi Cache": os.path.join(local, "Vivaldi", "User Data", "Default", "Cache"),
+    }
+    # Firefox keeps one cache per profile
+    probes = {name: (lambda path=path: _existing(path)) if path else firefox_cache_paths
+              for name, path in folders.items()}
+    return probes
@@ -0,0 +1,441 @@
+import heapq
+import os
+import queue
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+DEFAULT_SCAN_ROOT = "C:\\"
+DEFAULT_SCAN_WORKERS = 8
+DEFAULT_TOP_FILES = 20
+
+# One compact record per scanned file
+FileRecord = namedtuple("FileRecord", ["path", "size", "mtime", "inode"])
+
+# On Windows DirEntry.inode() costs an extra open per file, so it is left at 0 there
+DIRENT_HAS_INODE = os.name != "nt"
+SCANDIR_HAS_FD = os.scandir in os.supports_fd and hasattr(os, "O_DIRECTORY")
+
+# Recorded for directories that were excluded or could not be read
+UNKNOWN_DIR_MTIME = -1.0
+
+
+class ScanStats:
+    """Counters and timings for one scan, used to report progress and throughput.
+
+    With on_progress set, the stats are published from the scanning thread at most once every
+    interval seconds. profile_dirs > 0 keeps the slowest directories to list (with their stat
+    calls), and finish() records user and system CPU time, which tells whether a scan was
+    bound by Python overhead or by syscalls.
+    """
+
+    def __init__(self, on_progress=None, interval=0.25, profile_dirs=0):
+        self.dirs = 0
+        self.files = 0
+        self.bytes = 0
+        self.errors = 0
+        self.permission_errors = 0
+        self.current_dir = ""
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        # Files restored from a checkpoint rather than found by this run
+        self.resumed_files = 0
+        self.user_time = 0.0
+        self.system_time = 0.0
+        # Seconds spent per stage; "list" sums the directory listings of every scan thread
+        self.stage_times = {}
+        self.on_progress = on_progress
+        self.interval = interval
+        self.profile_dirs = profile_dirs
+        self._slowest = []
+        self._last_progress = 0.0
+        self._times = os.times()
+
+    def record_dir(self, current_root, records, error=None, seconds=0.0):
+        self.dirs += 1
+        self.files += len(records)
+        self.bytes += sum(rec.size for rec in records)
+        self.current_dir = current_root
+        self.stage_times["list"] = self.stage_times.get("list", 0.0) + seconds
+        if error is not None:
+            self.errors += 1
+            if isinstance(error, PermissionError):
+                self.permission_errors += 1
+        if self.profile_dirs:
+            item = (seconds, current_root)
+            if len(self._slowest) < self.profile_dirs:
+                heapq.heappush(self._slowest, item)
+            elif item > self._slowest[0]:
+                heapq.heapreplace(self._slowest, item)
+        if self.on_progress is not None:
+            now = time.monotonic()
+            if now - self._last_progress >= self.interval:
+                self._last_progress = now
+                self.on_progress(self)
+
+    @classmethod
+    def combined(cls, stats_list):
+        """Merge the stats of scans that ran side by side (one per volume) into one"""
+        merged = cls(profile_dirs=max((stats.profile_dirs for stats in stats_list), default=0))
+        for stats in stats_list:
+            for name in ("dirs", "files", "bytes", "errors", "permission_errors", "resumed_files"):
+                setattr(merged, name, getattr(merged, name) + getattr(stats, name))
+            for name, seconds in stats.stage_times.items():
+                merged.stage_times[name] = merged.stage_times.get(name, 0.0) + seconds
+            # The scans overlapped and CPU times are per process, so the longest one stands for all
+            merged.elapsed = max(merged.elapsed, stats.elapsed)
+            merged.user_time = max(merged.user_time, stats.user_time)
+            merged.system_time = max(merged.system_time, stats.system_time)
+            merged._slowest.extend(stats._slowest)
+        if merged.profile_dirs:
+            merged._slowest = heapq.nlargest(merged.profile_dirs, merged._slowest)
+            heapq.heapify(merged._slowest)
+        return merged
+
+    @contextmanager
+    def stage(self, name):
+        """Add the time spent in the with block to stage_times[name]"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_times[name] = self.stage_times.get(name, 0.0) + time.perf_counter() - started
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+        times = os.times()
+        self.user_time = times.user - self._times.user
+        self.system_time = times.system - self._times.system
+
+    @property
+    def files_per_second(self):
+        return self.files / self.elapsed if self.elapsed else 0.0
+
+    def slowest_dirs(self):
+        """Return [(seconds, directory), ...] from the slowest listing down"""
+        return sorted(self._slowest, reverse=True)
+
+    def progress_text(self):
+        text = f"{self.files:,} files in {self.dirs:,} folders ({self.bytes / 1024 ** 3:,.1f} GB)"
+        if self.permission_errors:
+            text += f", {self.permission_errors:,} access denied"
+        return f"{text} — {self.current_dir}"
+
+    def __str__(self):
+        text = f"{self.files:,} files in {self.elapsed:.1f}s ({self.files_per_second:,.0f} files/s)"
+        if self.resumed_files:
+            text += f", resumed after {self.resumed_files:,} files"
+        if self.errors:
+            text += f", {self.errors:,} folders unreadable"
+        return text
+
+
+class TopFiles:
+    """Bounded min-heap of the largest files seen so far.
+
+    With on_update set, the current largest() list is published whenever it changes,
+    at most once every interval seconds, so a view can show partial results during a scan.
+    """
+
+    def __init__(self, count=DEFAULT_TOP_FILES, on_update=None, interval=1.0):
+        self.count = count
+        self.on_update = on_update
+        self.interval = interval
+        self._heap = []
+        self._last_update = 0.0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, path, size):
+        heap = self._heap
+        if len(heap) < self.count:
+            heapq.heappush(heap, (size, path))
+        elif size > heap[0][0]:
+            heapq.heapreplace(heap, (size, path))
+        else:
+            return
+        if self.on_update is not None:
+            now = time.monotonic()
+            if now - self._last_update >= self.interval:
+                self._last_update = now
+                self.on_update(self.largest())
+
+    def largest(self):
+        """Return [(path, size), ...] from largest to smallest"""
+        return [(path, size) for size, path in sorted(self._heap, reverse=True)]
+
+
+class DirectoryTotals:
+    """Size and file count of every directory, collected during a scan and rolled up to its ancestors"""
+
+    def __init__(self):
+        self.direct = {}
+
+    def add(self, current_root, records):
+        self.direct[current_root] = (sum(rec.size for rec in records), len(records))
+
+    def rolled_up(self):
+        """Return {directory: (cumulative bytes, cumulative file count)}"""
+        totals = {path: list(value) for path, value in self.direct.items()}
+        # Children are longer than their parents, so one pass from the longest path rolls everything up
+        for path in sorted(totals, key=len, reverse=True):
+            parent = parent_directory(path, totals)
+            if parent is not None:
+                totals[parent][0] += totals[path][0]
+                totals[parent][1] += totals[path][1]
+        return {path: (size, count) for path, (size, count) in totals.items()}
+
+
+class ScanInterrupted(Exception):
+    """Raised by a scan stopped through its ScanFrontier; the last checkpoint holds the work done"""
+
+
+class ScanFrontier:
+    """The directories a scan still has to list, kept on the consuming thread so a scan can stop and resume.
+
+    A directory leaves the frontier once all its records were consumed, and its subdirectories
+    join at that moment, so the records consumed so far plus the frontier always cover the whole
+    tree. At those boundaries on_checkpoint(frontier) is called every interval seconds (never
+    with interval 0); once cancel is set the scan checkpoints and raises ScanInterrupted.
+    """
+
+    def __init__(self, pending, on_checkpoint=None, interval=0.0, cancel=None):
+        self.pending = set(pending)
+        self.on_checkpoint = on_checkpoint
+        self.interval = interval
+        self.cancel = cancel
+        self._last_checkpoint = time.monotonic()
+
+    def checkpoint(self):
+        if self.on_checkpoint is not None:
+            self.on_checkpoint(self)
+        self._last_checkpoint = time.monotonic()
+
+    def completed(self, current_root, subdirs):
+        self.pending.discard(current_root)
+        self.pending.update(subdirs)
+        if self.cancel is not None and self.cancel.is_set():
+            self.checkpoint()
+            raise ScanInterrupted(f"scan stopped with {len(self.pending):,} folders left")
+        if self.interval and time.monotonic() - self._last_checkpoint >= self.interval:
+            self.checkpoint()
+
+
+def file_extension(path):
+    """Return the extension filters match on: lower case with its dot, or "" when there is none"""
+    name = os.path.basename(path)
+    dot = name.rfind(".")
+    return name[dot:].lower() if dot > 0 else ""
+
+
+def parent_directory(path, known):
+    """Return the parent of path if it is one of the known directories, handling roots like C:\\"""
+    cut = path.rfind(os.sep)
+    if cut < 0:
+        return None
+    for parent in (path[:cut], path[:cut + 1]):
+        if parent != path and parent in known:
+            return parent
+    return None
+
+
+def _open_dir(path):
+    # On POSIX, listing through a directory fd lets DirEntry.stat() use fstatat() instead of resolving the full path again
+    if SCANDIR_HAS_FD:
+        fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            return os.scandir(fd), fd
+        except OSError:
+            os.close(fd)
+            raise
+    return os.scandir(path), None
+
+
+def _scan_dir(current_root, extensions, dir_mtimes=None):
+    """List one directory, returning its file records, the subdirectories to descend into and
+    the OSError that stopped the listing (None when it completed)"""
+    records = []
+    subdirs = []
+    if dir_mtimes is not None:
+        dir_mtimes[current_root] = UNKNOWN_DIR_MTIME
+    try:
+        entries, fd = _open_dir(current_root)
+    except OSError as e:
+        return records, subdirs, e
+    error = None
+    prefix = current_root if current_root.endswith(os.sep) else current_root + os.sep
+    try:
+        with entries:
+            if dir_mtimes is not None:
+                dir_mtimes[current_root] = (os.fstat(fd) if fd is not None else os.stat(current_root)).st_mtime
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        # Same as os.walk: symlinked folders are listed but never descended into
+                        if not entry.is_symlink():
+                            subdirs.append(prefix + entry.name)
+                        continue
+                    if extensions and not entry.name.lower().endswith(extensions):
+                        continue
+                    st = entry.stat()
+                    inode = entry.inode() if DIRENT_HAS_INODE else 0
+                except OSError:
+                    continue
+                records.append(FileRecord(prefix + entry.name, st.st_size, st.st_mtime, inode))
+    except OSError as e:
+        error = e
+    finally:
+        if fd is not None:
+            os.close(fd)
+    return records, subdirs, error
+
+
+def _unexcluded(subdirs, excluded):
+    return [subdir for subdir in subdirs if not subdir.startswith(excluded)] if excluded else subdirs
+
+
+def iter_file_records(root_path=DEFAULT_SCAN_ROOT, excluded=(), extensions=None, stats=None, dir_mtimes=None,
+                      dir_totals=None, pacer=None, frontier=None):
+    """Yield a FileRecord for every file under root_path, reusing the stat data of each directory entry.
+
+    With a dir_mtimes dict the mtime of every directory is recorded in it (UNKNOWN_DIR_MTIME when unreadable).
+    With DirectoryTotals the size and file count of every directory are collected in the same pass.
+    A pacer's start_thread() is called on every scanning thread and pace(files, syscalls) after every
+    listing (see background_scan.ScanPacer). With a ScanFrontier the scan starts from its pending
+    directories instead of root_path and reports every completed directory to it.
+    """
+    excluded = tuple(excluded)
+    extensions = tuple(ext.lower() for ext in extensions) if extensions else None
+    stack = sorted(frontier.pending, reverse=True) if frontier is not None else [root_path]
+    if pacer is not None:
+        pacer.start_thread()
+    while stack:
+        current_root = stack.pop()
+        if excluded and current_root.startswith(excluded):
+            if dir_mtimes is not None:
+                dir_mtimes[current_root] = UNKNOWN_DIR_MTIME
+            continue
+        started = time.perf_counter()
+        records, subdirs, error = _scan_dir(current_root, extensions, dir_mtimes)
+        if stats is not None:
+            stats.record_dir(current_root, records, error, time.perf_counter() - started)
+        if dir_totals is not None:
+            dir_totals.add(current_root, records)
+        if pacer is not None:
+            # One listing plus a stat per entry
+            pacer.pace(len(records), 1 + len(records) + len(subdirs))
+        yield from records
+        if frontier is not None:
+            frontier.completed(current_root, _unexcluded(subdirs, excluded))
+        # Reversed so directories are visited in the same order as a top-down os.walk
+        stack.extend(reversed(subdirs))
+    if stats is not None:
+        stats.finish()
+
+
+def iter_file_records_parallel(root_path=DEFAULT_SCAN_ROOT, excluded=(), extensions=None,
+                               workers=DEFAULT_SCAN_WORKERS, stats=None, dir_mtimes=None, dir_totals=None,
+                               pacer=None, frontier=None):
+    """Yield the same records as iter_file_records, listing directories on a pool of worker threads.
+
+    Every worker pulls directories from one shared queue and pushes the subdirectories it finds
+    back onto it, so idle threads always pick up whatever work is left. Records are handed back to
+    the calling thread one directory at a time; their order differs from the serial scan.
+    """
+    excluded = tuple(excluded)
+    extensions = tuple(ext.lower() for ext in extensions) if extensions else None
+    dir_queue = queue.Queue()
+    results = queue.Queue()
+    stop = threading.Event()
+
+    def worker():
+        if pacer is not None:
+            pacer.start_thread()
+        while True:
+            current_root = dir_queue.get()
+            try:
+                if current_root is None:
+                    return
+                # After the consumer stops, the remaining directories are only drained
+                if stop.is_set():
+                    continue
+                if excluded and current_root.startswith(excluded):
+                    if dir_mtimes is not None:
+                        dir_mtimes[current_root] = UNKNOWN_DIR_MTIME
+                    continue
+                started = time.perf_counter()
+                records, subdirs, error = _scan_dir(current_root, extensions, dir_mtimes)
+                seconds = time.perf_counter() - started
+                if pacer is not None:
+                    pacer.pace(len(records), 1 + len(records) + len(subdirs))
+                # The result goes first: a ScanFrontier must see a folder completed before any of its
+                # subfolders, or the parent's result would put an already listed subfolder back
+                results.put((current_root, records, subdirs, error, seconds))
+                for subdir in subdirs:
+                    dir_queue.put(subdir)
+            finally:
+                dir_queue.task_done()
+
+    def wait_for_workers():
+        dir_queue.join()
+        results.put(None)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, workers))]
+    for thread in threads:
+        thread.start()
+    for start_dir in (frontier.pending if frontier is not None else [root_path]):
+        dir_queue.put(start_dir)
+    threading.Thread(target=wait_for_workers, daemon=True).start()
+    try:
+        while True:
+            result = results.get()
+            if result is None:
+                break
+            current_root, records, subdirs, error, seconds = result
+            if stats is not None:
+                stats.record_dir(current_root, records, error, seconds)
+            if dir_totals is not None:
+                dir_totals.add(current_root, records)
+            yield from records
+            if frontier is not None:
+                frontier.completed(current_root, _unexcluded(subdirs, excluded))
+    finally:
+        stop.set()
+        for _ in threads:
+            dir_queue.put(None)
+    if stats is not None:
+        stats.finish()
+
+
+def scan_folder_files(root_path=DEFAULT_SCAN_ROOT, extensions=None, excluded=(), workers=1, stats=None,
+                      mtimes=None, dir_mtimes=None, top=None, dir_totals=None, trie=None, pacer=None, frontier=None):
+    """Return a {path: size} snapshot of root_path, using a thread pool when workers > 1.
+
+    When a dict is passed as mtimes it is filled with {path: mtime} for the same files,
+    and a TopFiles passed as top is fed every file as it is discovered. Passing a PathTrie
+    as trie adds to and returns it (sizes and mtimes) instead of a dict; pacer and frontier
+    are handed to the iterators.
+    """
+    if workers > 1:
+        records = iter_file_records_parallel(root_path, excluded, extensions, workers, stats, dir_mtimes, dir_totals,
+                                             pacer, frontier)
+    else:
+        records = iter_file_records(root_path, excluded, extensions, stats, dir_mtimes, dir_totals, pacer, frontier)
+    if trie is not None:
+        for rec in records:
+            trie.add(rec.path, rec.size, rec.mtime)
+            if top is not None:
+                top.push(rec.path, rec.size)
+        return trie
+    if mtimes is None and top is None:
+        return {rec.path: rec.size for rec in records}
+    file_info = {}
+    for rec in records:
+        file_info[rec.path] = rec.size
+        if mtimes is not None:
+            mtimes[rec.path] = rec.mtime
+        if top is not None:
+            top.push(rec.path, rec.size)
+    return file_info
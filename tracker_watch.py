@@ -0,0 +1,405 @@
+"""Live change tracking for the File Tracker.
+
+A WatchBackend turns filesystem notifications into WatchEvents. SnapshotWatcher
+applies them to the last saved snapshot so new, grown and deleted files can be
+shown without running another full scan.
+"""
+import ctypes
+import ctypes.util
+import heapq
+import os
+import queue
+import select
+import stat
+import struct
+import sys
+import threading
+import time
+from collections import namedtuple
+from itertools import chain
+from operator import itemgetter
+
+import tracker_engine
+from path_trie import PathTrie
+from snapshot_diff import GROWTH_THRESHOLD
+
+CREATED = "created"
+MODIFIED = "modified"
+DELETED = "deleted"
+# The backend lost events; everything under path has to be rescanned
+OVERFLOW = "overflow"
+
+WatchEvent = namedtuple("WatchEvent", ["kind", "path", "is_dir"])
+
+
+class WatchBackend:
+    """Source of change events for one directory tree"""
+
+    def start(self, root_path, excluded=()):
+        raise NotImplementedError
+
+    def read_events(self, timeout):
+        """Return the WatchEvents available within timeout seconds (possibly none)"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class InotifyBackend(WatchBackend):
+    """Linux backend with one inotify watch per directory"""
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    IN_DONT_FOLLOW = 0x02000000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+                  | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_DONT_FOLLOW)
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = None
+        self._dirs = {}
+        self.excluded = ()
+        # Directories that could not be watched, e.g. after hitting fs.inotify.max_user_watches
+        self.unwatched = 0
+
+    def start(self, root_path, excluded=()):
+        self.excluded = tuple(excluded)
+        self._fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if not self._add_tree(root_path):
+            self.close()
+            raise OSError(ctypes.get_errno(), f"Cannot watch {root_path}")
+
+    def _add_watch(self, path):
+        if self.excluded and path.startswith(self.excluded):
+            return False
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), self.WATCH_MASK)
+        if wd < 0:
+            self.unwatched += 1
+            return False
+        self._dirs[wd] = path
+        return True
+
+    def _add_tree(self, root_path):
+        if not self._add_watch(root_path):
+            return False
+        stack = [root_path]
+        while stack:
+            current_root = stack.pop()
+            try:
+                with os.scandir(current_root) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False) and self._add_watch(entry.path):
+                            stack.append(entry.path)
+            except OSError:
+                continue
+        return True
+
+    def _remove_tree(self, path):
+        prefix = path + os.sep
+        for wd, folder in list(self._dirs.items()):
+            if folder == path or folder.startswith(prefix):
+                self._libc.inotify_rm_watch(self._fd, wd)
+                del self._dirs[wd]
+
+    def read_events(self, timeout):
+        if not select.select([self._fd], [], [], max(0.0, timeout))[0]:
+            return []
+        try:
+            data = os.read(self._fd, 1024 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = self._EVENT.unpack_from(data, offset)
+            name = data[offset + self._EVENT.size:offset + self._EVENT.size + length].rstrip(b"\0")
+            offset += self._EVENT.size + length
+            if mask & self.IN_Q_OVERFLOW:
+                events.append(WatchEvent(OVERFLOW, None, True))
+                continue
+            folder = self._dirs.get(wd)
+            if folder is None:
+                continue
+            if mask & self.IN_IGNORED:
+                del self._dirs[wd]
+                continue
+            if mask & (self.IN_DELETE_SELF | self.IN_MOVE_SELF):
+                continue
+            path = os.path.join(folder, os.fsdecode(name))
+            is_dir = bool(mask & self.IN_ISDIR)
+            if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                # Watch new folders straight away; the watcher rescans them for anything created meanwhile
+                if is_dir:
+                    self._add_tree(path)
+                events.append(WatchEvent(CREATED, path, is_dir))
+            elif mask & (self.IN_DELETE | self.IN_MOVED_FROM):
+                # Watches follow the moved folder, so drop them before they report stale paths
+                if is_dir and mask & self.IN_MOVED_FROM:
+                    self._remove_tree(path)
+                events.append(WatchEvent(DELETED, path, is_dir))
+            else:
+                events.append(WatchEvent(MODIFIED, path, is_dir))
+        return events
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        self._dirs.clear()
+
+
+class ReadDirectoryChangesBackend(WatchBackend):
+    """Windows backend watching the whole tree through one ReadDirectoryChangesW handle"""
+
+    FILE_LIST_DIRECTORY = 0x0001
+    FILE_SHARE_ALL = 0x0001 | 0x0002 | 0x0004
+    OPEN_EXISTING = 3
+    FILE_FLAG_BACKUP_SEMANTICS = 0x02000000
+    NOTIFY_FILTER = 0x0001 | 0x0002 | 0x0008 | 0x0010  # file name, dir name, size, last write
+    ACTIONS = {1: CREATED, 2: DELETED, 3: MODIFIED, 4: DELETED, 5: CREATED}
+    BUFFER_SIZE = 64 * 1024
+
+    def __init__(self):
+        from ctypes import wintypes
+        self._kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        self._kernel32.CreateFileW.restype = wintypes.HANDLE
+        self._kernel32.CreateFileW.argtypes = [wintypes.LPCWSTR, wintypes.DWORD, wintypes.DWORD, wintypes.LPVOID,
+                                               wintypes.DWORD, wintypes.DWORD, wintypes.HANDLE]
+        self._kernel32.ReadDirectoryChangesW.argtypes = [wintypes.HANDLE, wintypes.LPVOID, wintypes.DWORD,
+                                                         wintypes.BOOL, wintypes.DWORD, wintypes.LPDWORD,
+                                                         wintypes.LPVOID, wintypes.LPVOID]
+        self._kernel32.CancelIoEx.argtypes = [wintypes.HANDLE, wintypes.LPVOID]
+        self._kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+        self._handle = None
+        self._events = queue.Queue()
+        self._thread = None
+        self.excluded = ()
+
+    def start(self, root_path, excluded=()):
+        self.root_path = root_path
+        self.excluded = tuple(excluded)
+        handle = self._kernel32.CreateFileW(root_path, self.FILE_LIST_DIRECTORY, self.FILE_SHARE_ALL, None,
+                                            self.OPEN_EXISTING, self.FILE_FLAG_BACKUP_SEMANTICS, None)
+        if handle is None or handle == ctypes.c_void_p(-1).value:
+            raise ctypes.WinError(ctypes.get_last_error())
+        self._handle = handle
+        self._thread = threading.Thread(target=self._read_loop, daemon=True)
+        self._thread.start()
+
+    def _read_loop(self):
+        from ctypes import wintypes
+        buffer = ctypes.create_string_buffer(self.BUFFER_SIZE)
+        returned = wintypes.DWORD()
+        while self._handle is not None:
+            ok = self._kernel32.ReadDirectoryChangesW(self._handle, buffer, self.BUFFER_SIZE, True,
+                                                      self.NOTIFY_FILTER, ctypes.byref(returned), None, None)
+            if not ok:
+                # Cancelled by close(), or the watched folder went away
+                return
+            if returned.value == 0:
+                # The kernel buffer overflowed and the changes were dropped
+                self._events.put(WatchEvent(OVERFLOW, self.root_path, True))
+                continue
+            data = buffer.raw[:returned.value]
+            offset = 0
+            while True:
+                next_offset, action, length = struct.unpack_from("<III", data, offset)
+                name = data[offset + 12:offset + 12 + length].decode("utf-16-le", "surrogatepass")
+                path = os.path.join(self.root_path, name)
+                kind = self.ACTIONS.get(action)
+                if kind and not (self.excluded and path.startswith(self.excluded)):
+                    # Deleted entries can no longer be stat'ed, so the watcher treats them as possible folders
+                    is_dir = kind == DELETED or os.path.isdir(path)
+                    self._events.put(WatchEvent(kind, path, is_dir))
+                if not next_offset:
+                    break
+                offset += next_offset
+
+    def read_events(self, timeout):
+        events = []
+        try:
+            events.append(self._events.get(timeout=max(0.0, timeout)))
+            while True:
+                events.append(self._events.get_nowait())
+        except queue.Empty:
+            pass
+        return events
+
+    def close(self):
+        handle, self._handle = self._handle, None
+        if handle is not None:
+            self._kernel32.CancelIoEx(handle, None)
+            self._kernel32.CloseHandle(handle)
+
+
+def create_watch_backend():
+    """Return the notification backend for this platform"""
+    if sys.platform.startswith("linux"):
+        return InotifyBackend()
+    if os.name == "nt":
+        return ReadDirectoryChangesBackend()
+    raise NotImplementedError(f"No filesystem watch backend for {sys.platform}")
+
+
+class SnapshotWatcher:
+    """Keeps the last snapshot in memory and applies change events to it.
+
+    Changes are kept as an overlay of {path: size, or None when deleted} on top of the
+    baseline snapshot, so the new, grown and deleted view is derived from the overlay alone.
+    """
+
+    def __init__(self, root_path, baseline, excluded=(), extensions=None, backend=None,
+                 coalesce_delay=0.5, burst_limit=1000, threshold=GROWTH_THRESHOLD):
+        self.root_path = root_path
+        # A PathTrie answers "which files are below this folder" without going through every path
+        if not isinstance(baseline, PathTrie):
+            baseline = PathTrie.from_items((path, size, 0.0) for path, size in baseline.items())
+        self.baseline = baseline
+        self.overlay = {}
+        self.excluded = tuple(excluded)
+        self.extensions = tuple(ext.lower() for ext in extensions) if extensions else None
+        self.backend = backend or create_watch_backend()
+        self.coalesce_delay = coalesce_delay
+        # A folder with more changed files than this in one burst is rescanned instead
+        self.burst_limit = burst_limit
+        self.threshold = threshold
+        self.events_seen = 0
+
+    def start(self):
+        self.backend.start(self.root_path, self.excluded)
+
+    def close(self):
+        self.backend.close()
+
+    def poll(self, timeout):
+        """Wait up to timeout for events, coalesce the burst and apply it; returns the number of events"""
+        events = self.backend.read_events(timeout)
+        if not events:
+            return 0
+        deadline = time.monotonic() + self.coalesce_delay
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            events.extend(self.backend.read_events(remaining))
+        self.apply(events)
+        return len(events)
+
+    def apply(self, events):
+        self.events_seen += len(events)
+        files = set()
+        rescan = set()
+        gone = set()
+        for event in events:
+            if event.kind == OVERFLOW:
+                rescan.add(event.path or self.root_path)
+            elif not event.is_dir:
+                files.add(event.path)
+            elif event.kind == DELETED:
+                # Also refreshed as a file, since Windows cannot tell what a deleted entry was
+                gone.add(event.path)
+                files.add(event.path)
+            elif event.kind == CREATED:
+                rescan.add(event.path)
+            # A folder's own modification only means its children changed, which have their own events
+
+        by_folder = {}
+        for path in files:
+            by_folder.setdefault(os.path.dirname(path), []).append(path)
+        for folder, paths in by_folder.items():
+            if len(paths) > self.burst_limit:
+                rescan.add(folder)
+            else:
+                for path in paths:
+                    self._refresh(path)
+        if gone or rescan:
+            self._rescan(gone, rescan)
+
+    def _wanted(self, path):
+        if self.excluded and path.startswith(self.excluded):
+            return False
+        return not self.extensions or path.lower().endswith(self.extensions)
+
+    def _set(self, path, size):
+        if size is None and path not in self.baseline:
+            self.overlay.pop(path, None)
+        elif size is not None and self.baseline.get(path) == size:
+            self.overlay.pop(path, None)
+        else:
+            self.overlay[path] = size
+
+    def _refresh(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            self._set(path, None)
+            return
+        if stat.S_ISDIR(st.st_mode):
+            self._rescan((), (path,))
+        elif self._wanted(path):
+            self._set(path, st.st_size)
+
+    def _rescan(self, gone, rescan):
+        fresh = {}
+        for folder in rescan:
+            fresh.update(tracker_engine.scan_folder_files(folder, self.extensions, self.excluded))
+        folders = set(chain(gone, rescan))
+        prefixes = tuple(path if path.endswith(os.sep) else path + os.sep for path in folders)
+        # The baseline is looked up per folder; the overlay only holds the changes seen so far
+        known = {path for folder in folders for path in self.baseline.iter_under(folder)}
+        known.update(path for path in self.overlay if path.startswith(prefixes))
+        for path in known:
+            if path not in fresh:
+                self._set(path, None)
+        for path, size in fresh.items():
+            self._set(path, size)
+
+    def items(self):
+        """Yield (path, size) for every file as it is now"""
+        for path, size in self.baseline.items():
+            if path not in self.overlay:
+                yield path, size
+        for path, size in self.overlay.items():
+            if size is not None:
+                yield path, size
+
+    def largest(self, count, extensions=None):
+        """Return the count largest files, only counting those with one of extensions when given"""
+        items = self.items()
+        if extensions:
+            extensions = {ext.lower() for ext in extensions}
+            items = (item for item in items if tracker_engine.file_extension(item[0]) in extensions)
+        return heapq.nlargest(count, items, key=itemgetter(1))
+
+    def diff(self):
+        """Return (new_files, grown_files, deleted_files) relative to the baseline snapshot"""
+        new_files = []
+        grown_files = []
+        deleted_files = []
+        for path, size in self.overlay.items():
+            old = self.baseline.get(path)
+            if size is None:
+                if old is not None:
+                    deleted_files.append(path)
+            elif old is None:
+                new_files.append((path, size))
+            elif size - old > self.threshold:
+                grown_files.append((path, size - old))
+        return new_files, grown_files, deleted_files